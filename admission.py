@@ -0,0 +1,226 @@
+"""
+Admission control for Gemini calls in XThreadMaster
+A process-wide controller shared by every Streamlit session: token buckets
+for requests-per-minute and tokens-per-minute, a FIFO wait queue with a
+deadline, and bounded retries with jittered exponential backoff on 429s
+"""
+
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional, TypeVar
+
+import metrics
+
+T = TypeVar("T")
+
+class AdmissionTimeout(Exception):
+    """Raised when a request can't be admitted (or retried) before its deadline"""
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for Gemini quota errors (HTTP 429 / ResourceExhausted)"""
+    message = str(error)
+    return (
+        type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+        or "429" in message
+        or "Resource exhausted" in message
+    )
+
+def estimate_tokens(text: str, expected_output: int = 1024) -> int:
+    """Rough token estimate for a prompt plus its expected output (~4 chars per token)"""
+    return max(1, len(text) // 4) + expected_output
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute up to `capacity` (defaults to one minute's worth)"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self):
+        """Empty the bucket (after the upstream says we're over quota)"""
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+
+class AdmissionController:
+    """
+    Shared gate in front of every generate_content call
+
+    Requests wait in FIFO order until both buckets have room. Waiting longer
+    than `queue_timeout` raises AdmissionTimeout instead of piling up.
+    Rate-limit errors from the API are retried up to `max_retries` times
+    with full-jitter exponential backoff, and drain the request bucket so
+    other sessions back off too.
+
+    A controller with a `parent` is a capped share of it for background
+    traffic (batch runs): its own buckets set the share, and a request is
+    only sent when the parent also has spare capacity and nobody queued
+    there (try_acquire), so it never waits ahead of the parent's callers.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 15,
+        tokens_per_minute: float = 1_000_000,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 20.0,
+        queue_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        parent: Optional["AdmissionController"] = None,
+        parent_poll: float = 0.5,
+        name: str = "admission"
+    ):
+        self.requests = TokenBucket(requests_per_minute, clock=clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.queue_timeout = queue_timeout
+        self.parent = parent
+        self.parent_poll = parent_poll
+        self.name = name  # Metrics prefix
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._tickets = itertools.count()
+
+    def queue_length(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def acquire(self, tokens: int = 1, deadline: Optional[float] = None):
+        """
+        Block until the request may be sent
+
+        Args:
+            tokens: Estimated tokens the request will use
+            deadline: Absolute clock time to give up at (default now + queue_timeout)
+
+        Raises:
+            AdmissionTimeout if the deadline passes while queued
+        """
+        deadline = self._clock() + self.queue_timeout if deadline is None else deadline
+        start = self._clock()
+        ticket = next(self._tickets)
+
+        with self._cond:
+            self._queue.append(ticket)
+            metrics.set_gauge(f"{self.name}.queue_length", len(self._queue))
+            try:
+                while True:
+                    wait = None
+                    polling = False
+                    if self._queue[0] == ticket:
+                        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                        if wait == 0 and self.parent is not None and not self.parent.try_acquire(tokens):
+                            # Parent busy or queued: its callers go first, check again shortly
+                            wait, polling = self.parent_poll, True
+                        if wait == 0:
+                            self.requests.consume(1)
+                            self.tokens.consume(tokens)
+                            metrics.record(f"{self.name}.wait", self._clock() - start)
+                            return
+
+                    remaining = deadline - self._clock()
+                    if remaining <= 0 or (wait is not None and wait > remaining and not polling):
+                        metrics.increment(f"{self.name}.timeouts")
+                        raise AdmissionTimeout("Generation queue is full, please try again in a moment")
+                    self._cond.wait(min(remaining, wait) if wait is not None else remaining)
+            finally:
+                self._queue.remove(ticket)
+                metrics.set_gauge(f"{self.name}.queue_length", len(self._queue))
+                self._cond.notify_all()
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """Admit a request only if there's spare capacity right now and nobody is queued"""
+        with self._cond:
+            if self._queue:
+                return False
+            if self.requests.wait_time(1) == 0 and self.tokens.wait_time(tokens) == 0:
+                self.requests.consume(1)
+                self.tokens.consume(tokens)
+                return True
+            return False
+
+    def acquirer(self, tokens: int = 1, deadline: Optional[float] = None) -> Callable[[], None]:
+        """
+        acquire(tokens) bound to one deadline (default now + queue_timeout), for
+        charging every model attempt of a routed request against the same wait budget
+        """
+        deadline = self._clock() + self.queue_timeout if deadline is None else deadline
+        return lambda: self.acquire(tokens, deadline)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for retry number `attempt` (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        tokens: int = 1,
+        deadline: Optional[float] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        admit: bool = True
+    ) -> T:
+        """
+        Run `fn` once admitted, retrying rate-limit errors with backoff
+
+        Args:
+            fn: The model call to make
+            tokens: Estimated tokens for the request (see estimate_tokens)
+            deadline: Absolute clock time to give up at (default now + queue_timeout)
+            sleep: Sleep function (for tests)
+            admit: Acquire before each try. Pass False when fn may send several
+                   model calls (router failover) and acquires for each of them
+                   itself (see ModelRouter.call's admit) - only the 429 retries
+                   and backoff happen here then
+
+        Returns:
+            Whatever fn returns. Non rate-limit errors are raised immediately.
+        """
+        deadline = self._clock() + self.queue_timeout if deadline is None else deadline
+
+        for attempt in range(self.max_retries + 1):
+            if admit:
+                self.acquire(tokens, deadline)
+            try:
+                return fn()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                metrics.increment(f"{self.name}.rate_limited")
+                with self._cond:
+                    self.requests.drain()
+                if self.parent is not None:
+                    with self.parent._cond:
+                        self.parent.requests.drain()
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                if self._clock() + delay >= deadline:
+                    raise AdmissionTimeout("AI service is busy, please try again in a moment") from e
+                metrics.increment(f"{self.name}.retries")
+                sleep(delay)
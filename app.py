@@ -1,4 +1,5 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import google.generativeai as genai
 import requests
 import tweepy
@@ -6,10 +7,11 @@ import json
 from datetime import date, datetime
 import os
 import tempfile
-import io
-import zipfile
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-import base64
 import pandas as pd
 from templates import (
     get_all_templates,
@@ -30,9 +32,28 @@ from analytics import (
     save_thread_to_history,
     get_thread_history
 )
+from subscriptions import TierCache, fetch_stripe_tier, resolve_tier
+from entitlement_store import DEFAULT_DB_PATH, EntitlementStore
+from tier_token import issue_tier_token, verify_tier_token
+from generation import generate_text
+from generation_cache import GenerationCache, cache_key
+from admission import AdmissionController, AdmissionTimeout, is_rate_limit_error
+from model_router import HedgeBudget, HedgeCancelled, ModelRouter
+from prompts import build_item_prompt, build_prompt, build_repair_prompt
+from variants import generate_variants, rank_variants
+from tweet_length import MAX_WEIGHTED_LENGTH, over_limit, repair_thread, replace_tweet, split_tweets, weighted_length
+from thread_splitter import split_into_thread
+from batch import BatchError, default_work_dir, parse_rows, pending_rows, run_batch
+from topic_index import TopicIndex
+from carousel import SlideStream, parse_slides, replace_slide, slide_text
+from image_cache import ImageCache
+from blob_store import BlobStore
+from transcode import transcode_image
+from carousel_export import package_key, write_carousel_zip
+from slide_images import DRAFT_STEPS, FINAL_STEPS, SlideImageBatch, generate_stability_image, merge_slide_images, provider_limit
 
 # === CONFIG ===
-# NOTE: genai.configure() is now called lazily in get_model() to prevent deployment hangs
+# NOTE: genai.configure() is now called lazily in get_model_router() to prevent deployment hangs
 
 # Get Stripe payment links from secrets (with fallback)
 STRIPE_PRO_LINK = st.secrets.get("STRIPE_PRO_LINK", "#")
@@ -139,29 +160,391 @@ def cleanup_linkedin_state(state):
         pass
 
 # === MODEL ===
+MODEL_NAMES = ("gemini-2.0-flash-exp", "gemini-1.5-flash", "gemini-1.5-pro")
+
 @st.cache_resource
-def get_model():
+def get_model_router():
+    """Process-wide model router - health and latency are tracked across all sessions"""
     # Configure genai API here (lazy loading to prevent deployment hang)
     genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
 
-    # Try models in order of preference
-    for name in ("gemini-2.0-flash-exp", "gemini-1.5-flash", "gemini-1.5-pro"):
+    models = []
+    for name in MODEL_NAMES:
         try:
-            m = genai.GenerativeModel(name)
-            # Quick validation without API call
-            return m
+            # Quick validation without API call - real failures are handled at call time
+            models.append((name, genai.GenerativeModel(name)))
         except Exception:
             continue
 
-    # If no model works, show error
-    st.error("❌ AI service unavailable. Please contact support or try again later.")
-    st.stop()
+    if not models:
+        # If no model works, show error
+        st.error("❌ AI service unavailable. Please contact support or try again later.")
+        st.stop()
+
+    return ModelRouter(
+        models,
+        failure_threshold=int(st.secrets.get("MODEL_FAILURE_THRESHOLD", 3)),
+        cooldown=float(st.secrets.get("MODEL_COOLDOWN", 60))
+    )
+
+@st.cache_resource
+def get_admission_controller():
+    """Process-wide Gemini admission controller shared by all sessions"""
+    return AdmissionController(
+        requests_per_minute=float(st.secrets.get("GEMINI_RPM", 15)),
+        tokens_per_minute=float(st.secrets.get("GEMINI_TPM", 1_000_000)),
+        max_retries=int(st.secrets.get("GEMINI_MAX_RETRIES", 3)),
+        queue_timeout=float(st.secrets.get("GEMINI_QUEUE_TIMEOUT", 30))
+    )
+
+@st.cache_resource
+def get_batch_admission_controller():
+    """
+    Capped share of the Gemini quota for batch runs: batch calls only go out
+    when interactive traffic leaves spare capacity, so a batch can't starve users
+    """
+    interactive = get_admission_controller()
+    return AdmissionController(
+        requests_per_minute=float(st.secrets.get("BATCH_RPM", interactive.requests.capacity / 3)),
+        tokens_per_minute=float(st.secrets.get("BATCH_TPM", interactive.tokens.capacity / 3)),
+        max_retries=int(st.secrets.get("GEMINI_MAX_RETRIES", 3)),
+        queue_timeout=float(st.secrets.get("BATCH_QUEUE_TIMEOUT", 120)),
+        parent=interactive,
+        name="admission.batch"
+    )
+
+@st.cache_resource
+def get_hedge_budget():
+    """Shared cap on hedged requests (HEDGE_BUDGET = extra requests per normal request)"""
+    return HedgeBudget(ratio=float(st.secrets.get("HEDGE_BUDGET", 0.1)))
+
+@st.cache_resource
+def get_generation_cache():
+    """Process-wide cache of generated text shared by all sessions"""
+    return GenerationCache(
+        max_bytes=int(float(st.secrets.get("GEN_CACHE_MAX_MB", 16)) * 1024 * 1024),
+        disk_dir=st.secrets.get("GEN_CACHE_DIR") or None,
+        disk_ttl=float(st.secrets.get("GEN_CACHE_TTL", 86400))
+    )
+
+@st.cache_resource
+def get_instructed_model(model_name, system_instruction):
+    """Model with a platform's system instruction baked in (one per model/platform pair)"""
+    return genai.GenerativeModel(model_name, system_instruction=system_instruction)
+
+def generate_with_preview(prompt, bypass_cache=False, on_text=None):
+    """
+    Generate content for a BuiltPrompt (see prompts.build_prompt), rendering
+    partial output while the response streams in. Identical requests are
+    served from the generation cache unless bypass_cache is set (used by
+    "Regenerate"). on_text, if given, also receives the text assembled so far
+    after every streamed chunk (possibly from a worker thread when hedging).
+    """
+    router = get_model_router()
+    cache = get_generation_cache()
+    admission = get_admission_controller()
+    generation_config = prompt.generation_config
+    key = cache_key(prompt.cache_text, router.name, generation_config)
+
+    if not bypass_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    stream = st.secrets.get("STREAM_GENERATION", True)
+    # Counted locally before sending: prompt plus the most the reply may use
+    tokens = prompt.input_tokens + prompt.max_output_tokens
+    preview = st.empty()
+    admit = admission.acquirer(tokens)
+
+    if st.secrets.get("HEDGE_REQUESTS", False):
+        # Hedged attempts run in worker threads, so they need the script context
+        # to render; only the first attempt to stream text drives the preview
+        ctx = get_script_run_ctx()
+        leader = []
+
+        def attempt(model, cancelled):
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+            def show(text):
+                if cancelled.is_set():
+                    raise HedgeCancelled()
+                if not leader:
+                    leader.append(cancelled)
+                if leader[0] is cancelled:
+                    preview.code(text, language="text")
+                    if on_text:
+                        on_text(text)
+
+            model = get_instructed_model(model.model_name, prompt.system_instruction)
+            return generate_text(model, prompt.text, stream=stream, on_chunk=show, generation_config=generation_config)
+
+        run = lambda: router.call_hedged(
+            attempt,
+            get_hedge_budget(),
+            hedge_percentile=float(st.secrets.get("HEDGE_PERCENTILE", 95)),
+            can_hedge=lambda: admission.try_acquire(tokens),
+            admit=admit
+        )
+    else:
+        def show(text):
+            preview.code(text, language="text")
+            if on_text:
+                on_text(text)
+
+        run = lambda: router.call(lambda model: generate_text(
+            get_instructed_model(model.model_name, prompt.system_instruction),
+            prompt.text,
+            stream=stream,
+            on_chunk=show,
+            generation_config=generation_config
+        ), admit=admit)
+
+    try:
+        # Every model attempt (first try, failovers) queues behind the shared
+        # RPM/TPM budget; 429s that hit every model are retried with backoff
+        text = admission.call(run, tokens=tokens, admit=False)
+    finally:
+        preview.empty()
+
+    cache.put(key, text)
+    return text
+
+@st.cache_resource
+def get_variant_pool():
+    """Shared, bounded pool for variant generations (VARIANT_WORKERS threads)"""
+    return ThreadPoolExecutor(max_workers=int(st.secrets.get("VARIANT_WORKERS", 4)), thread_name_prefix="variant")
+
+def generate_once(prompt, admission=None):
+    """
+    Generate a BuiltPrompt without streaming or caching (variants, tweet repairs, batch rows)
+    through `admission` (default: the interactive admission controller)
+    """
+    router = get_model_router()
+    admission = admission or get_admission_controller()
+    tokens = prompt.input_tokens + prompt.max_output_tokens
+    admit = admission.acquirer(tokens)
+    return admission.call(
+        lambda: router.call(lambda model: generate_text(
+            get_instructed_model(model.model_name, prompt.system_instruction),
+            prompt.text,
+            stream=False,
+            generation_config=prompt.generation_config
+        ), admit=admit),
+        tokens=tokens,
+        admit=False
+    )
+
+def generate_ranked_variants(prompt, count):
+    """
+    Generate `count` variants of a BuiltPrompt concurrently and rank them locally.
+    Each variant goes through admission control and the model router like a
+    normal generation; they skip the generation cache since the point is to
+    get different outputs.
+    """
+    ctx = get_script_run_ctx()
+
+    def generate_one():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return generate_once(prompt)
+
+    progress = st.progress(0.0, text=f"Generating {count} variants...")
+    try:
+        texts = generate_variants(
+            generate_one,
+            count,
+            get_variant_pool(),
+            on_done=lambda done: progress.progress(done / count, text=f"{done}/{count} variants ready")
+        )
+    finally:
+        progress.empty()
+    return rank_variants(texts, prompt.platform)
+
+def shorten_long_tweets(thread):
+    """Rewrite only the over-limit tweets of a thread; returns (thread, truncated indexes)"""
+    return repair_thread(thread, lambda tweet, length: generate_once(build_repair_prompt(tweet, length, MAX_WEIGHTED_LENGTH)))
+
+@st.cache_resource
+def get_image_pool():
+    """Shared, bounded pool for slide image requests (IMAGE_WORKERS threads)"""
+    return ThreadPoolExecutor(max_workers=int(st.secrets.get("IMAGE_WORKERS", 8)), thread_name_prefix="image")
+
+@st.cache_resource
+def get_transcode_pool():
+    """Shared, bounded pool for Pillow thumbnail/export transcoding (TRANSCODE_WORKERS threads)"""
+    return ThreadPoolExecutor(max_workers=int(st.secrets.get("TRANSCODE_WORKERS", 4)), thread_name_prefix="transcode")
+
+@st.cache_resource
+def get_image_cache():
+    """Process-wide on-disk cache of generated slide images"""
+    return ImageCache(
+        disk_dir=st.secrets.get("IMAGE_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "xthreadmaster_images"),
+        max_bytes=int(float(st.secrets.get("IMAGE_CACHE_MAX_MB", 512)) * 1024 * 1024)
+    )
+
+@st.cache_resource
+def get_blob_store():
+    """Process-wide disk store for per-session image bytes (session state keeps only handles)"""
+    return BlobStore(
+        root_dir=st.secrets.get("BLOB_STORE_DIR") or os.path.join(tempfile.gettempdir(), "xthreadmaster_blobs"),
+        max_bytes=int(float(st.secrets.get("BLOB_STORE_MAX_MB", 1024)) * 1024 * 1024),
+        ttl=float(st.secrets.get("BLOB_STORE_TTL", 6 * 3600))
+    )
+
+@st.cache_resource
+def get_topic_index():
+    """Process-wide near-duplicate topic index over saved generations (Pro history)"""
+    return TopicIndex(
+        threshold=float(st.secrets.get("TOPIC_MATCH_THRESHOLD", 0.6)),
+        max_entries=int(st.secrets.get("TOPIC_INDEX_MAX_ENTRIES", 20000)),
+        max_bytes=int(float(st.secrets.get("TOPIC_INDEX_MAX_MB", 64)) * 1024 * 1024)
+    )
+
+def topic_scope(email, platform, tone, length):
+    """Index partition: matches never cross users, platforms, tones or lengths"""
+    return (email.strip().lower(), platform, tone, length)
+
+def new_image_batch(topic, seed_salt=0, steps=FINAL_STEPS):
+    """SlideImageBatch on the shared image pool, provider cap and image cache"""
+    stability_api_key = st.secrets.get("STABILITY_API_KEY", "")
+    return SlideImageBatch(
+        topic,
+        lambda payload: generate_stability_image(payload, stability_api_key),
+        get_image_pool(),
+        provider_limit("stability", int(st.secrets.get("STABILITY_CONCURRENCY", 4))),
+        cache=get_image_cache(),
+        seed_salt=seed_salt,
+        steps=steps
+    )
+
+def render_slide_images(batch, titles, numbers=None):
+    """
+    Collect a SlideImageBatch, showing a placeholder per slide that starts as
+    pending and fills in as its image arrives (or shows it failed).
+    Each image is transcoded (preview + Instagram exports) on the transcode
+    pool as soon as it arrives. Returns (images, errors) like
+    SlideImageBatch.collect, except each image's bytes are moved to the blob
+    store: 'handle' for the original and 'renditions' mapping rendition name
+    to handle (empty if transcoding failed). Failed slides are in
+    batch.failures.
+    """
+    numbers = numbers or list(range(1, len(titles) + 1))
+    live_preview = st.empty()
+    with live_preview.container():
+        st.markdown(f"### 🖼️ Generating {len(titles)} AI images...")
+        image_progress = st.progress(0.0)
+        slide_placeholders = {}
+        for num, title in zip(numbers, titles):
+            slide_placeholders[num] = st.empty()
+            slide_placeholders[num].info(f"⏳ **Slide {num}: {title}** - pending")
+
+    finished = []
+    transcodes = {}
+
+    def show_slide_image(slide_num, title, data, error):
+        finished.append(slide_num)
+        if data is not None:
+            transcodes[slide_num] = get_transcode_pool().submit(transcode_image, data)
+        image_progress.progress(len(finished) / len(titles), text=f"{len(finished)}/{len(titles)} images done")
+        with slide_placeholders[slide_num].container():
+            if error:
+                st.error(f"❌ **Slide {slide_num}: {title}** - failed")
+            else:
+                st.markdown(f"✅ **Slide {slide_num}: {title}** - done")
+                st.image(data, use_container_width=True)
+
+    try:
+        images, errors = batch.collect(titles, on_result=show_slide_image, numbers=numbers)
+    finally:
+        # The carousel display shows the finished set
+        live_preview.empty()
+
+    store = get_blob_store()
+    for img in images:
+        try:
+            renditions = transcodes[img['slide_num']].result()
+        except Exception as e:
+            print(f"Error transcoding slide {img['slide_num']}: {e}")
+            renditions = {}
+        img['renditions'] = {name: store.put(st.session_state.blob_session, data) for name, data in renditions.items()}
+        img['handle'] = store.put(st.session_state.blob_session, img.pop('data'))
+    return images, errors
+
+def carousel_package_files():
+    """
+    (archive name, blob handle) for every slide image in the ZIP, or None if a
+    slide has no image left in the blob store (the package can't be complete)
+    """
+    store = get_blob_store()
+    files = []
+    for img_data in st.session_state.carousel_images:
+        # Instagram-sized exports, or the original if transcoding failed or an export was evicted
+        renditions = img_data['renditions']
+        if 'square' in renditions and 'portrait' in renditions and renditions['square'] in store and renditions['portrait'] in store:
+            files.append((f"square_1080x1080/slide_{img_data['slide_num']:02d}.jpg", renditions['square']))
+            files.append((f"portrait_1080x1350/slide_{img_data['slide_num']:02d}.jpg", renditions['portrait']))
+        elif img_data['handle'] in store:
+            files.append((f"slide_{img_data['slide_num']:02d}.png", img_data['handle']))
+        else:
+            return None
+    return files
+
+def build_carousel_package(store, session_id, captions, files):
+    """
+    Write the carousel ZIP into the blob store (safe to call off the script thread)
+
+    Returns:
+        Its handle, or None if it couldn't be built or an image vanished while
+        writing - a ZIP missing slides is never handed out
+    """
+    written = []
+    try:
+        handle = store.put_stream(
+            session_id,
+            lambda out: written.append(
+                write_carousel_zip(out, captions, [(name, lambda h=h: store.open(h)) for name, h in files])
+            )
+        )
+    except (OSError, ValueError) as e:
+        print(f"Error building carousel package: {e}")
+        return None
+    if written != [len(files)]:
+        print(f"Carousel package is missing images ({written} of {len(files)} written)")
+        return None
+    return handle
+
+def ensure_carousel_package(captions):
+    """
+    Handle of the carousel ZIP in the blob store, rebuilding it only when the
+    captions or images changed since it was last built (None if it can't be built)
+    """
+    files = carousel_package_files()
+    if files is None:
+        return None
+
+    store = get_blob_store()
+    key = package_key(captions, [handle for _, handle in files])
+    package = st.session_state.carousel_package
+    if package and package['key'] == key and package['handle'] in store:
+        return package['handle']
 
-# Lazy load model - only initialized when first used
-def get_or_create_model():
-    if "model" not in st.session_state:
-        st.session_state.model = get_model()
-    return st.session_state.model
+    handle = build_carousel_package(store, st.session_state.blob_session, captions, files)
+    if handle is None:
+        return None
+    st.session_state.carousel_package = {'key': key, 'handle': handle}
+    return handle
+
+def show_generation_error(error, refund):
+    """Explain a failed generation and give back the free-tier credit it used"""
+    if refund:
+        st.session_state.gen_count = max(0, st.session_state.gen_count - 1)
+
+    if isinstance(error, AdmissionTimeout) or is_rate_limit_error(error):
+        st.error("⏱️ **AI Service Busy**")
+        st.warning("Lots of people are generating right now and we couldn't get you a slot in time.")
+        st.info("Please try again in a minute. Failed attempts don't count against your limits.")
+    else:
+        st.error(f"❌ AI generation failed: {error}")
 
 st.set_page_config(page_title="XThreadMaster", page_icon="🚀", layout="centered")
 
@@ -537,8 +920,18 @@ if "carousel" not in st.session_state:
     st.session_state.carousel = None
 if "carousel_images" not in st.session_state:
     st.session_state.carousel_images = []
+if "blob_session" not in st.session_state:
+    st.session_state.blob_session = uuid.uuid4().hex  # Namespace for this session's blobs on disk
+if "carousel_image_failures" not in st.session_state:
+    st.session_state.carousel_image_failures = {}  # slide_num -> {'title', 'error', 'steps'}
+if "carousel_package" not in st.session_state:
+    st.session_state.carousel_package = None  # {'key', 'handle'} of the prebuilt ZIP
+if "carousel_image_settings" not in st.session_state:
+    st.session_state.carousel_image_settings = {"topic": "", "seed_salt": 0}
 if "platform" not in st.session_state:
     st.session_state.platform = "X Thread"
+if "variants" not in st.session_state:
+    st.session_state.variants = []
 # Thread history now stored in Supabase (removed session state)
 
 st.title("🚀 XThreadMaster")
@@ -571,50 +964,66 @@ if current_month != last_reset_month:
     st.session_state.carousel_last_reset = date.today()
 
 # === SUBSCRIPTION TIERS ===
+@st.cache_resource
+def get_tier_cache():
+    """Process-wide tier cache shared by all sessions"""
+    return TierCache(
+        ttl=float(st.secrets.get("TIER_CACHE_TTL", 600)),
+        negative_ttl=float(st.secrets.get("TIER_CACHE_NEGATIVE_TTL", 120))
+    )
+
+@st.cache_resource
+def get_entitlement_store():
+    """Local entitlement table kept up to date by stripe_webhooks.py"""
+    return EntitlementStore(st.secrets.get("ENTITLEMENTS_DB", DEFAULT_DB_PATH))
+
+TIER_TOKEN_PARAM = "tier_token"
+
+def get_token_tier(e):
+    """Return the tier from a valid signed tier token in the URL, or None"""
+    secret = st.secrets.get("TIER_TOKEN_SECRET", "")
+    token = st.query_params.get(TIER_TOKEN_PARAM)
+    if not secret or not token:
+        return None
+    return verify_tier_token(token, e, secret, revoked_before=get_entitlement_store().tokens_revoked_before)
+
+def save_tier_token(e, tier):
+    """Store a signed tier token in the URL so reloads skip the Stripe check"""
+    secret = st.secrets.get("TIER_TOKEN_SECRET", "")
+    if not secret:
+        return
+    if tier == 'free':
+        # Don't pin free users - they should see an upgrade as soon as it happens
+        st.query_params.pop(TIER_TOKEN_PARAM, None)
+        return
+    ttl = int(st.secrets.get("TIER_TOKEN_TTL", 3600))
+    st.query_params[TIER_TOKEN_PARAM] = issue_tier_token(e, tier, secret, ttl=ttl)
+
 def get_user_tier(e):
     """
-    Check user's subscription tier via Stripe.
+    Check user's subscription tier: signed tier token first, then the
+    webhook-fed entitlement store, then a (cached) live Stripe lookup.
     Returns: 'free', 'pro' ($12/mo), or 'visual_pack' ($17/mo)
     """
     if not e or not e.strip():
         return 'free'
 
     try:
-        # Check Stripe for active subscriptions
-        custs_response = requests.get(
-            "https://api.stripe.com/v1/customers",
-            params={"email": e},
-            auth=(st.secrets["STRIPE_SECRET_KEY"], ""),
-            timeout=10
-        )
-        custs = custs_response.json().get("data", [])
+        tier = get_token_tier(e)
+        if tier:
+            return tier
 
-        for c in custs:
-            subs_response = requests.get(
-                f"https://api.stripe.com/v1/subscriptions",
-                params={"customer": c["id"], "status": "active"},
-                auth=(st.secrets["STRIPE_SECRET_KEY"], ""),
-                timeout=10
+        entitlement = get_entitlement_store().get_entitlement(e)
+        if entitlement is not None:
+            tier = entitlement.tier
+        else:
+            tier = resolve_tier(
+                e,
+                get_tier_cache(),
+                lambda addr: fetch_stripe_tier(addr, st.secrets["STRIPE_SECRET_KEY"])
             )
-            subs = subs_response.json().get("data", [])
-
-            for sub in subs:
-                # Get the price amount to determine tier
-                items = sub.get("items", {}).get("data", [])
-                if items:
-                    price = items[0].get("price", {})
-                    amount = price.get("unit_amount", 0) / 100  # Convert cents to dollars
-
-                    # Determine tier based on price
-                    if amount >= 17:
-                        return 'visual_pack'  # $17/mo - Instagram + X
-                    elif amount >= 12:
-                        return 'pro'  # $12/mo - X only
-
-            # If we found subscriptions but couldn't parse price, default to pro
-            if subs:
-                return 'pro'
-
+        save_tier_token(e, tier)
+        return tier
     except requests.exceptions.RequestException as e:
         st.warning(f"⚠️ Could not verify subscription: {e}")
     except Exception as e:
@@ -622,6 +1031,16 @@ def get_user_tier(e):
 
     return 'free'
 
+# Re-check Stripe when one email is replaced by a different one within a session.
+# Typing an email into a fresh session (reload/new tab) keeps its tier token -
+# tokens are bound to an email hash, so one for another address never verifies.
+if email and email.strip():
+    previous = st.session_state.get("tier_email")
+    if previous and previous != email:
+        get_tier_cache().invalidate(email)
+        st.query_params.pop(TIER_TOKEN_PARAM, None)
+    st.session_state.tier_email = email
+
 # Get user tier
 user_tier = get_user_tier(email)
 
@@ -1036,6 +1455,16 @@ elif platform == "LinkedIn Post":
 else:  # Instagram Carousel
     length = st.slider("Carousel Length (slides)", 5, 10, 7, help="Number of slides in your carousel")
 
+# Draft images: cheap previews for every slide, full renders only for approved ones
+draft_images = False
+if platform == "Instagram Carousel":
+    draft_images = st.checkbox("⚡ Quick image drafts first", help="Generate fast, low-cost previews, then render only the slides you approve in full quality")
+
+# Variants mode (Pro only): several versions generated at once, best-ranked first
+variant_count = 1
+if pro and platform in ("X Thread", "LinkedIn Post"):
+    variant_count = st.slider("Variants", 1, 4, 1, help="Pro feature: generate several versions at once and pick the best one")
+
 # Update sidebar with thread history (Pro only)
 if pro:
     with st.sidebar:
@@ -1065,6 +1494,7 @@ if pro:
                     if st.button(f"📥 Load This {entry['platform']}", key=f"load_{idx}", use_container_width=True):
                         st.session_state.thread = entry['content']
                         st.session_state.platform = entry['platform']
+                        st.session_state.variants = []
                         st.rerun()
         else:
             st.caption("Generate content to see your history here!")
@@ -1250,6 +1680,73 @@ if "oauth_verifier" in query and "oauth_token" in query:
             st.session_state.processing_oauth = False
             st.query_params.clear()
 
+# === BATCH MODE (Pro) ===
+if pro:
+    with st.expander("📦 Batch Mode - generate a content calendar from a file", expanded=False):
+        st.caption("Upload a CSV or JSONL with columns: topic, platform, tone, length, template (optional). "
+                   "Extra columns fill template placeholders. Re-running the same file resumes where it stopped.")
+        batch_file = st.file_uploader("Topics file", type=["csv", "jsonl"], key="batch_file")
+
+        if batch_file and st.button("🚀 Run Batch", use_container_width=True):
+            data = batch_file.getvalue()
+            try:
+                # Same platforms as the picker: carousels need the Visual Pack
+                rows = parse_rows(data, batch_file.name, platforms=platform_options)
+            except (BatchError, ValueError) as e:
+                st.error(f"❌ {e}")
+                st.stop()
+
+            # Carousel rows count against the monthly carousel cap like single generations
+            work_dir = default_work_dir(data, owner=email or "")
+            new_carousels = sum(1 for row in pending_rows(rows, work_dir) if row["platform"] == "Instagram Carousel")
+            if st.session_state.carousel_count + new_carousels > 100:
+                st.error(f"🚫 This batch needs {new_carousels} carousels but only "
+                         f"{max(0, 100 - st.session_state.carousel_count)} of your 100 this month are left")
+                st.stop()
+
+            # Rows run in worker threads that need the script context for cached resources
+            ctx = get_script_run_ctx()
+            batch_admission = get_batch_admission_controller()
+
+            def generate_in_worker(prompt):
+                add_script_run_ctx(threading.current_thread(), ctx)
+                return generate_once(prompt, batch_admission)
+
+            progress = st.progress(0.0, text=f"Generating {len(rows)} items...")
+            summary = run_batch(
+                rows,
+                generate_in_worker,
+                f"{work_dir}.zip",
+                work_dir,
+                workers=int(st.secrets.get("BATCH_WORKERS", 4)),
+                on_progress=lambda done, failed, total: progress.progress(
+                    (done + failed) / total if total else 1.0,
+                    text=f"{done}/{total} done, {failed} failed"
+                )
+            )
+            progress.empty()
+            st.session_state.carousel_count += summary["generated"].get("Instagram Carousel", 0)
+            st.session_state.batch_result = {"path": f"{work_dir}.zip", "name": batch_file.name, **summary}
+
+        result = st.session_state.get("batch_result")
+        if result and os.path.exists(result["path"]):
+            if result["failed"]:
+                st.warning(f"⚠️ {result['done']}/{result['total']} done, {result['failed']} failed - run the batch again to retry just the failed rows")
+            else:
+                st.success(f"✅ {result['done']}/{result['total']} done ({result['resumed']} reused from an earlier run)")
+
+            def read_batch_zip(path=result["path"]):
+                with open(path, "rb") as f:
+                    return f.read()
+
+            st.download_button(
+                "📥 Download Batch (ZIP)",
+                read_batch_zip,  # Read only when clicked, not on every rerun
+                f"{os.path.splitext(result['name'])[0]}_batch.zip",
+                mime="application/zip",
+                use_container_width=True
+            )
+
 # === GENERATE ===
 st.markdown("---")
 
@@ -1261,7 +1758,43 @@ elif platform == "LinkedIn Post":
 else:
     button_text = "🎨 Generate Instagram Carousel"
 
-if st.button(button_text, type="primary", use_container_width=True):
+# Regenerate skips the generation cache so identical inputs get a fresh version
+has_content = bool(st.session_state.thread or st.session_state.carousel)
+if has_content:
+    gen_col, regen_col = st.columns([3, 1])
+    with gen_col:
+        generate_clicked = st.button(button_text, type="primary", use_container_width=True)
+    with regen_col:
+        regenerate_clicked = st.button("🔄 Regenerate", use_container_width=True, help="Generate a fresh version instead of reusing a cached one")
+else:
+    generate_clicked = st.button(button_text, type="primary", use_container_width=True)
+    regenerate_clicked = False
+
+# Offer a draft from a near-identical earlier topic instead of a new generation
+near_match = st.session_state.get("near_match")
+if near_match and near_match["scope"] == (platform, tone, length) and near_match["topic"] == topic:
+    st.info(f"♻️ You already generated something very similar ({near_match['similarity']:.0%} match): \"{near_match['match_topic']}\"")
+    st.code(near_match["content"][:500] + ("..." if len(near_match["content"]) > 500 else ""), language="text")
+    use_col, new_col = st.columns(2)
+    with use_col:
+        if st.button("♻️ Use this draft", use_container_width=True):
+            st.session_state.thread = near_match["content"]
+            st.session_state.platform = platform
+            st.session_state.variants = []
+            st.session_state.pop("near_match")
+            st.rerun()
+    with new_col:
+        if st.button("✨ Generate new anyway", use_container_width=True):
+            st.session_state.pop("near_match")
+            st.session_state.force_generate = True
+            st.rerun()
+elif near_match:
+    st.session_state.pop("near_match")
+
+force_generate = st.session_state.pop("force_generate", False)
+
+if generate_clicked or regenerate_clicked or force_generate:
+    bypass_cache = regenerate_clicked
     # Check if using template mode
     template_mode = st.session_state.get("template_mode", False)
 
@@ -1281,6 +1814,17 @@ if st.button(button_text, type="primary", use_container_width=True):
             st.warning(f"⚠️ Please fill in all template fields: {', '.join(missing_fields)}")
             st.stop()
 
+    # Near-duplicate of a topic this user already generated? Offer that draft first
+    if (pro and email and email.strip() and not template_mode and platform in ("X Thread", "LinkedIn Post")
+            and generate_clicked and not force_generate):
+        match = get_topic_index().query(topic_scope(email, platform, tone, length), topic)
+        if match:
+            similarity, entry = match
+            st.session_state.near_match = {
+                "scope": (platform, tone, length), "topic": topic, "similarity": similarity, **entry
+            }
+            st.rerun()
+
     if not pro and st.session_state.gen_count >= 3:
         st.error("🚫 Free limit reached: 3 generations per day")
         st.info(f"💎 [Upgrade to Pro]({STRIPE_PRO_LINK}) for unlimited generations and auto-posting")
@@ -1294,66 +1838,38 @@ if st.button(button_text, type="primary", use_container_width=True):
     if platform == "X Thread":
         # Generate X Thread
         with st.spinner("🤖 Generating your viral thread..."):
-            # If using template, fill it in first
+            # If using template, fill it in first (the topic becomes extra context)
+            filled_template = None
             if template_mode:
                 template_obj = st.session_state.selected_template
                 filled_template = fill_template(template_obj["template"], st.session_state.placeholder_values)
-
-                # Use AI to polish the template if topic provided
-                if topic and topic.strip():
-                    prompt = f"""Enhance this X/Twitter thread with the following context: "{topic}"
-
-Original thread:
-{filled_template}
-
-Requirements:
-- Keep the core message intact
-- Add relevant details based on the context
-- Tone: {tone}
-- Keep each tweet under 280 characters
-- Format: ONE TWEET PER LINE"""
-                else:
-                    # Just format the template as a thread
-                    prompt = f"""Format this content as a {length}-tweet X/Twitter thread:
-
-{filled_template}
-
-Requirements:
-- Tone: {tone}
-- Keep each tweet under 280 characters
-- Format: ONE TWEET PER LINE
-- Maintain the core message"""
-            else:
-                # Standard generation from topic
-                prompt = f"""Create a VIRAL X/Twitter thread about: "{topic}"
-
-Requirements:
-- Exactly {length} tweets
-- Tone: {tone}
-- Structure: Hook → Value → CTA
-- Use relevant emojis
-- Keep each tweet under 280 characters
-- Make it engaging and shareable
-- Format: ONE TWEET PER LINE"""
+            prompt = build_prompt("X Thread", tone, topic=topic, length=length, content=filled_template)
 
             try:
-                model = get_or_create_model()
-                thread = model.generate_content(prompt).text.strip()
-            except Exception as e:
-                error_msg = str(e)
-                if "429" in error_msg or "Resource exhausted" in error_msg:
-                    st.error("⏱️ **API Rate Limit Reached**")
-                    st.warning("The AI service is temporarily at capacity. This happens on the free tier.")
-                    st.info("""
-                    **Solutions:**
-                    1. Wait 1-2 hours and try again
-                    2. Upgrade your Google AI API to paid tier for higher limits
-                    3. Contact support if this persists
-                    """)
+                if prompt.mode == "format":
+                    # Nothing to enhance - split the template locally, no Gemini call
+                    st.session_state.variants = []
+                    thread = "\n".join(split_into_thread(filled_template, length))
+                elif variant_count > 1:
+                    st.session_state.variants = generate_ranked_variants(prompt, variant_count)
+                    thread = st.session_state.variants[0]["text"]
                 else:
-                    st.error(f"❌ AI generation failed: {error_msg}")
+                    st.session_state.variants = []
+                    thread = generate_with_preview(prompt, bypass_cache=bypass_cache)
+            except Exception as e:
+                show_generation_error(e, refund=not pro)
                 st.stop()
 
+            # Fix tweets over the weighted 280 limit now rather than mid-post
+            if over_limit(split_tweets(thread)):
+                with st.spinner("✂️ Shortening tweets over 280 characters..."):
+                    repaired, truncated = shorten_long_tweets(thread)
+                if truncated:
+                    st.warning(f"⚠️ Tweet(s) {', '.join(str(i + 1) for i in truncated)} had to be trimmed to fit 280 characters")
+                if st.session_state.variants:
+                    st.session_state.variants[0]["text"] = repaired
+                thread = repaired
+
         st.session_state.thread = thread
         st.session_state.platform = "X Thread"
         st.session_state.remaining = remaining
@@ -1380,68 +1896,22 @@ Requirements:
     elif platform == "LinkedIn Post":
         # Generate LinkedIn Post (Pro feature)
         with st.spinner("💼 Generating your professional LinkedIn post..."):
-            # If using template, fill it in first
+            # If using template, fill it in first (the topic becomes extra context)
+            filled_template = None
             if template_mode:
                 template_obj = st.session_state.selected_template
                 filled_template = fill_template(template_obj["template"], st.session_state.placeholder_values)
-
-                # Use AI to enhance template if topic provided
-                if topic and topic.strip():
-                    prompt = f"""Enhance this LinkedIn post with additional context: "{topic}"
-
-Original post:
-{filled_template}
-
-Requirements:
-- Keep the core message intact
-- Add relevant details based on the context
-- Tone: {tone}
-- LinkedIn best practices: Professional yet engaging
-- 1300-3000 characters optimal
-- End with 3-5 relevant hashtags"""
-                else:
-                    # Just format and optimize the template
-                    prompt = f"""Optimize this LinkedIn post:
-
-{filled_template}
-
-Requirements:
-- Tone: {tone}
-- LinkedIn best practices applied
-- Add line breaks for readability
-- End with 3-5 relevant hashtags
-- Keep the core message intact"""
-            else:
-                # Standard generation from topic
-                prompt = f"""Create a VIRAL LinkedIn post about: "{topic}"
-
-Requirements:
-- Tone: {tone}
-- LinkedIn best practices: Hook in first line, value-driven content
-- 1300-3000 characters (LinkedIn optimal length)
-- Professional yet engaging
-- Include relevant emojis (LinkedIn-appropriate)
-- Structure: Hook → Story/Insight → Value → CTA
-- Use line breaks for readability
-- End with 3-5 relevant hashtags
-- Make it shareable and comment-worthy"""
+            prompt = build_prompt("LinkedIn Post", tone, topic=topic, content=filled_template)
 
             try:
-                model = get_or_create_model()
-                linkedin_post = model.generate_content(prompt).text.strip()
-            except Exception as e:
-                error_msg = str(e)
-                if "429" in error_msg or "Resource exhausted" in error_msg:
-                    st.error("⏱️ **API Rate Limit Reached**")
-                    st.warning("The AI service is temporarily at capacity.")
-                    st.info("""
-                    **Solutions:**
-                    1. Wait 1-2 hours and try again
-                    2. Upgrade your Google AI API to paid tier
-                    3. Contact support if this persists
-                    """)
+                if variant_count > 1:
+                    st.session_state.variants = generate_ranked_variants(prompt, variant_count)
+                    linkedin_post = st.session_state.variants[0]["text"]
                 else:
-                    st.error(f"❌ AI generation failed: {error_msg}")
+                    st.session_state.variants = []
+                    linkedin_post = generate_with_preview(prompt, bypass_cache=bypass_cache)
+            except Exception as e:
+                show_generation_error(e, refund=not pro)
                 st.stop()
 
         st.session_state.thread = linkedin_post
@@ -1474,70 +1944,41 @@ Requirements:
             st.warning("💡 Need more? Contact support for enterprise pricing.")
             st.stop()
 
+        # Stability AI configuration
+        stability_api_key = st.secrets.get("STABILITY_API_KEY", "")
+
+        # "Regenerate" asks for new images, so new seeds (and cache keys)
+        seed_salt = random.randrange(1, 2**31) if bypass_cache else 0
+
+        # Slide images start while the captions are still streaming: each image
+        # request goes out as soon as its "SLIDE X: Title" line is complete.
+        # All slides share the image pool; the provider cap bounds in-flight
+        # Stability requests across every session
+        image_batch = None
+        on_text = None
+        if stability_api_key:
+            image_batch = new_image_batch(topic, seed_salt, DRAFT_STEPS if draft_images else FINAL_STEPS)
+            slide_stream = SlideStream()
+
+            def on_text(text):
+                for title in slide_stream.feed(text):
+                    image_batch.submit(title)
+
         # Generate Instagram Carousel
         with st.spinner("🎨 Generating your Instagram carousel..."):
-            # If using template, fill it in first
+            # If using template, fill it in first (the topic becomes extra context)
+            filled_template = None
             if template_mode:
                 template_obj = st.session_state.selected_template
                 filled_template = fill_template(template_obj["template"], st.session_state.placeholder_values)
-
-                # Use AI to enhance template if topic provided
-                if topic and topic.strip():
-                    prompt = f"""Enhance this Instagram carousel with additional context: "{topic}"
-
-Original carousel:
-{filled_template}
-
-Requirements:
-- Keep the core message intact
-- Add relevant details based on the context
-- Tone: {tone}
-- Each slide: SLIDE X: [Title] format
-- Use relevant emojis
-- Make it visually engaging"""
-                else:
-                    # Just optimize the template
-                    prompt = f"""Optimize this Instagram carousel:
-
-{filled_template}
-
-Requirements:
-- Tone: {tone}
-- Each slide: SLIDE X: [Title] format
-- Use relevant emojis
-- Keep the core message intact"""
-            else:
-                # Standard generation from topic
-                prompt = f"""Create a VIRAL Instagram carousel about: "{topic}"
-
-Requirements:
-- Exactly {length} slides
-- Tone: {tone}
-- Each slide should have a catchy title (max 5 words) and description (2-3 sentences)
-- Use relevant emojis
-- Make it visually engaging and shareable
-- Format: For each slide, write:
-  SLIDE X: [Title]
-  [Description]
-
-  One slide per section."""
+            prompt = build_prompt("Instagram Carousel", tone, topic=topic, length=length, content=filled_template)
 
             try:
-                model = get_or_create_model()
-                carousel = model.generate_content(prompt).text.strip()
+                carousel = generate_with_preview(prompt, bypass_cache=bypass_cache, on_text=on_text)
             except Exception as e:
-                error_msg = str(e)
-                if "429" in error_msg or "Resource exhausted" in error_msg:
-                    st.error("⏱️ **API Rate Limit Reached**")
-                    st.warning("The AI service is temporarily at capacity. This happens on the free tier.")
-                    st.info("""
-                    **Solutions:**
-                    1. Wait 1-2 hours and try again
-                    2. Upgrade your Google AI API to paid tier for higher limits
-                    3. Contact support if this persists
-                    """)
-                else:
-                    st.error(f"❌ AI generation failed: {error_msg}")
+                if image_batch:
+                    image_batch.cancel()
+                show_generation_error(e, refund=not pro)
                 st.stop()
 
         # Generate AI images with Stability AI
@@ -1545,91 +1986,20 @@ Requirements:
         generation_errors = []
 
         # Parse carousel to extract slide titles
-        slides = []
-        for line in carousel.split('\n'):
-            # Remove markdown formatting (**, *, etc.) before checking
-            clean_line = line.strip().lstrip('*').strip()
-            if clean_line.startswith('SLIDE'):
-                if ':' in clean_line:
-                    # Extract title after colon, remove any trailing markdown
-                    title = clean_line.split(':', 1)[1].strip().rstrip('*').strip()
-                    slides.append(title)
-
-        # Stability AI configuration
-        stability_api_key = st.secrets.get("STABILITY_API_KEY", "")
+        slides = [slide['title'] for slide in parse_slides(carousel)]
 
         if not stability_api_key:
             st.warning("⚠️ Stability AI API key not configured. Images will not be generated.")
             st.info("Add STABILITY_API_KEY to your secrets to enable AI image generation.")
         else:
-            with st.spinner(f"🖼️ Generating {length} AI images for your carousel..."):
-                # Generate images using Stability AI API
-                api_host = "https://api.stability.ai"
-
-                for i, slide_title in enumerate(slides, 1):
-                    try:
-                        # Create image prompt
-                        img_prompt = f"Professional Instagram carousel image: {slide_title}. Topic: {topic}. Style: modern, clean, vibrant, social media optimized, no text overlay"
-
-                        # Call Stability AI API
-                        response = requests.post(
-                            f"{api_host}/v1/generation/stable-diffusion-xl-1024-v1-0/text-to-image",
-                            headers={
-                                "Content-Type": "application/json",
-                                "Accept": "application/json",
-                                "Authorization": f"Bearer {stability_api_key}"
-                            },
-                            json={
-                                "text_prompts": [{"text": img_prompt}],
-                                "cfg_scale": 7,
-                                "height": 1024,
-                                "width": 1024,
-                                "samples": 1,
-                                "steps": 30,
-                            },
-                            timeout=60
-                        )
-
-                        if response.status_code == 200:
-                            data = response.json()
-                            for artifact in data.get("artifacts", []):
-                                if artifact.get("finishReason") == "SUCCESS":
-                                    img_base64 = artifact.get("base64")
-                                    img_bytes = base64.b64decode(img_base64)
-
-                                    carousel_images.append({
-                                        'data': img_bytes,
-                                        'slide_num': i,
-                                        'title': slide_title
-                                    })
-                                    break
-                        else:
-                            error_detail = f"API returned {response.status_code}"
-                            try:
-                                error_body = response.json()
-                                if 'message' in error_body:
-                                    error_detail += f": {error_body['message']}"
-                            except:
-                                pass
-                            generation_errors.append(f"Slide {i}: {error_detail}")
-                            continue
-
-                    except Exception as e:
-                        generation_errors.append(f"Slide {i}: {str(e)}")
-                        continue
-
-        # Show consolidated error messages OUTSIDE spinner
-        if generation_errors:
-            st.warning("⚠️ Some images failed to generate:")
-            for error in generation_errors[:3]:  # Show first 3 errors
-                st.caption(f"• {error}")
-            if len(generation_errors) > 3:
-                st.caption(f"• ... and {len(generation_errors) - 3} more errors")
+            # Submits any slide the stream didn't (cache hit, non-streaming) and
+            # drops streamed titles that aren't in the final text
+            carousel_images, generation_errors = render_slide_images(image_batch, slides)
 
         # Always show status of image generation
         if stability_api_key and not carousel_images:
             if generation_errors:
-                st.error("❌ All image generations failed. Check errors above.")
+                st.error("❌ All image generations failed. See the failed slides below to retry them.")
             else:
                 st.error("❌ No images were generated and no errors were logged. This may indicate:")
                 st.info("1. The API key format is incorrect\n2. Network timeout issues\n3. Invalid API response format")
@@ -1643,6 +2013,9 @@ Requirements:
 
         st.session_state.carousel = carousel
         st.session_state.carousel_images = carousel_images
+        st.session_state.carousel_image_failures = dict(image_batch.failures) if image_batch else {}
+        # Final renders of approved drafts must reuse the drafts' seeds
+        st.session_state.carousel_image_settings = {"topic": topic, "seed_salt": seed_salt}
         st.session_state.platform = "Instagram Carousel"
 
         # Track analytics (Pro users only)
@@ -1675,6 +2048,13 @@ Requirements:
         # Save to Supabase
         save_thread_to_history(email, platform, content)
 
+        # Index the topic so a rephrasing of it can reuse this draft
+        if not template_mode and platform in ("X Thread", "LinkedIn Post"):
+            get_topic_index().add(
+                topic_scope(email, platform, tone, length), topic, {"match_topic": topic, "content": content},
+                size=len(topic.encode()) + len(content.encode())
+            )
+
     # Don't rerun - let the error messages display and content show naturally below
 
 # === DISPLAY ===
@@ -1686,6 +2066,20 @@ if "thread" in st.session_state and st.session_state.thread:
     else:
         st.subheader("🎉 Your Viral Thread")
 
+    # Variant picker - ranked best first, the chosen one becomes the thread
+    variants = st.session_state.get("variants") or []
+    if len(variants) > 1:
+        labels = [
+            f"#{i + 1} · score {v['score']:.2f} · {(v['text'].strip().splitlines() or [''])[0][:60]}"
+            for i, v in enumerate(variants)
+        ]
+        texts = [v["text"] for v in variants]
+        current = texts.index(st.session_state.thread) if st.session_state.thread in texts else 0
+        choice = st.radio("Pick a variant", range(len(variants)), index=current, format_func=lambda i: labels[i])
+        if texts[choice] != st.session_state.thread and st.session_state.thread in texts:
+            st.session_state.thread = texts[choice]
+            st.rerun()
+
     # Edit mode (Pro only)
     if pro:
         edit_mode = st.checkbox("✏️ Edit before posting", value=False, help="Pro feature: Edit your thread before posting")
@@ -1709,6 +2103,45 @@ if "thread" in st.session_state and st.session_state.thread:
         # Free users - read-only preview
         st.code(st.session_state.thread, language="text")
 
+    # Weighted length check (URLs count 23, emoji/CJK double) - catches edits and picked variants
+    if st.session_state.get("platform") == "X Thread":
+        tweets = split_tweets(st.session_state.thread)
+        long_tweets = over_limit(tweets)
+        if long_tweets:
+            details = ", ".join(f"#{i + 1} ({weighted_length(tweets[i])}/{MAX_WEIGHTED_LENGTH})" for i in long_tweets)
+            st.warning(f"⚠️ {len(long_tweets)} tweet(s) are too long for X: {details}")
+            if st.button("✂️ Shorten long tweets", help="Rewrites only the tweets that are over the limit"):
+                with st.spinner("✂️ Shortening..."):
+                    try:
+                        st.session_state.thread, _ = shorten_long_tweets(st.session_state.thread)
+                    except Exception as e:
+                        show_generation_error(e, refund=False)
+                        st.stop()
+                st.rerun()
+
+    # Regenerate a single tweet (Pro) - sends only that tweet and its neighbours
+    if pro and st.session_state.get("platform") == "X Thread":
+        with st.expander("🎯 Regenerate individual tweets", expanded=False):
+            tweets = split_tweets(st.session_state.thread)
+            for i, tweet in enumerate(tweets):
+                text_col, button_col = st.columns([6, 1])
+                with text_col:
+                    st.markdown(f"**{i + 1}.** {tweet}")
+                    st.caption(f"{weighted_length(tweet)}/{MAX_WEIGHTED_LENGTH}")
+                with button_col:
+                    if st.button("🔄", key=f"regen_tweet_{i}", help=f"Regenerate tweet {i + 1} only"):
+                        with st.spinner(f"🔄 Rewriting tweet {i + 1}..."):
+                            try:
+                                new_tweet = generate_once(build_item_prompt("X Thread", tone, tweets, i, topic))
+                                thread = replace_tweet(st.session_state.thread, i, new_tweet)
+                                if over_limit(split_tweets(thread)):
+                                    thread, _ = shorten_long_tweets(thread)
+                            except Exception as e:
+                                show_generation_error(e, refund=False)
+                                st.stop()
+                        st.session_state.thread = thread
+                        st.rerun()
+
     # Action buttons
     col1, col2, col3 = st.columns(3)
 
@@ -1748,12 +2181,17 @@ if "thread" in st.session_state and st.session_state.thread:
                                 access_token_secret=st.session_state.x_access_secret,
                             )
 
-                            tweets = [t.strip() for t in st.session_state.thread.split("\n") if t.strip()]
+                            tweets = split_tweets(st.session_state.thread)
 
                             if not tweets:
                                 st.error("❌ No tweets to post!")
                                 st.stop()
 
+                            # Don't start a thread that would fail halfway through
+                            if over_limit(tweets):
+                                st.error("❌ Some tweets are over 280 characters. Shorten them before posting.")
+                                st.stop()
+
                             # Post first tweet
                             first = client.create_tweet(text=tweets[0])
                             tid = first.data["id"]
@@ -1891,18 +2329,100 @@ if "carousel" in st.session_state and st.session_state.carousel and st.session_s
     st.markdown("### 📝 Carousel Captions")
     st.code(st.session_state.carousel, language="text")
 
+    # Regenerate a single slide's text (Pro) - sends only that slide and its neighbours
+    if pro:
+        with st.expander("🎯 Regenerate individual slides", expanded=False):
+            slides = parse_slides(st.session_state.carousel)
+            slide_texts = [slide_text(slide) for slide in slides]
+            for i, slide in enumerate(slides):
+                text_col, button_col = st.columns([6, 1])
+                with text_col:
+                    st.markdown(f"**Slide {slide['num']}: {slide['title']}**")
+                    st.caption(slide['body'])
+                with button_col:
+                    if st.button("🔄", key=f"regen_slide_{i}", help=f"Regenerate slide {slide['num']} only"):
+                        with st.spinner(f"🔄 Rewriting slide {slide['num']}..."):
+                            try:
+                                new_slide = generate_once(build_item_prompt("Instagram Carousel", tone, slide_texts, i, topic))
+                            except Exception as e:
+                                show_generation_error(e, refund=False)
+                                st.stop()
+                        st.session_state.carousel = replace_slide(st.session_state.carousel, slide['num'], new_slide)
+                        st.rerun()
+
     # Display generated images if available
     if st.session_state.carousel_images:
         st.markdown("### 🖼️ AI-Generated Images")
 
+        drafts = [img for img in st.session_state.carousel_images if img['steps'] < FINAL_STEPS]
+        approved = []
+        expired = []
         for img_data in st.session_state.carousel_images:
-            st.markdown(f"**Slide {img_data['slide_num']}: {img_data['title']}**")
-
-            # Convert bytes to image and display
-            img = Image.open(io.BytesIO(img_data['data']))
-            st.image(img, use_container_width=True)
+            is_draft = img_data['steps'] < FINAL_STEPS
+            st.markdown(f"**Slide {img_data['slide_num']}: {img_data['title']}**" + (" · _draft_" if is_draft else ""))
+
+            # Image bytes live in the blob store; evicted or expired ones can be retried.
+            # The precomputed preview is sent as is - no decode, a fraction of the PNG
+            preview = None
+            if 'thumb' in img_data['renditions']:
+                preview = get_blob_store().read(img_data['renditions']['thumb'])
+            if preview is not None:
+                st.image(preview, use_container_width=True)
+            else:
+                image_file = get_blob_store().open(img_data['handle'])
+                if image_file is None:
+                    st.caption("⌛ This image has expired")
+                    expired.append(img_data)
+                    continue
+                with image_file:
+                    img = Image.open(image_file)
+                    st.image(img, use_container_width=True)
+            if is_draft and st.checkbox("Approve for full quality", key=f"approve_slide_{img_data['slide_num']}"):
+                approved.append(img_data)
             st.markdown("---")
 
+        if expired:
+            for img_data in expired:
+                st.session_state.carousel_image_failures[img_data['slide_num']] = {
+                    'title': img_data['title'], 'error': "Image expired", 'steps': img_data['steps']
+                }
+            st.session_state.carousel_images = [img for img in st.session_state.carousel_images if img not in expired]
+
+        # Second phase of draft mode: full renders of the approved slides only,
+        # with the drafts' seeds so they keep the same composition
+        if drafts:
+            if st.button(f"🎨 Render {len(approved)} approved slide(s) in full quality", disabled=not approved, type="primary"):
+                settings = st.session_state.carousel_image_settings
+                batch = new_image_batch(settings["topic"], settings["seed_salt"], FINAL_STEPS)
+                finals, _ = render_slide_images(
+                    batch,
+                    [img['title'] for img in approved],
+                    [img['slide_num'] for img in approved]
+                )
+                # A failed final keeps its draft on screen and can be retried below
+                st.session_state.carousel_images = merge_slide_images(st.session_state.carousel_images, finals)
+                st.session_state.carousel_image_failures.update(batch.failures)
+                st.rerun()
+
+    # Failed slides keep their title and settings, so a retry resends only
+    # those image requests - no new captions, no repeat of finished images
+    failures = st.session_state.carousel_image_failures
+    if failures:
+        st.warning(f"⚠️ {len(failures)} slide image(s) failed:")
+        for num in sorted(failures):
+            st.caption(f"• Slide {num}: {failures[num]['title']} - {failures[num]['error']}")
+        if st.button(f"🔁 Retry {len(failures)} failed slide(s)", use_container_width=True):
+            settings = st.session_state.carousel_image_settings
+            still_failing = {}
+            for steps in sorted({failure['steps'] for failure in failures.values()}):
+                nums = sorted(num for num, failure in failures.items() if failure['steps'] == steps)
+                batch = new_image_batch(settings["topic"], settings["seed_salt"], steps)
+                retried, _ = render_slide_images(batch, [failures[num]['title'] for num in nums], nums)
+                st.session_state.carousel_images = merge_slide_images(st.session_state.carousel_images, retried)
+                still_failing.update(batch.failures)
+            st.session_state.carousel_image_failures = still_failing
+            st.rerun()
+
     # Action buttons
     col1, col2 = st.columns(2)
 
@@ -1925,32 +2445,35 @@ if "carousel" in st.session_state and st.session_state.carousel and st.session_s
 
     with col2:
         if st.session_state.carousel_images:
-            # Download ZIP with images and captions
-            if st.button("📦 Download ZIP (Images + Captions)", use_container_width=True, type="primary"):
-                with st.spinner("📦 Preparing your carousel package..."):
-                    # Create ZIP file in memory
-                    zip_buffer = io.BytesIO()
-
-                    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                        # Add captions file (with footer for non-Visual Pack users)
-                        captions_content = carousel_with_footer if not visual_pack else st.session_state.carousel
-                        zip_file.writestr("captions.txt", captions_content)
-
-                        # Add images
-                        for img_data in st.session_state.carousel_images:
-                            img_filename = f"slide_{img_data['slide_num']:02d}.png"
-                            zip_file.writestr(img_filename, img_data['data'])
-
-                    zip_buffer.seek(0)
-
-                    st.download_button(
-                        "✅ Click to Download ZIP",
-                        zip_buffer,
-                        "instagram_carousel.zip",
-                        mime="application/zip",
-                        use_container_width=True
-                    )
-                    st.success("✅ Carousel package ready!")
+            # Download ZIP with images and captions - built once per content change
+            # (normally right as generation finishes), not on every click
+            package = ensure_carousel_package(carousel_with_footer)
+            if package is not None:
+                store = get_blob_store()
+                session_id = st.session_state.blob_session
+                files = carousel_package_files()
+
+                def read_carousel_package(package=package, captions=carousel_with_footer):
+                    # Read only when clicked, not on every rerun. If the package was evicted
+                    # since this rerun, rebuild it; failing the download beats an empty ZIP
+                    data = store.read(package)
+                    if data is None:
+                        rebuilt = build_carousel_package(store, session_id, captions, files)
+                        data = store.read(rebuilt) if rebuilt else None
+                    if data is None:
+                        raise RuntimeError("Carousel images have expired - generate them again to download")
+                    return data
+
+                st.download_button(
+                    "📦 Download ZIP (Images + Captions)",
+                    read_carousel_package,
+                    "instagram_carousel.zip",
+                    mime="application/zip",
+                    use_container_width=True,
+                    type="primary"
+                )
+            else:
+                st.warning("⚠️ Couldn't build the ZIP - some slide images have expired. Retry them above.")
         else:
             st.info("🎨 Images not generated - use tools below to create them")
 
@@ -1967,7 +2490,7 @@ if "carousel" in st.session_state and st.session_state.carousel and st.session_s
         st.success("""
         **Your carousel is ready!**
         1. Download the ZIP file above
-        2. Upload images to Instagram in order (slide_01.png, slide_02.png, etc.)
+        2. Upload images to Instagram in order (slide_01.jpg, slide_02.jpg, etc.) from the square or portrait folder
         3. Copy-paste the captions from the txt file
         4. Post and watch the engagement roll in! 🚀
         """)
@@ -0,0 +1,319 @@
+"""
+Batch generation for XThreadMaster
+Turns a CSV/JSONL file of topics into a ZIP of generated threads, posts and
+carousels. Rows run on a bounded worker pool, each row is retried on its own,
+and every finished row is saved to a work directory so a crashed batch picks
+up where it left off. Used by the Streamlit batch uploader and as a CLI:
+
+    GEMINI_API_KEY=... python batch.py topics.csv --out threads.zip
+
+Columns: topic, platform, tone, length, template (template id). Any other
+columns (or a "placeholders" object in JSONL) fill the template's placeholders.
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+import metrics
+from prompts import PLATFORMS, build_prompt, build_repair_prompt
+from templates import fill_template, get_template_by_id
+from thread_splitter import split_into_thread
+from tweet_length import over_limit, repair_thread, split_tweets
+
+BASE_FIELDS = ("topic", "platform", "tone", "length", "template", "placeholders")
+DEFAULT_LENGTHS = {"X Thread": 8, "LinkedIn Post": None, "Instagram Carousel": 7}
+# Same ranges as the app's length sliders (tweets / slides)
+LENGTH_RANGES = {"X Thread": (5, 15), "Instagram Carousel": (5, 10)}
+MAX_ROWS = 500
+
+class BatchError(Exception):
+    """Raised for batch files that can't be processed"""
+
+def parse_rows(data: bytes, filename: str, platforms=PLATFORMS) -> List[Dict]:
+    """
+    Parse and normalize a CSV or JSONL batch file
+
+    Args:
+        data: File contents
+        filename: Used to tell JSONL from CSV
+        platforms: Platforms the user's plan can generate
+
+    Raises:
+        BatchError for unknown or unavailable platforms, missing topics/templates,
+        lengths outside the app's ranges or oversized files
+    """
+    text = data.decode("utf-8-sig")
+    if filename.lower().endswith((".jsonl", ".json")):
+        raw = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        raw = list(csv.DictReader(io.StringIO(text)))
+
+    if len(raw) > MAX_ROWS:
+        raise BatchError(f"Batch has {len(raw)} rows, the limit is {MAX_ROWS}")
+
+    rows = []
+    for number, item in enumerate(raw, start=1):
+        item = {str(k).strip().lower(): v for k, v in item.items() if k}
+        platform = (item.get("platform") or "X Thread").strip()
+        if platform not in PLATFORMS:
+            raise BatchError(f"Row {number}: unknown platform '{platform}'")
+        if platform not in platforms:
+            raise BatchError(f"Row {number}: {platform} isn't available on your plan")
+
+        template = (item.get("template") or "").strip() or None
+        if template and not get_template_by_id(template):
+            raise BatchError(f"Row {number}: unknown template '{template}'")
+
+        topic = (item.get("topic") or "").strip()
+        if not topic and not template:
+            raise BatchError(f"Row {number}: needs a topic or a template")
+
+        length = str(item.get("length") or "").strip()
+        try:
+            length = int(length) if length else DEFAULT_LENGTHS[platform]
+        except ValueError:
+            raise BatchError(f"Row {number}: length must be a number, got '{length}'")
+        if platform in LENGTH_RANGES:
+            low, high = LENGTH_RANGES[platform]
+            if not low <= length <= high:
+                raise BatchError(f"Row {number}: {platform} length must be {low}-{high}, got {length}")
+
+        placeholders = item.get("placeholders")
+        if not isinstance(placeholders, dict):
+            placeholders = {k: str(v) for k, v in item.items() if k not in BASE_FIELDS and v not in (None, "")}
+
+        rows.append({
+            "topic": topic,
+            "platform": platform,
+            "tone": (item.get("tone") or "Casual").strip(),
+            "length": length if platform != "LinkedIn Post" else None,
+            "template": template,
+            "placeholders": placeholders
+        })
+    return rows
+
+def row_key(index: int, row: Dict) -> str:
+    """Stable file name for a row; changes if the row's content changes"""
+    digest = hashlib.sha256(json.dumps(row, sort_keys=True).encode()).hexdigest()[:10]
+    return f"{index + 1:04d}-{digest}"
+
+def generate_row(row: Dict, generate: Callable) -> str:
+    """
+    Generate one row's content
+
+    Args:
+        row: Normalized row from parse_rows
+        generate: Called with a BuiltPrompt, returns the generated text
+    """
+    filled = None
+    if row["template"]:
+        filled = fill_template(get_template_by_id(row["template"])["template"], row["placeholders"])
+
+    prompt = build_prompt(row["platform"], row["tone"], topic=row["topic"], length=row["length"], content=filled)
+    if row["platform"] == "X Thread" and prompt.mode == "format":
+        return "\n".join(split_into_thread(filled, row["length"]))
+
+    text = generate(prompt)
+    if row["platform"] == "X Thread" and over_limit(split_tweets(text)):
+        text, _ = repair_thread(text, lambda tweet, length: generate(build_repair_prompt(tweet, length)))
+    return text
+
+def pending_rows(rows: List[Dict], work_dir: str) -> List[Dict]:
+    """Rows a run would generate: those not already finished in `work_dir`"""
+    return [row for i, row in enumerate(rows) if not os.path.exists(os.path.join(work_dir, f"{row_key(i, row)}.txt"))]
+
+def default_work_dir(data: bytes, owner: str = "") -> str:
+    """
+    Work directory keyed by who runs the batch and the file's content, so
+    re-running the same file resumes but two users uploading the same file
+    never share drafts or an archive
+    """
+    owner_hash = hashlib.sha256(owner.strip().lower().encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), "xthread_batch", owner_hash, hashlib.sha256(data).hexdigest()[:16])
+
+def _write_atomic(path: str, text: str):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def _archive_name(key: str, row: Dict) -> str:
+    slug = "".join(c if c.isalnum() else "-" for c in (row["topic"] or row["template"]).lower())[:40].strip("-")
+    folder = row["platform"].lower().replace(" ", "_")
+    return f"{folder}/{key}-{slug or 'untitled'}.txt"
+
+def run_batch(
+    rows: List[Dict],
+    generate: Callable,
+    out_path: str,
+    work_dir: str,
+    workers: int = 4,
+    retries: int = 2,
+    on_progress: Optional[Callable[[int, int, int], None]] = None,
+    sleep: Callable[[float], None] = time.sleep
+) -> Dict:
+    """
+    Run a batch and write the ZIP archive
+
+    Rows already finished in `work_dir` (from an earlier, interrupted run)
+    are not regenerated. New results are written to the archive as they
+    complete, alongside a manifest.csv with every row's status.
+
+    Args:
+        rows: Normalized rows from parse_rows
+        generate: Called with a BuiltPrompt, returns text (thread-safe)
+        out_path: Where to write the ZIP
+        work_dir: Directory holding finished rows (for resuming)
+        workers: Concurrent generations
+        retries: Extra attempts per row before it's marked failed
+        on_progress: Called as on_progress(done, failed, total) from the calling thread
+
+    Returns:
+        Summary dict: total, done, failed, resumed, errors {row key: message},
+        generated {platform: rows generated by this run}
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    keys = [row_key(i, row) for i, row in enumerate(rows)]
+    finished = {key for key in keys if os.path.exists(os.path.join(work_dir, f"{key}.txt"))}
+    errors: Dict[str, str] = {}
+    generated: Dict[str, int] = {}
+
+    def attempt(key, row):
+        for n in range(retries + 1):
+            try:
+                text = generate_row(row, generate)
+                _write_atomic(os.path.join(work_dir, f"{key}.txt"), text)
+                return text
+            except Exception:
+                if n == retries:
+                    raise
+                metrics.increment("batch.retries")
+                sleep(min(30.0, random.uniform(0, 2 ** n)))
+
+    with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for key, row in zip(keys, rows):
+            if key in finished:
+                with open(os.path.join(work_dir, f"{key}.txt"), encoding="utf-8") as f:
+                    archive.writestr(_archive_name(key, row), f.read())
+
+        done = len(finished)
+        if on_progress:
+            on_progress(done, 0, len(rows))
+
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as pool:
+            futures = {
+                pool.submit(attempt, key, row): (key, row)
+                for key, row in zip(keys, rows) if key not in finished
+            }
+            for future in as_completed(futures):
+                key, row = futures[future]
+                try:
+                    archive.writestr(_archive_name(key, row), future.result())
+                    done += 1
+                    generated[row["platform"]] = generated.get(row["platform"], 0) + 1
+                    metrics.increment("batch.rows_done")
+                except Exception as e:
+                    errors[key] = str(e)
+                    metrics.increment("batch.rows_failed")
+                if on_progress:
+                    on_progress(done, len(errors), len(rows))
+
+        manifest = io.StringIO()
+        writer = csv.writer(manifest)
+        writer.writerow(["row", "platform", "topic", "template", "status", "file", "error"])
+        for key, row in zip(keys, rows):
+            ok = key not in errors
+            writer.writerow([
+                key, row["platform"], row["topic"], row["template"] or "",
+                "done" if ok else "failed", _archive_name(key, row) if ok else "", errors.get(key, "")
+            ])
+        archive.writestr("manifest.csv", manifest.getvalue())
+
+    return {
+        "total": len(rows),
+        "done": done,
+        "failed": len(errors),
+        "resumed": len(finished),
+        "errors": errors,
+        "generated": generated
+    }
+
+def gemini_generator(api_key: str, model_names: List[str], rpm: float = 15):
+    """generate(prompt) for the CLI: model router plus admission control, like the app"""
+    import google.generativeai as genai
+    from admission import AdmissionController
+    from generation import generate_text
+    from model_router import ModelRouter
+
+    genai.configure(api_key=api_key)
+    router = ModelRouter([(name, name) for name in model_names])
+    admission = AdmissionController(requests_per_minute=rpm, queue_timeout=120)
+    models = {}
+
+    def model_for(name, system_instruction):
+        if (name, system_instruction) not in models:
+            models[(name, system_instruction)] = genai.GenerativeModel(name, system_instruction=system_instruction)
+        return models[(name, system_instruction)]
+
+    def generate(prompt):
+        tokens = prompt.input_tokens + prompt.max_output_tokens
+        admit = admission.acquirer(tokens)
+        return admission.call(
+            lambda: router.call(lambda name: generate_text(
+                model_for(name, prompt.system_instruction),
+                prompt.text,
+                stream=False,
+                generation_config=prompt.generation_config
+            ), admit=admit),
+            tokens=tokens,
+            admit=False
+        )
+
+    return generate
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a batch of threads/posts/carousels into a ZIP")
+    parser.add_argument("input", help="CSV or JSONL file of topics")
+    parser.add_argument("--out", default="xthreadmaster_batch.zip", help="ZIP file to write")
+    parser.add_argument("--work-dir", help="Directory for finished rows (default: derived from the input, so re-runs resume)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--rpm", type=float, default=15, help="Gemini requests per minute")
+    parser.add_argument("--models", default="gemini-2.0-flash-exp,gemini-1.5-flash,gemini-1.5-pro")
+    args = parser.parse_args()
+
+    api_key = os.environ.get("GEMINI_API_KEY", "")
+    if not api_key:
+        raise SystemExit("GEMINI_API_KEY must be set")
+
+    with open(args.input, "rb") as f:
+        data = f.read()
+    try:
+        rows = parse_rows(data, args.input)
+    except BatchError as e:
+        raise SystemExit(f"❌ {e}")
+
+    work_dir = args.work_dir or default_work_dir(data)
+    generate = gemini_generator(api_key, args.models.split(","), args.rpm)
+    summary = run_batch(
+        rows, generate, args.out, work_dir,
+        workers=args.workers,
+        retries=args.retries,
+        on_progress=lambda done, failed, total: print(f"\r📦 {done}/{total} done, {failed} failed", end="", flush=True)
+    )
+    print(f"\n✅ Wrote {args.out} ({summary['done']}/{summary['total']} rows, {summary['resumed']} resumed)")
+    for key, error in summary["errors"].items():
+        print(f"❌ {key}: {error}")
+
+if __name__ == "__main__":
+    main()
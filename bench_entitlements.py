@@ -0,0 +1,102 @@
+"""
+Benchmark for Stripe entitlement lookups
+Runs against a local stub Stripe server with artificial latency and compares
+the old sequential per-customer lookup with fetch_entitlement
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from subscriptions import fetch_entitlement
+
+RTT = 0.05  # Simulated Stripe round-trip in seconds
+CUSTOMERS = 5
+
+def make_subscription(customer_id, amount):
+    return {
+        "id": f"sub_{customer_id}",
+        "status": "active",
+        "current_period_end": 1900000000,
+        "items": {"data": [{"price": {"unit_amount": amount, "recurring": {"interval": "month"}}}]}
+    }
+
+class StubStripe(BaseHTTPRequestHandler):
+    # Only the last customer holds the paid subscription (worst case)
+    expand_supported = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(RTT)
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        ids = [f"cus_{i}" for i in range(CUSTOMERS)]
+
+        if url.path.endswith("/customers"):
+            custs = []
+            for cid in ids:
+                customer = {"id": cid}
+                if self.expand_supported and "data.subscriptions" in params.get("expand[]", []):
+                    subs = [make_subscription(cid, 1700)] if cid == ids[-1] else []
+                    customer["subscriptions"] = {"data": subs, "has_more": False}
+                custs.append(customer)
+            body = {"data": custs}
+        else:
+            cid = params["customer"][0]
+            body = {"data": [make_subscription(cid, 1700)] if cid == ids[-1] else []}
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def sequential_lookup(email, api_base):
+    """The original get_user_tier loop: one subscriptions call per customer"""
+    custs = requests.get(f"{api_base}/customers", params={"email": email}, timeout=10).json().get("data", [])
+    for c in custs:
+        subs = requests.get(
+            f"{api_base}/subscriptions",
+            params={"customer": c["id"], "status": "active"},
+            timeout=10
+        ).json().get("data", [])
+        if subs:
+            return subs
+    return []
+
+def timed(fn, runs=5):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs
+
+def run_benchmark():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubStripe)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_base = f"http://127.0.0.1:{server.server_port}/v1"
+
+    print("⏱️ Entitlement lookup benchmark")
+    print("=" * 50)
+    print(f"Stub RTT: {RTT * 1000:.0f}ms, customers per email: {CUSTOMERS}")
+
+    legacy = timed(lambda: sequential_lookup("user@example.com", api_base))
+    print(f"\nSequential (old):     {legacy * 1000:7.1f}ms  (~{legacy / RTT:.1f} RTT)")
+
+    expanded = timed(lambda: fetch_entitlement("user@example.com", "sk_test", api_base))
+    print(f"Expanded (1 request): {expanded * 1000:7.1f}ms  (~{expanded / RTT:.1f} RTT)")
+
+    StubStripe.expand_supported = False
+    fanout = timed(lambda: fetch_entitlement("user@example.com", "sk_test", api_base))
+    print(f"Concurrent fan-out:   {fanout * 1000:7.1f}ms  (~{fanout / RTT:.1f} RTT)")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,80 @@
+"""
+Benchmark for the prompt builder
+Reports prompt token counts per platform and mode, the output cap each
+platform is sent with, and how long building a prompt takes. Counts are
+local estimates; set GEMINI_API_KEY to also get Gemini's own count_tokens.
+"""
+
+import os
+import time
+
+from prompts import PLATFORMS, build_item_prompt, build_prompt, count_tokens
+
+TOPIC = "How to build a morning routine that actually sticks"
+TEMPLATE = "\n".join(f"Step {i}: a short line of template content about habits and routines." for i in range(1, 9))
+
+# The old inline topic prompt for X, with every requirement repeated per request
+LEGACY_X_PROMPT = f"""Create a VIRAL X/Twitter thread about: "{TOPIC}"
+
+Requirements:
+- Exactly 8 tweets
+- Tone: Educational
+- Structure: Hook → Value → CTA
+- Use relevant emojis
+- Keep each tweet under 280 characters
+- Make it engaging and shareable
+- Format: ONE TWEET PER LINE"""
+
+def gemini_counter():
+    """count_tokens via the Gemini API, or None without an API key"""
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        return None
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel("gemini-1.5-flash")
+    return lambda text: model.count_tokens(text).total_tokens
+
+def run_benchmark(runs=10000):
+    print("⏱️ Prompt builder benchmark")
+    print("=" * 50)
+    remote = gemini_counter()
+
+    print(f"\n{'Platform':<20}{'Mode':<9}{'Prompt':>8}{'System':>8}{'Max out':>9}" + ("{:>9}".format("Gemini") if remote else ""))
+    for platform in PLATFORMS:
+        length = None if platform == "LinkedIn Post" else 8
+        cases = {
+            "topic": {"topic": TOPIC},
+            "format": {"content": TEMPLATE},
+            "enhance": {"topic": TOPIC, "content": TEMPLATE},
+        }
+        for mode, values in cases.items():
+            prompt = build_prompt(platform, "Educational", length=length, **values)
+            line = f"{platform:<20}{mode:<9}{count_tokens(prompt.text):>8}{count_tokens(prompt.system_instruction):>8}{prompt.max_output_tokens:>9}"
+            if remote:
+                line += f"{remote(prompt.system_instruction + prompt.text):>9}"
+            print(line)
+
+    new_x = build_prompt("X Thread", "Educational", topic=TOPIC, length=8)
+    print(f"\nX topic prompt, old inline: {count_tokens(LEGACY_X_PROMPT)} tokens; "
+          f"new: {count_tokens(new_x.text)} + {count_tokens(new_x.system_instruction)} system")
+
+    # Partial regeneration: one tweet/slide plus its neighbours vs the whole thing
+    tweets = [f"Tweet {i}: a typical tweet about habits and routines that stick. 🚀" for i in range(1, 9)]
+    single = build_item_prompt("X Thread", "Educational", tweets, 3, TOPIC)
+    print(f"One tweet regenerated: {count_tokens(single.text)} prompt tokens, max {single.max_output_tokens} out "
+          f"(full 8-tweet thread: max {new_x.max_output_tokens} out)")
+    slides = [f"SLIDE {i}: Slide title\nTwo or three sentences of description for this slide." for i in range(1, 8)]
+    single = build_item_prompt("Instagram Carousel", "Educational", slides, 2, TOPIC)
+    full = build_prompt("Instagram Carousel", "Educational", topic=TOPIC, length=7)
+    print(f"One slide regenerated: {count_tokens(single.text)} prompt tokens, max {single.max_output_tokens} out "
+          f"(full 7-slide carousel: max {full.max_output_tokens} out)")
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        build_prompt("Instagram Carousel", "Educational", topic=TOPIC, length=8, content=TEMPLATE)
+    elapsed = (time.perf_counter() - start) / runs
+    print(f"Build time: {elapsed * 1e6:.1f}µs per prompt")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,98 @@
+"""
+Benchmark for the near-duplicate topic index
+Fills the index with 100k synthetic topics, each carrying a draft-sized
+payload, and reports insert cost, memory and lookup latency (hits and
+misses) for the full index, then the same fill under the byte cap
+"""
+
+import random
+import time
+import tracemalloc
+
+from metrics import percentile
+from topic_index import ENTRY_OVERHEAD, TopicIndex
+
+ENTRIES = 100_000
+QUERIES = 2000
+SCOPES = 500  # Users/platforms the entries are spread over
+DRAFT_BYTES = 2000  # A generated thread/post, stored as the payload
+# Room for every entry: draft, topic (< 64 chars), 128-byte signature and bookkeeping
+FULL_BYTES = ENTRIES * (DRAFT_BYTES + 256 + ENTRY_OVERHEAD)
+MAX_BYTES = 64 * 1024 * 1024  # The app's default TOPIC_INDEX_MAX_MB
+
+def make_vocabulary(rng, size=3000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 10))) for _ in range(size)]
+
+def fill(index, topics):
+    for i, (scope, topic) in enumerate(topics):
+        draft = f"{i:08d}" * (DRAFT_BYTES // 8)
+        index.add(scope, topic, {"match_topic": topic, "content": draft}, size=len(topic) + len(draft))
+
+def timed_fill(topics, max_bytes):
+    """Fill an index, returning it with the insert cost and traced memory"""
+    # Memory measured on a separate fill - tracemalloc slows inserts down
+    tracemalloc.start()
+    index = TopicIndex(max_entries=ENTRIES, max_bytes=max_bytes)
+    fill(index, topics)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del index
+
+    index = TopicIndex(max_entries=ENTRIES, max_bytes=max_bytes)
+    start = time.perf_counter()
+    fill(index, topics)
+    return index, (time.perf_counter() - start) / len(topics), memory
+
+def report_lookups(index, indexed, vocabulary, rng):
+    """Lookup latency for rephrasings of topics still in the index, and for unseen topics"""
+
+    def timed_queries(queries):
+        latencies = []
+        found = 0
+        for scope, topic in queries:
+            start = time.perf_counter()
+            found += index.query(scope, topic) is not None
+            latencies.append(time.perf_counter() - start)
+        return latencies, found
+
+    # Rephrasings of indexed topics: shuffled words plus a filler word
+    rephrased = []
+    for scope, topic in rng.sample(indexed, QUERIES):
+        words = topic.split()
+        rng.shuffle(words)
+        rephrased.append((scope, "how to " + " ".join(words)))
+    latencies, found = timed_queries(rephrased)
+    print(f"  Near-duplicate lookups: p50 {percentile(latencies, 50) * 1e6:.0f}µs, "
+          f"p95 {percentile(latencies, 95) * 1e6:.0f}µs, {found}/{QUERIES} matched")
+
+    unseen = [(f"user{rng.randrange(SCOPES)}", " ".join(rng.sample(vocabulary, 4))) for _ in range(QUERIES)]
+    latencies, found = timed_queries(unseen)
+    print(f"  Unseen topic lookups:   p50 {percentile(latencies, 50) * 1e6:.0f}µs, "
+          f"p95 {percentile(latencies, 95) * 1e6:.0f}µs, {found}/{QUERIES} false matches")
+
+def run_benchmark():
+    rng = random.Random(7)
+    vocabulary = make_vocabulary(rng)
+    topics = [(f"user{rng.randrange(SCOPES)}", " ".join(rng.sample(vocabulary, rng.randint(3, 6)))) for _ in range(ENTRIES)]
+
+    print("⏱️ Topic index benchmark")
+    print("=" * 50)
+
+    index, insert, memory = timed_fill(topics, FULL_BYTES)
+    assert len(index) == ENTRIES, "FULL_BYTES too small to hold every entry"
+    print(f"Full index: {ENTRIES:,} topics with {DRAFT_BYTES}B drafts, {insert * 1e6:.1f}µs per insert, "
+          f"{index.stats()['bytes'] / 1024 / 1024:.0f}MB accounted, ~{memory / 1024 / 1024:.0f}MB traced")
+    report_lookups(index, topics, vocabulary, rng)
+    del index
+
+    index, insert, memory = timed_fill(topics, MAX_BYTES)
+    stats = index.stats()
+    print(f"Byte-capped index: kept {len(index):,} ({stats['evictions']:,} evicted), {insert * 1e6:.1f}µs per insert, "
+          f"{stats['bytes'] / 1024 / 1024:.0f}MB accounted of a {MAX_BYTES / 1024 / 1024:.0f}MB cap, "
+          f"~{memory / 1024 / 1024:.0f}MB traced")
+    # Nothing was queried during the fill, so LRU eviction kept the newest entries
+    report_lookups(index, topics[-len(index):], vocabulary, rng)
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,40 @@
+"""
+Benchmark for slide image transcoding
+Transcodes a full carousel of 1024×1024 PNGs serially and on a thread pool,
+and compares the bytes sent per page render before (full PNGs) and after
+(precomputed previews)
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from test_transcode import sample_png
+from transcode import transcode_image
+
+SLIDES = 10
+
+def run_benchmark(workers=4):
+    print("⏱️ Image transcoding benchmark")
+    print("=" * 50)
+    pngs = [sample_png(seed=i) for i in range(SLIDES)]
+
+    start = time.perf_counter()
+    renditions = [transcode_image(png) for png in pngs]
+    serial = time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        start = time.perf_counter()
+        list(pool.map(transcode_image, pngs))
+        pooled = time.perf_counter() - start
+
+    print(f"{SLIDES} slides: {serial * 1000:.0f}ms serial, {pooled * 1000:.0f}ms on {workers} workers "
+          f"({serial / SLIDES * 1000:.0f}ms per image)")
+
+    before = sum(len(png) for png in pngs)
+    after = sum(len(r["thumb"]) for r in renditions)
+    print(f"Page payload per rerun: {before / 1024:.0f}KB of PNGs → {after / 1024:.0f}KB of previews ({before / after:.0f}x smaller)")
+    exports = sum(len(r["square"]) + len(r["portrait"]) for r in renditions)
+    print(f"Export package: {exports / 1024:.0f}KB for {SLIDES} square + {SLIDES} portrait JPEGs")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,42 @@
+"""
+Benchmark for the weighted tweet-length validator
+Validates thousands of synthetic threads (plain ASCII, emoji, CJK, URLs)
+and reports the cost per thread
+"""
+
+import random
+import time
+
+from tweet_length import over_limit
+
+THREADS = 5000
+WORDS = ["growth", "habits", "AI", "tools", "build", "ship", "users", "focus", "simple", "money"]
+EXTRAS = ["🚀", "👍🏽", "👨‍👩‍👧", "日本語", "https://example.com/some/long/path?q=1", "xthreadmaster.streamlit.app", "—"]
+
+def make_thread(rng, mix):
+    tweets = []
+    for _ in range(rng.randint(5, 15)):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(10, 60))]
+        if mix:
+            for _ in range(rng.randint(1, 4)):
+                words.insert(rng.randrange(len(words)), rng.choice(EXTRAS))
+        tweets.append(" ".join(words) + ".")
+    return tweets
+
+def run_benchmark():
+    rng = random.Random(42)
+    print("⏱️ Tweet length benchmark")
+    print("=" * 50)
+
+    for label, mix in (("ASCII only", False), ("Emoji/CJK/URLs", True)):
+        threads = [make_thread(rng, mix) for _ in range(THREADS)]
+        tweets = sum(len(t) for t in threads)
+        start = time.perf_counter()
+        flagged = sum(len(over_limit(t)) for t in threads)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<16} {THREADS} threads / {tweets} tweets: "
+              f"{elapsed / THREADS * 1e6:6.1f}µs per thread, {elapsed / tweets * 1e6:5.2f}µs per tweet "
+              f"({flagged} over limit)")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,247 @@
+"""
+Session-scoped blob store for XThreadMaster
+Large per-session payloads (generated slide images) are spilled to disk and
+memory-mapped on read, so session state only holds short string handles.
+The store is bounded by total bytes (least recently used blobs are evicted
+first) and sessions that haven't been touched for `ttl` seconds are removed.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Callable, Dict, Optional
+
+import metrics
+
+_SAFE_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+class BlobStore:
+    """
+    Disk-backed blobs grouped by session
+
+    Handles look like "<session_id>/<content hash>"; a session storing the
+    same bytes twice gets the same handle. Reads return a read-only mmap,
+    which the OS pages in on demand and can drop under memory pressure.
+    """
+
+    def __init__(self, root_dir: str, max_bytes: int = 1024 * 1024 * 1024, ttl: float = 6 * 3600, cleanup_interval: float = 300):
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self._blobs: "OrderedDict[str, int]" = OrderedDict()  # handle -> size, least recent first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        self.evictions = 0
+        self.expired_sessions = 0
+        os.makedirs(root_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Index blobs left by an earlier run, least recently used first"""
+        found = []
+        for session in os.scandir(self.root_dir):
+            if not session.is_dir():
+                continue
+            for entry in os.scandir(session.path):
+                if entry.name.endswith(".blob"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    found.append((stat.st_mtime, f"{session.name}/{entry.name[:-5]}", stat.st_size))
+        for _, handle, size in sorted(found):
+            self._blobs[handle] = size
+            self._bytes += size
+        with self._lock:
+            self._evict()
+
+    def _path(self, handle: str) -> Optional[str]:
+        session_id, _, name = handle.partition("/")
+        if not _SAFE_ID.fullmatch(session_id) or not _SAFE_ID.fullmatch(name):
+            return None
+        return os.path.join(self.root_dir, session_id, f"{name}.blob")
+
+    def _touch_session(self, session_id: str):
+        try:
+            os.utime(os.path.join(self.root_dir, session_id))
+        except OSError:
+            pass
+
+    def put(self, session_id: str, data: bytes) -> str:
+        """
+        Store bytes for a session
+
+        Returns:
+            Handle to keep in session state
+        """
+        if not _SAFE_ID.fullmatch(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        if not data:
+            raise ValueError("Cannot store an empty blob")
+
+        handle = f"{session_id}/{hashlib.sha256(data).hexdigest()[:32]}"
+        path = self._path(handle)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see partial blobs
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self._touch_session(session_id)
+
+        with self._lock:
+            if handle not in self._blobs:
+                self._blobs[handle] = len(data)
+                self._bytes += len(data)
+            self._blobs.move_to_end(handle)
+            self._evict()
+
+        if time.time() - self._last_cleanup > self.cleanup_interval:
+            self.cleanup()
+        return handle
+
+    def put_stream(self, session_id: str, write: Callable[[BinaryIO], None]) -> str:
+        """
+        Store a blob written incrementally by `write(file)` (e.g. an archive),
+        without holding it in memory
+
+        Returns:
+            Handle to keep in session state
+        """
+        if not _SAFE_ID.fullmatch(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        session_dir = os.path.join(self.root_dir, session_id)
+        os.makedirs(session_dir, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=session_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w+b") as f:
+                write(f)
+                f.seek(0)
+                digest = hashlib.sha256()
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                size = f.tell()
+            if not size:
+                raise ValueError("Cannot store an empty blob")
+            handle = f"{session_id}/{digest.hexdigest()[:32]}"
+            os.replace(tmp_path, self._path(handle))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._touch_session(session_id)
+
+        with self._lock:
+            if handle not in self._blobs:
+                self._blobs[handle] = size
+                self._bytes += size
+            self._blobs.move_to_end(handle)
+            self._evict()
+        return handle
+
+    def open(self, handle: str) -> Optional[mmap.mmap]:
+        """Read-only mmap of a blob (close it when done), or None if it was evicted or expired"""
+        path = self._path(handle)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            with self._lock:
+                if self._blobs.pop(handle, None) is not None:
+                    self._bytes = sum(self._blobs.values())
+            return None
+
+        self._touch_session(handle.partition("/")[0])
+        with self._lock:
+            if handle in self._blobs:
+                self._blobs.move_to_end(handle)
+        return view
+
+    def __contains__(self, handle: str) -> bool:
+        path = self._path(handle)
+        return path is not None and os.path.exists(path)
+
+    def read(self, handle: str) -> Optional[bytes]:
+        """Copy of a blob's bytes, or None if it was evicted or expired"""
+        view = self.open(handle)
+        if view is None:
+            return None
+        with view:
+            return view[:]
+
+    def delete_session(self, session_id: str):
+        """Remove every blob of a session"""
+        if not _SAFE_ID.fullmatch(session_id):
+            return
+        shutil.rmtree(os.path.join(self.root_dir, session_id), ignore_errors=True)
+        with self._lock:
+            for handle in [h for h in self._blobs if h.partition("/")[0] == session_id]:
+                self._bytes -= self._blobs.pop(handle)
+            metrics.set_gauge("blob_store.bytes", self._bytes)
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """
+        Remove sessions not touched for `ttl` seconds
+
+        Returns:
+            Number of sessions removed
+        """
+        now = time.time() if now is None else now
+        self._last_cleanup = now
+        removed = 0
+        for session in os.scandir(self.root_dir):
+            try:
+                idle = now - session.stat().st_mtime
+            except OSError:
+                continue
+            if session.is_dir() and idle > self.ttl:
+                self.delete_session(session.name)
+                removed += 1
+        if removed:
+            with self._lock:
+                self.expired_sessions += removed
+            metrics.increment("blob_store.expired_sessions", removed)
+        return removed
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._blobs:
+            handle, size = self._blobs.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.remove(self._path(handle))
+            except OSError:
+                pass
+            self.evictions += 1
+            metrics.increment("blob_store.evictions")
+        metrics.set_gauge("blob_store.bytes", self._bytes)
+
+    def session_bytes(self, session_id: str) -> int:
+        """Bytes currently stored for one session"""
+        with self._lock:
+            return sum(size for handle, size in self._blobs.items() if handle.partition("/")[0] == session_id)
+
+    def stats(self) -> Dict:
+        """Return bytes stored against the cap, blob and session counts, evictions and expiries"""
+        with self._lock:
+            return {
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "blobs": len(self._blobs),
+                "sessions": len({handle.partition("/")[0] for handle in self._blobs}),
+                "evictions": self.evictions,
+                "expired_sessions": self.expired_sessions
+            }
@@ -0,0 +1,89 @@
+"""
+Instagram carousel helpers for XThreadMaster
+Parses generated carousel text into slides ("SLIDE X: Title" followed by
+its description), incrementally while it streams, and splices single
+slides back in
+"""
+
+from typing import Dict, List
+
+def _slide_title(line: str):
+    """Title if the line starts a slide, else None (markdown like **SLIDE 1:** is tolerated)"""
+    clean = line.strip().lstrip('*').strip()
+    if clean.upper().startswith('SLIDE') and ':' in clean:
+        return clean.split(':', 1)[1].strip().rstrip('*').strip()
+    return None
+
+def parse_slides(text: str) -> List[Dict]:
+    """
+    Split carousel text into slides
+
+    Returns:
+        List of dicts with num (1-based), title, body, and the start/end
+        line indexes of the slide's block (end exclusive)
+    """
+    lines = text.split('\n')
+    slides = []
+    for i, line in enumerate(lines):
+        title = _slide_title(line)
+        if title is not None:
+            if slides:
+                slides[-1]['end'] = i
+            slides.append({'num': len(slides) + 1, 'title': title, 'start': i, 'end': len(lines)})
+
+    for slide in slides:
+        slide['body'] = '\n'.join(lines[slide['start'] + 1:slide['end']]).strip()
+    return slides
+
+class SlideStream:
+    """
+    Incremental slide title parser for streamed carousel text
+
+    Feed it the text assembled so far after every chunk; it reports each
+    slide title once its line is complete, so work for that slide can start
+    before the rest of the carousel has arrived.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0  # End of the last complete line parsed
+        self._reported = set()
+
+    def feed(self, text: str) -> List[str]:
+        """New slide titles whose header line has completed since the last call"""
+        if not text.startswith(self._text[:self._pos]):
+            # The stream restarted (e.g. model failover) - parse from the top,
+            # but don't report titles that were already reported
+            self._pos = 0
+        self._text = text
+
+        end = text.rfind('\n') + 1
+        if end <= self._pos:
+            return []
+        titles = []
+        for line in text[self._pos:end].split('\n'):
+            title = _slide_title(line)
+            if title and title not in self._reported:
+                self._reported.add(title)
+                titles.append(title)
+        self._pos = end
+        return titles
+
+def slide_text(slide: Dict) -> str:
+    return f"SLIDE {slide['num']}: {slide['title']}\n{slide['body']}".strip()
+
+def replace_slide(text: str, num: int, new_slide: str) -> str:
+    """Replace slide `num` (1-based) with new text, keeping the rest of the carousel as is"""
+    lines = text.split('\n')
+    slide = parse_slides(text)[num - 1]
+    block = new_slide.strip().split('\n')
+
+    # Keep the slide header (and its number) even if the model dropped or renumbered it
+    title = _slide_title(block[0])
+    if title is None:
+        block.insert(0, f"SLIDE {num}: {slide['title']}")
+    else:
+        block[0] = f"SLIDE {num}: {title}"
+    # Keep the blank line that separated this slide from the next one
+    trailing = [''] if slide['end'] < len(lines) and not lines[slide['end'] - 1].strip() else []
+    return '\n'.join(lines[:slide['start']] + block + trailing + lines[slide['end']:])
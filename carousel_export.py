@@ -0,0 +1,50 @@
+"""
+Carousel package export for XThreadMaster
+Writes the downloadable ZIP (captions plus slide images) incrementally to a
+file. Images are already compressed, so they're stored as is; deflating
+them costs CPU for next to no size reduction.
+"""
+
+import hashlib
+import shutil
+import zipfile
+from typing import BinaryIO, Callable, Iterable, List, Optional, Tuple
+
+# Copy images into the archive in chunks rather than whole
+CHUNK_SIZE = 256 * 1024
+
+def package_key(captions: str, image_handles: List[str]) -> str:
+    """Fingerprint of a package's contents, to know when it has to be rebuilt"""
+    digest = hashlib.sha256(captions.encode())
+    for handle in image_handles:
+        digest.update(b"\0" + handle.encode())
+    return digest.hexdigest()
+
+def write_carousel_zip(
+    out: BinaryIO,
+    captions: str,
+    images: Iterable[Tuple[str, Callable[[], Optional[BinaryIO]]]]
+) -> int:
+    """
+    Write the carousel ZIP to a file
+
+    Args:
+        out: Writable (seekable) binary file
+        captions: Caption text, stored as captions.txt (deflated - text compresses well)
+        images: (archive name, opener) pairs; the opener returns a readable
+                file-like (e.g. a blob store mmap) or None to skip the image
+
+    Returns:
+        Number of images written
+    """
+    written = 0
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as zip_file:
+        zip_file.writestr("captions.txt", captions, compress_type=zipfile.ZIP_DEFLATED)
+        for name, opener in images:
+            source = opener()
+            if source is None:
+                continue
+            with source, zip_file.open(name, "w") as entry:
+                shutil.copyfileobj(source, entry, CHUNK_SIZE)
+            written += 1
+    return written
@@ -0,0 +1,237 @@
+"""
+Local entitlement store for XThreadMaster
+Keeps a SQLite copy of Stripe customers and subscriptions, fed by webhook
+events (see stripe_webhooks.py), so tier checks don't have to poll Stripe
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from analytics import get_user_hash
+from subscriptions import Entitlement, entitlement_from_subscriptions
+
+DEFAULT_DB_PATH = os.environ.get("ENTITLEMENTS_DB", "entitlements.db")
+
+SUBSCRIPTION_EVENTS = {
+    "customer.subscription.created",
+    "customer.subscription.updated",
+    "customer.subscription.deleted",
+    "customer.subscription.paused",
+    "customer.subscription.resumed",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id TEXT PRIMARY KEY,
+    user_hash TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_customers_user_hash ON customers(user_hash);
+CREATE TABLE IF NOT EXISTS subscriptions (
+    subscription_id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL,
+    event_created INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_customer ON subscriptions(customer_id);
+CREATE TABLE IF NOT EXISTS token_revocations (
+    user_hash TEXT PRIMARY KEY,
+    revoked_before INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS processed_events (
+    event_id TEXT PRIMARY KEY,
+    processed_at INTEGER NOT NULL
+);
+"""
+
+class EntitlementStore:
+    """
+    SQLite-backed table of Stripe customers and their subscriptions
+
+    Each call opens its own connection, so one store can be shared by all
+    Streamlit sessions and by the webhook receiver process.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, commit on success and always close it"""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_entitlement(self, email: str) -> Optional[Entitlement]:
+        """
+        Look up a user's entitlement from the local table
+
+        Returns:
+            Entitlement if any subscription of a Stripe customer with this
+            email is known (FREE_ENTITLEMENT if none of them are active), or
+            None on a miss so the caller can fall back to Stripe. A customer
+            without subscription rows is a miss too: their subscriptions may
+            predate the webhook receiver and never have been delivered.
+        """
+        if not email or not email.strip():
+            return None
+
+        with self._connect() as conn:
+            customer_ids = [row[0] for row in conn.execute(
+                "SELECT customer_id FROM customers WHERE user_hash = ?",
+                (get_user_hash(email),)
+            )]
+            if not customer_ids:
+                return None
+
+            placeholders = ",".join("?" * len(customer_ids))
+            rows = conn.execute(
+                f"SELECT data FROM subscriptions WHERE customer_id IN ({placeholders})",
+                customer_ids
+            ).fetchall()
+        if not rows:
+            return None
+
+        return entitlement_from_subscriptions([json.loads(row[0]) for row in rows])
+
+    def upsert_customer(self, customer_id: str, email: str):
+        """Map a Stripe customer to a (hashed) email"""
+        if not customer_id or not email:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO customers (customer_id, user_hash, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(customer_id) DO UPDATE SET user_hash = excluded.user_hash, updated_at = excluded.updated_at",
+                (customer_id, get_user_hash(email), int(time.time()))
+            )
+
+    def delete_customer(self, customer_id: str):
+        """Forget a customer and all of their subscriptions"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM customers WHERE customer_id = ?", (customer_id,))
+            conn.execute("DELETE FROM subscriptions WHERE customer_id = ?", (customer_id,))
+
+    def has_customer(self, customer_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM customers WHERE customer_id = ?", (customer_id,)).fetchone()
+        return row is not None
+
+    def upsert_subscription(self, subscription: Dict, event_created: int) -> bool:
+        """
+        Store the latest known state of a subscription
+
+        Events can arrive out of order, so older snapshots never overwrite
+        newer ones.
+
+        Returns:
+            True if the stored row changed
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO subscriptions (subscription_id, customer_id, status, data, event_created) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(subscription_id) DO UPDATE SET customer_id = excluded.customer_id, "
+                "status = excluded.status, data = excluded.data, event_created = excluded.event_created "
+                "WHERE excluded.event_created >= subscriptions.event_created",
+                (
+                    subscription["id"],
+                    subscription["customer"],
+                    subscription.get("status", ""),
+                    json.dumps(subscription),
+                    event_created
+                )
+            )
+            return cursor.rowcount > 0
+
+    def revoke_tokens(self, user_hash: str, before: Optional[int] = None):
+        """Invalidate every tier token issued to a user up to `before` (default now)"""
+        before = int(time.time()) if before is None else before
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO token_revocations (user_hash, revoked_before) VALUES (?, ?) "
+                "ON CONFLICT(user_hash) DO UPDATE SET revoked_before = MAX(revoked_before, excluded.revoked_before)",
+                (user_hash, before)
+            )
+
+    def revoke_customer_tokens(self, customer_id: str):
+        """Revoke tier tokens for the user a Stripe customer belongs to"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT user_hash FROM customers WHERE customer_id = ?", (customer_id,)).fetchone()
+        if row:
+            self.revoke_tokens(row[0])
+
+    def tokens_revoked_before(self, user_hash: str) -> Optional[int]:
+        """Return the revocation cutoff for a user's tier tokens, if any"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT revoked_before FROM token_revocations WHERE user_hash = ?", (user_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_event_processed(self, event_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM processed_events WHERE event_id = ?", (event_id,)).fetchone()
+        return row is not None
+
+    def mark_event_processed(self, event_id: str):
+        """Record a webhook event id (Stripe retries deliveries)"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO processed_events (event_id, processed_at) VALUES (?, ?)",
+                (event_id, int(time.time()))
+            )
+
+def apply_event(
+    store: EntitlementStore,
+    event: Dict,
+    customer_lookup: Optional[Callable[[str], Optional[str]]] = None
+) -> bool:
+    """
+    Apply a Stripe webhook event to the entitlement store
+
+    Args:
+        store: Entitlement store to update
+        event: Parsed Stripe event payload
+        customer_lookup: Optional callable returning the email for a customer
+            id, used when a subscription event arrives for an unknown customer
+
+    Returns:
+        True if the event changed the store, False if it was ignored or a duplicate
+    """
+    event_type = event.get("type", "")
+    obj = event.get("data", {}).get("object", {})
+
+    if store.is_event_processed(event["id"]):
+        return False
+
+    if event_type in ("customer.created", "customer.updated"):
+        store.upsert_customer(obj.get("id"), obj.get("email"))
+    elif event_type == "customer.deleted":
+        store.revoke_customer_tokens(obj.get("id"))
+        store.delete_customer(obj.get("id"))
+    elif event_type == "checkout.session.completed":
+        email = (obj.get("customer_details") or {}).get("email") or obj.get("customer_email")
+        store.upsert_customer(obj.get("customer"), email)
+    elif event_type in SUBSCRIPTION_EVENTS:
+        customer_id = obj.get("customer")
+        if customer_lookup and customer_id and not store.has_customer(customer_id):
+            store.upsert_customer(customer_id, customer_lookup(customer_id))
+        if store.upsert_subscription(obj, event.get("created", 0)):
+            # The tier may have changed, so signed tier tokens must be re-issued
+            store.revoke_customer_tokens(customer_id)
+    else:
+        return False
+
+    store.mark_event_processed(event["id"])
+    return True
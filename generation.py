@@ -0,0 +1,58 @@
+"""
+Gemini generation helpers for XThreadMaster
+Wraps model calls so partial output can be rendered as it streams in
+and latency metrics are recorded for every generation
+"""
+
+import time
+from typing import Callable, Optional
+
+import metrics
+
+def chunk_text(chunk) -> str:
+    """Text of a streamed response chunk ('' for chunks without text parts, e.g. safety stops)"""
+    try:
+        return chunk.text or ""
+    except ValueError:
+        return ""
+
+def generate_text(
+    model,
+    prompt: str,
+    stream: bool = True,
+    on_chunk: Optional[Callable[[str], None]] = None,
+    **kwargs
+) -> str:
+    """
+    Run a Gemini generation and return the full text
+
+    Args:
+        model: genai.GenerativeModel (or anything with a compatible generate_content)
+        prompt: Prompt to send
+        stream: Stream the response and call on_chunk as text arrives
+        on_chunk: Callback receiving the text assembled so far after each chunk
+        **kwargs: Passed through to generate_content (e.g. generation_config)
+
+    Returns:
+        The complete response text, stripped
+    """
+    start = time.perf_counter()
+
+    if not stream:
+        text = model.generate_content(prompt, **kwargs).text
+        metrics.record("gemini.latency", time.perf_counter() - start)
+        return text.strip()
+
+    parts = []
+    for chunk in model.generate_content(prompt, stream=True, **kwargs):
+        text = chunk_text(chunk)
+        if not text:
+            continue
+        if not parts:
+            metrics.record("gemini.ttft", time.perf_counter() - start)
+        parts.append(text)
+        if on_chunk:
+            on_chunk("".join(parts))
+
+    metrics.record("gemini.latency", time.perf_counter() - start)
+    return "".join(parts).strip()
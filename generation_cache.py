@@ -0,0 +1,163 @@
+"""
+Generation response cache for XThreadMaster
+Identical requests (same prompt, model and generation config) are served
+from a memory-bounded LRU, backed by an optional on-disk tier with a TTL
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import metrics
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize unicode and whitespace so trivially different prompts share a key"""
+    prompt = unicodedata.normalize("NFC", prompt)
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in prompt.strip().splitlines()]
+    return "\n".join(lines)
+
+def _config_dict(generation_config: Any) -> Any:
+    """Turn a generation config (dict, GenerationConfig or None) into something JSON-serializable"""
+    if generation_config is None or isinstance(generation_config, dict):
+        return generation_config
+    if hasattr(generation_config, "to_dict"):
+        return generation_config.to_dict()
+    return {k: v for k, v in vars(generation_config).items() if not k.startswith("_")}
+
+def cache_key(prompt: str, model_name: str, generation_config: Any = None) -> str:
+    """Hash of the normalized prompt, model name and generation config"""
+    payload = json.dumps(
+        {"prompt": normalize_prompt(prompt), "model": model_name, "config": _config_dict(generation_config)},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class GenerationCache:
+    """
+    Two-tier cache of generated text
+
+    The memory tier is an LRU bounded by total stored bytes. If `disk_dir`
+    is set, entries are also written there and served for `disk_ttl`
+    seconds, which survives server restarts and is shared by processes.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, disk_dir: Optional[str] = None, disk_ttl: float = 86400):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_ttl = disk_ttl
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached text for a key, checking memory first, then disk"""
+        with self._lock:
+            entry = self._entries.get(key)
+            text = entry[0] if entry else None
+            if entry:
+                self._entries.move_to_end(key)
+
+        if text is None:
+            text = self._read_disk(key)
+            if text is not None:
+                self._store_memory(key, text)
+
+        with self._lock:
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.increment("generation_cache.hits" if text is not None else "generation_cache.misses")
+        return text
+
+    def put(self, key: str, text: str):
+        """Store generated text under a key"""
+        if not text:
+            return
+        self._store_memory(key, text)
+        self._write_disk(key, text)
+
+    def _store_memory(self, key: str, text: str):
+        size = len(text.encode())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= old[1]
+            self._entries[key] = (text, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+            metrics.set_gauge("generation_cache.memory_bytes", self._bytes)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created", 0) > self.disk_ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry.get("text")
+
+    def _write_disk(self, key: str, text: str):
+        if not self.disk_dir:
+            return
+        try:
+            # Write to a temp file and rename so readers never see partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"text": text, "created": time.time()}, f)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            print(f"Error writing generation cache entry: {e}")
+
+    def disk_bytes(self) -> int:
+        if not self.disk_dir:
+            return 0
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".json"):
+                try:
+                    total += os.path.getsize(os.path.join(self.disk_dir, name))
+                except OSError:
+                    pass
+        return total
+
+    def stats(self) -> Dict:
+        """Return hit rate and bytes stored per tier"""
+        with self._lock:
+            total = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "entries": len(self._entries),
+                "memory_bytes": self._bytes
+            }
+        stats["disk_bytes"] = self.disk_bytes()
+        return stats
@@ -0,0 +1,138 @@
+"""
+Slide image cache for XThreadMaster
+Content-addressed on-disk store of generated images, keyed by a hash of the
+full provider request (prompt, dimensions, steps, cfg_scale and seed), so an
+identical request never costs credits twice. Bounded by total bytes with
+least-recently-used eviction.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import metrics
+
+def image_cache_key(payload: Dict, engine: str) -> str:
+    """Hash of the engine and the complete request payload"""
+    data = json.dumps({"engine": engine, "payload": payload}, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+class ImageCache:
+    """
+    Disk cache of image bytes
+
+    Files are named by key, so the directory can be shared by several server
+    processes; each process tracks the entries it has seen for eviction and
+    picks up existing files (oldest first) when it starts.
+    """
+
+    def __init__(self, disk_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        self.disk_dir = disk_dir
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, least recent first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        os.makedirs(disk_dir, exist_ok=True)
+        self._load()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.img")
+
+    def _load(self):
+        """Index files left by earlier runs, least recently used first"""
+        found = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".img"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._bytes += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached image bytes for a key, or None"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Recency survives restarts
+        except OSError:
+            data = None
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                if self._entries.pop(key, None) is not None:
+                    self._recount()
+            else:
+                self.hits += 1
+                self.bytes_served += len(data)
+                if key not in self._entries:
+                    self._entries[key] = len(data)  # Written by another process
+                    self._bytes += len(data)
+                self._entries.move_to_end(key)
+        metrics.increment("image_cache.hits" if data is not None else "image_cache.misses")
+        if data is not None:
+            metrics.increment("image_cache.bytes_served", len(data))
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Store image bytes under a key, evicting the least recently used images over the cap"""
+        if not data or len(data) > self.max_bytes:
+            return
+        try:
+            # Write to a temp file and rename so readers never see partial images
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Error writing image cache entry: {e}")
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old
+            self._entries[key] = len(data)
+            self._bytes += len(data)
+            self._evict()
+
+    def _recount(self):
+        self._bytes = sum(self._entries.values())
+        metrics.set_gauge("image_cache.bytes", self._bytes)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            metrics.increment("image_cache.evictions")
+        metrics.set_gauge("image_cache.bytes", self._bytes)
+
+    def stats(self) -> Dict:
+        """Return hit rate, bytes stored and bytes served from cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "bytes_served": self.bytes_served
+            }
@@ -0,0 +1,80 @@
+"""
+In-process metrics for XThreadMaster
+Thread-safe counters and timing samples shared by all Streamlit sessions
+in the server process
+"""
+
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional
+
+# Keep the most recent samples per timing metric for percentile estimates
+MAX_SAMPLES = 1000
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = defaultdict(float)
+_gauges: Dict[str, float] = {}
+_samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+
+def increment(name: str, amount: float = 1):
+    """Add to a counter"""
+    with _lock:
+        _counters[name] += amount
+
+def set_gauge(name: str, value: float):
+    """Set a point-in-time value (e.g. bytes currently cached)"""
+    with _lock:
+        _gauges[name] = value
+
+def record(name: str, value: float):
+    """Record a timing/size sample (e.g. seconds to first token)"""
+    with _lock:
+        _samples[name].append(value)
+
+def get_counter(name: str) -> float:
+    with _lock:
+        return _counters.get(name, 0)
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize(name: str) -> Dict:
+    """
+    Summarize the recent samples of a timing metric
+
+    Returns:
+        Dict with count, mean, p50 and p95 (None values if no samples yet)
+    """
+    with _lock:
+        values = list(_samples.get(name, ()))
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95)
+    }
+
+def snapshot() -> Dict:
+    """Return all counters, gauges and timing summaries"""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        names = list(_samples.keys())
+    return {
+        "counters": counters,
+        "gauges": gauges,
+        "timings": {name: summarize(name) for name in names}
+    }
+
+def reset():
+    """Clear all metrics (used by tests)"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _samples.clear()
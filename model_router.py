@@ -0,0 +1,307 @@
+"""
+Latency-aware model routing for XThreadMaster
+Tracks per-model success rate and latency, sends each request to the
+healthiest model, fails over at call time and cools down failing models
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+import metrics
+from metrics import percentile
+
+T = TypeVar("T")
+
+class AllModelsFailed(Exception):
+    """Raised when every model in the router failed a request"""
+
+class HedgeCancelled(Exception):
+    """Raised inside a losing hedged attempt to stop it early"""
+
+class HedgeBudget:
+    """
+    Caps hedged (duplicate) requests to a fraction of normal traffic
+
+    Every routed request deposits `ratio`; every hedge withdraws 1. The
+    balance is capped at `max_balance` so quiet periods can't bank an
+    unbounded burst of hedges.
+    """
+
+    def __init__(self, ratio: float = 0.1, max_balance: float = 5.0):
+        self.ratio = ratio
+        self.max_balance = max_balance
+        self.balance = 0.0
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.balance = min(self.max_balance, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.balance >= 1:
+                self.balance -= 1
+                return True
+            return False
+
+    def refund(self):
+        """Return a withdrawal whose hedge wasn't sent after all"""
+        with self._lock:
+            self.balance = min(self.max_balance, self.balance + 1)
+
+class ModelHealth:
+    """Rolling success/latency window for one model"""
+
+    def __init__(self, window: int = 50):
+        self.samples: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def success_rate(self) -> float:
+        if not self.samples:
+            return 1.0
+        return sum(1 for ok, _ in self.samples if ok) / len(self.samples)
+
+    def latencies(self) -> List[float]:
+        return [latency for ok, latency in self.samples if ok]
+
+class ModelRouter:
+    """
+    Routes generation calls across a preference-ordered list of models
+
+    Ranking: models on cooldown are skipped; models whose success rate is
+    below `min_success_rate` go last; measured models are ordered by p50
+    latency; models without enough samples keep their preference order.
+    A model that fails `failure_threshold` times in a row is put on
+    cooldown for `cooldown` seconds and its history is reset. When the
+    cooldown expires it is probed first; a failed probe cools it down again.
+    """
+
+    def __init__(
+        self,
+        models: List[Tuple[str, Any]],
+        failure_threshold: int = 3,
+        cooldown: float = 60.0,
+        min_success_rate: float = 0.8,
+        min_samples: int = 5,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.models = list(models)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.min_success_rate = min_success_rate
+        self.min_samples = min_samples
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._health: Dict[str, ModelHealth] = {name: ModelHealth() for name, _ in self.models}
+
+    @property
+    def name(self) -> str:
+        """Stable identifier for the routing policy (used in cache keys)"""
+        return "router:" + ",".join(name for name, _ in self.models)
+
+    def ranked(self) -> List[Tuple[str, Any]]:
+        """Models in the order they should be tried for the next request"""
+        now = self._clock()
+        with self._lock:
+            available = []
+            cooling = []
+            for priority, (name, model) in enumerate(self.models):
+                health = self._health[name]
+                if health.cooldown_until > now:
+                    cooling.append((health.cooldown_until, name, model))
+                    continue
+                latencies = health.latencies()
+                enough_samples = len(health.samples) >= self.min_samples
+                if health.cooldown_until:
+                    # Cooldown just expired - probe this model before the others
+                    key = (False, -1.0, priority)
+                else:
+                    key = (
+                        enough_samples and health.success_rate() < self.min_success_rate,
+                        percentile(latencies, 50) if enough_samples and latencies else float("inf"),
+                        priority
+                    )
+                available.append((key, name, model))
+
+        ordered = [(name, model) for _, name, model in sorted(available, key=lambda item: item[0])]
+        if not ordered:
+            # Everything is cooling down - try whichever recovers first
+            ordered = [(name, model) for _, name, model in sorted(cooling, key=lambda item: item[0])]
+        return ordered
+
+    def record(self, name: str, ok: bool, latency: float):
+        """Record the outcome of a call to a model"""
+        with self._lock:
+            health = self._health[name]
+            health.samples.append((ok, latency))
+            if ok:
+                health.consecutive_failures = 0
+                health.cooldown_until = 0.0
+            else:
+                health.consecutive_failures += 1
+                probing = health.cooldown_until != 0.0
+                if probing or health.consecutive_failures >= self.failure_threshold:
+                    health.cooldown_until = self._clock() + self.cooldown
+                    health.consecutive_failures = 0
+                    health.samples.clear()
+                    metrics.increment(f"router.cooldowns.{name}")
+        metrics.record(f"router.latency.{name}", latency)
+        metrics.increment(f"router.{'success' if ok else 'failure'}.{name}")
+
+    def call(self, fn: Callable[[Any], T], admit: Callable[[], None] = lambda: None) -> T:
+        """
+        Call `fn(model)` on the healthiest model, failing over on errors
+
+        Args:
+            fn: The model call
+            admit: Called before every model attempt (e.g. AdmissionController.acquire),
+                   so each call that goes out is charged; its errors aren't failed over
+
+        Returns:
+            fn's result from the first model that succeeds
+
+        Raises:
+            The last model's error if every model fails
+        """
+        last_error: Optional[Exception] = None
+        for name, model in self.ranked():
+            admit()
+            start = self._clock()
+            try:
+                result = fn(model)
+            except Exception as e:
+                self.record(name, False, self._clock() - start)
+                print(f"Model {name} failed, failing over: {e}")
+                last_error = e
+                continue
+            self.record(name, True, self._clock() - start)
+            return result
+
+        raise last_error if last_error else AllModelsFailed("No models available")
+
+    def hedge_delay(self, name: str, pct: float = 95) -> Optional[float]:
+        """Latency percentile for a model, or None until it has enough samples"""
+        with self._lock:
+            latencies = self._health[name].latencies()
+        if len(latencies) < self.min_samples:
+            return None
+        return percentile(latencies, pct)
+
+    def call_hedged(
+        self,
+        fn: Callable[[Any, threading.Event], T],
+        budget: HedgeBudget,
+        hedge_percentile: float = 95,
+        can_hedge: Callable[[], bool] = lambda: True,
+        admit: Callable[[], None] = lambda: None
+    ) -> T:
+        """
+        Like call(), but sends a duplicate request if the first one is slow
+
+        If the first attempt hasn't finished within `hedge_percentile` of the
+        model's recent latency, a second attempt is sent to the next model in
+        the ranking (or the same model if it's the only one), provided the
+        budget and `can_hedge` allow it. The first successful response wins;
+        the other attempt's cancel event is set so it can stop early.
+
+        Args:
+            fn: Called as fn(model, cancelled); should check `cancelled`
+                periodically and raise HedgeCancelled once it's set
+            budget: Shared hedge budget
+            hedge_percentile: Latency percentile that triggers the hedge
+            can_hedge: Extra check before hedging (e.g. spare admission capacity)
+            admit: Called before the first attempt and every failover attempt
+                   (hedges are charged through can_hedge instead)
+        """
+        ranked = self.ranked()
+        budget.deposit()
+        delay = self.hedge_delay(ranked[0][0], hedge_percentile)
+        if delay is None:
+            return self.call(lambda model: fn(model, threading.Event()), admit=admit)
+
+        candidates = iter(ranked)
+        attempts: Dict[Any, Tuple[str, threading.Event, float]] = {}
+        executor = ThreadPoolExecutor(max_workers=2)
+
+        def launch(name, model):
+            cancelled = threading.Event()
+            future = executor.submit(fn, model, cancelled)
+            attempts[future] = (name, cancelled, self._clock())
+            return future
+
+        first_name, first_model = next(candidates)
+        admit()
+        launch(first_name, first_model)
+        first_start = time.monotonic()
+        hedged = False
+        hedge_future = None
+        last_error: Optional[Exception] = None
+
+        try:
+            while attempts:
+                timeout = None if hedged else max(0.0, delay - (time.monotonic() - first_start))
+                done, _ = wait(list(attempts), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                if not done:
+                    # Hedge timer fired - at most one hedge per request
+                    hedged = True
+                    if budget.withdraw():
+                        if can_hedge():
+                            name, model = next(candidates, (first_name, first_model))
+                            hedge_future = launch(name, model)
+                            metrics.increment("router.hedges")
+                            continue
+                        budget.refund()  # Refused by admission - the budget wasn't spent
+                    metrics.increment("router.hedges_denied")
+                    continue
+
+                for future in done:
+                    name, cancelled, start = attempts.pop(future)
+                    try:
+                        result = future.result()
+                    except HedgeCancelled:
+                        continue
+                    except Exception as e:
+                        self.record(name, False, self._clock() - start)
+                        print(f"Model {name} failed, failing over: {e}")
+                        last_error = e
+                        if not attempts:
+                            fallback = next(candidates, None)
+                            if fallback:
+                                admit()
+                                launch(*fallback)
+                        continue
+
+                    self.record(name, True, self._clock() - start)
+                    for _, other_cancelled, _ in attempts.values():
+                        other_cancelled.set()
+                    if hedge_future is not None and future is hedge_future:
+                        metrics.increment("router.hedge_wins")
+                    return result
+        finally:
+            executor.shutdown(wait=False)
+
+        raise last_error if last_error else AllModelsFailed("No models available")
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-model success rate, latency percentiles and cooldown state"""
+        now = self._clock()
+        with self._lock:
+            stats = {}
+            for name, _ in self.models:
+                health = self._health[name]
+                latencies = health.latencies()
+                stats[name] = {
+                    "samples": len(health.samples),
+                    "success_rate": round(health.success_rate(), 3),
+                    "p50": percentile(latencies, 50),
+                    "p95": percentile(latencies, 95),
+                    "cooling_down": health.cooldown_until > now
+                }
+            return stats
@@ -0,0 +1,319 @@
+"""
+Prompt builder for XThreadMaster
+Per-platform prompt templates are compiled once at import. The fixed
+requirements every request repeats live in the model's system instruction,
+user content is trimmed to a token budget, and each platform gets a
+generation config that bounds output length (and therefore latency)
+"""
+
+import math
+from dataclasses import dataclass, field
+from string import Template
+from typing import Dict, List, Optional
+
+# Rough Gemini tokenization: ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+
+def count_tokens(text: str) -> int:
+    """Estimate the tokens in a piece of text locally (no API call)"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to roughly `max_tokens`, ending on a line or word boundary"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * CHARS_PER_TOKEN]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    return cut[:boundary] if boundary > len(cut) // 2 else cut
+
+# LinkedIn posts are asked for 1300-3000 characters; emojis, hashtags and line
+# breaks tokenize denser than plain prose, so budget twice the plain-text tokens
+LINKEDIN_MAX_CHARS = 3000
+LINKEDIN_OUTPUT_TOKENS = 2 * math.ceil(LINKEDIN_MAX_CHARS / CHARS_PER_TOKEN)
+
+@dataclass(frozen=True)
+class PlatformSpec:
+    """Everything needed to prompt for one platform"""
+    system_instruction: str
+    templates: Dict[str, Template]
+    max_input_tokens: int
+    base_output_tokens: int
+    output_tokens_per_item: int = 0
+    temperature: float = 0.9
+
+    def generation_config(self, length: Optional[int] = None) -> Dict:
+        max_output = self.base_output_tokens + self.output_tokens_per_item * (length or 0)
+        return {"max_output_tokens": max_output, "temperature": self.temperature}
+
+@dataclass(frozen=True)
+class BuiltPrompt:
+    """A ready-to-send prompt plus the settings it must be sent with"""
+    platform: str
+    mode: str
+    text: str
+    system_instruction: str
+    generation_config: Dict = field(default_factory=dict)
+
+    @property
+    def input_tokens(self) -> int:
+        return count_tokens(self.text) + count_tokens(self.system_instruction)
+
+    @property
+    def max_output_tokens(self) -> int:
+        return self.generation_config.get("max_output_tokens", 0)
+
+    @property
+    def cache_text(self) -> str:
+        """Everything that determines the output, for generation cache keys"""
+        return f"{self.system_instruction}\n\n{self.text}"
+
+PLATFORMS: Dict[str, PlatformSpec] = {
+    "X Thread": PlatformSpec(
+        system_instruction="""You write viral X/Twitter threads.
+Rules for every thread:
+- Keep each tweet under 280 characters
+- Format: ONE TWEET PER LINE
+- Reply with the thread only, no preamble or commentary""",
+        templates={
+            "enhance": Template("""Enhance this X/Twitter thread with the following context: "$topic"
+
+Original thread:
+$content
+
+Requirements:
+- Keep the core message intact
+- Add relevant details based on the context
+- Tone: $tone"""),
+            "format": Template("""Format this content as a $length-tweet X/Twitter thread:
+
+$content
+
+Requirements:
+- Tone: $tone
+- Maintain the core message"""),
+            "topic": Template("""Create a VIRAL X/Twitter thread about: "$topic"
+
+Requirements:
+- Exactly $length tweets
+- Tone: $tone
+- Structure: Hook → Value → CTA
+- Use relevant emojis
+- Make it engaging and shareable"""),
+        },
+        max_input_tokens=1500,
+        base_output_tokens=256,
+        output_tokens_per_item=120
+    ),
+    "LinkedIn Post": PlatformSpec(
+        system_instruction="""You write viral LinkedIn posts.
+Rules for every post:
+- LinkedIn best practices: professional yet engaging
+- Use line breaks for readability
+- End with 3-5 relevant hashtags
+- Reply with the post only, no preamble or commentary""",
+        templates={
+            "enhance": Template("""Enhance this LinkedIn post with additional context: "$topic"
+
+Original post:
+$content
+
+Requirements:
+- Keep the core message intact
+- Add relevant details based on the context
+- Tone: $tone
+- 1300-3000 characters optimal"""),
+            "format": Template("""Optimize this LinkedIn post:
+
+$content
+
+Requirements:
+- Tone: $tone
+- Keep the core message intact"""),
+            "topic": Template("""Create a VIRAL LinkedIn post about: "$topic"
+
+Requirements:
+- Tone: $tone
+- Hook in first line, value-driven content
+- 1300-3000 characters (LinkedIn optimal length)
+- Include relevant emojis (LinkedIn-appropriate)
+- Structure: Hook → Story/Insight → Value → CTA
+- Make it shareable and comment-worthy"""),
+        },
+        max_input_tokens=2000,
+        base_output_tokens=LINKEDIN_OUTPUT_TOKENS
+    ),
+    "Instagram Carousel": PlatformSpec(
+        system_instruction="""You write viral Instagram carousels.
+Rules for every carousel:
+- Each slide: SLIDE X: [Title] on its own line, followed by the description
+- Use relevant emojis
+- Make it visually engaging
+- Reply with the slides only, no preamble or commentary""",
+        templates={
+            "enhance": Template("""Enhance this Instagram carousel with additional context: "$topic"
+
+Original carousel:
+$content
+
+Requirements:
+- Keep the core message intact
+- Add relevant details based on the context
+- Tone: $tone"""),
+            "format": Template("""Optimize this Instagram carousel:
+
+$content
+
+Requirements:
+- Tone: $tone
+- Keep the core message intact"""),
+            "topic": Template("""Create a VIRAL Instagram carousel about: "$topic"
+
+Requirements:
+- Exactly $length slides
+- Tone: $tone
+- Each slide should have a catchy title (max 5 words) and description (2-3 sentences)
+- Make it shareable
+- Format: For each slide, write:
+  SLIDE X: [Title]
+  [Description]
+
+  One slide per section."""),
+        },
+        max_input_tokens=1500,
+        base_output_tokens=256,
+        output_tokens_per_item=150
+    ),
+}
+
+def prompt_mode(topic: str = "", content: Optional[str] = None) -> str:
+    """
+    Pick the prompt mode
+
+    Returns:
+        'enhance' (template + topic), 'format' (template only) or 'topic'
+    """
+    has_topic = bool(topic and topic.strip())
+    if content:
+        return "enhance" if has_topic else "format"
+    return "topic"
+
+def build_prompt(
+    platform: str,
+    tone: str,
+    topic: str = "",
+    length: Optional[int] = None,
+    content: Optional[str] = None
+) -> BuiltPrompt:
+    """
+    Build the prompt for a generation
+
+    Args:
+        platform: X Thread, LinkedIn Post or Instagram Carousel
+        tone: Content tone
+        topic: Topic (or extra context when enhancing a template)
+        length: Number of tweets/slides (None for LinkedIn)
+        content: Filled template text, if generating from a template
+
+    Returns:
+        BuiltPrompt with the user prompt, system instruction and generation config
+    """
+    spec = PLATFORMS[platform]
+    mode = prompt_mode(topic, content)
+
+    # User-supplied text gets whatever is left of the input budget
+    fixed = count_tokens(spec.system_instruction) + count_tokens(spec.templates[mode].template)
+    budget = max(64, spec.max_input_tokens - fixed)
+    topic = trim_to_tokens((topic or "").strip(), budget // 4 if content else budget)
+    content = trim_to_tokens(content or "", budget - count_tokens(topic))
+
+    text = spec.templates[mode].substitute(topic=topic, content=content, tone=tone, length=length or "")
+    return BuiltPrompt(
+        platform=platform,
+        mode=mode,
+        text=text,
+        system_instruction=spec.system_instruction,
+        generation_config=spec.generation_config(length)
+    )
+
+REPAIR_SYSTEM_INSTRUCTION = """You shorten single tweets.
+Rules:
+- Keep the meaning, tone, emojis and any links
+- Reply with the shortened tweet only, on one line"""
+
+REPAIR_TEMPLATE = Template("""This tweet is $length characters as X counts them (URLs count 23, emoji and CJK count double). Rewrite it to at most $limit:
+
+$tweet""")
+
+def build_repair_prompt(tweet: str, length: int, limit: int = 280) -> BuiltPrompt:
+    """Prompt to shorten one over-limit tweet (instead of regenerating the thread)"""
+    return BuiltPrompt(
+        platform="X Thread",
+        mode="repair",
+        text=REPAIR_TEMPLATE.substitute(tweet=tweet, length=length, limit=limit),
+        system_instruction=REPAIR_SYSTEM_INSTRUCTION,
+        generation_config={"max_output_tokens": 256, "temperature": 0.4}
+    )
+
+ITEM_SYSTEM_INSTRUCTIONS = {
+    "X Thread": """You rewrite one tweet inside an X/Twitter thread.
+Rules:
+- Keep it under 280 characters, on one line
+- It must flow from the previous tweet into the next one
+- Reply with the new tweet only""",
+    "Instagram Carousel": """You rewrite one slide of an Instagram carousel.
+Rules:
+- Format: SLIDE X: [Title] on the first line (max 5 words), then a 2-3 sentence description
+- It must fit between the previous and next slides
+- Reply with the new slide only""",
+}
+
+ITEM_TEMPLATE = Template("""Rewrite $item $position of $total$about. Make it stronger and more engaging.
+Tone: $tone
+
+Previous $item:
+$before
+
+Current $item (rewrite this one):
+$current
+
+Next $item:
+$after""")
+
+ITEM_OUTPUT_TOKENS = {"X Thread": 160, "Instagram Carousel": 256}
+
+def build_item_prompt(
+    platform: str,
+    tone: str,
+    items: List[str],
+    index: int,
+    topic: str = ""
+) -> BuiltPrompt:
+    """
+    Prompt to regenerate one tweet or slide, with only its neighbours as context
+
+    Args:
+        platform: X Thread or Instagram Carousel
+        tone: Content tone
+        items: All tweets/slides, in order
+        index: 0-based position of the item to rewrite
+        topic: Original topic, if known
+    """
+    item = "tweet" if platform == "X Thread" else "slide"
+    topic = trim_to_tokens((topic or "").strip(), 100)
+    text = ITEM_TEMPLATE.substitute(
+        item=item,
+        position=index + 1,
+        total=len(items),
+        about=f' about "{topic}"' if topic else "",
+        tone=tone,
+        before=items[index - 1] if index > 0 else "(none - this is the first one)",
+        current=items[index],
+        after=items[index + 1] if index + 1 < len(items) else "(none - this is the last one)"
+    )
+    return BuiltPrompt(
+        platform=platform,
+        mode="item",
+        text=text,
+        system_instruction=ITEM_SYSTEM_INSTRUCTIONS[platform],
+        generation_config={"max_output_tokens": ITEM_OUTPUT_TOKENS[platform], "temperature": 0.9}
+    )
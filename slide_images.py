@@ -0,0 +1,228 @@
+"""
+Carousel slide image generation for XThreadMaster
+Calls Stability AI text-to-image for every slide concurrently on a shared,
+bounded pool, with a per-provider cap on in-flight requests so many
+sessions can't flood the API between them. Requests can start while the
+carousel text is still streaming (see SlideImageBatch).
+"""
+
+import base64
+import hashlib
+import threading
+from concurrent.futures import Executor, Future, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+import metrics
+from image_cache import ImageCache, image_cache_key
+
+STABILITY_API_HOST = "https://api.stability.ai"
+STABILITY_ENGINE = "stable-diffusion-xl-1024-v1-0"
+
+# Drafts keep the engine's 1024px size and the slide's seed, so the final
+# render has the same composition; fewer steps is what makes them cheap
+DRAFT_STEPS = 10
+FINAL_STEPS = 30
+
+class ImageGenerationError(Exception):
+    """Raised when the image provider doesn't return an image"""
+
+_session: Optional[requests.Session] = None
+_limits: Dict[str, threading.BoundedSemaphore] = {}
+_lock = threading.Lock()
+
+def get_image_session() -> requests.Session:
+    """Get or create a pooled HTTP session for image provider calls"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=16)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def provider_limit(provider: str, limit: int) -> threading.BoundedSemaphore:
+    """Process-wide cap on concurrent requests to one provider (the first caller sets the size)"""
+    with _lock:
+        if provider not in _limits:
+            _limits[provider] = threading.BoundedSemaphore(max(1, limit))
+        return _limits[provider]
+
+def image_prompt(title: str, topic: str) -> str:
+    return f"Professional Instagram carousel image: {title}. Topic: {topic}. Style: modern, clean, vibrant, social media optimized, no text overlay"
+
+def image_seed(prompt: str, salt: int = 0) -> int:
+    """
+    Deterministic Stability seed for a prompt, so identical requests are
+    cacheable; a different salt gives a fresh image for the same prompt
+    """
+    digest = hashlib.sha256(f"{salt}:{prompt}".encode()).digest()
+    return int.from_bytes(digest[:4], "big") % 4294967294 + 1  # 0 means "random" to the API
+
+def stability_payload(prompt: str, width: int = 1024, height: int = 1024, steps: int = 30, cfg_scale: float = 7, seed: int = 0) -> Dict:
+    return {
+        "text_prompts": [{"text": prompt}],
+        "cfg_scale": cfg_scale,
+        "height": height,
+        "width": width,
+        "samples": 1,
+        "steps": steps,
+        "seed": seed,
+    }
+
+def generate_stability_image(payload: Dict, api_key: str, api_host: str = STABILITY_API_HOST, timeout: float = 60) -> bytes:
+    """
+    Run one text-to-image request
+
+    Returns:
+        PNG bytes
+
+    Raises:
+        ImageGenerationError with the API's status/message
+    """
+    response = get_image_session().post(
+        f"{api_host}/v1/generation/{STABILITY_ENGINE}/text-to-image",
+        headers={
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        },
+        json=payload,
+        timeout=timeout
+    )
+
+    if response.status_code != 200:
+        error_detail = f"API returned {response.status_code}"
+        try:
+            error_body = response.json()
+            if 'message' in error_body:
+                error_detail += f": {error_body['message']}"
+        except ValueError:
+            pass
+        raise ImageGenerationError(error_detail)
+
+    for artifact in response.json().get("artifacts", []):
+        if artifact.get("finishReason") == "SUCCESS":
+            return base64.b64decode(artifact.get("base64"))
+    raise ImageGenerationError("No successful image in the response")
+
+class SlideImageBatch:
+    """
+    Image requests for one carousel, keyed by slide title
+
+    Titles can be submitted while the carousel text is still streaming;
+    collect() then takes the final slide list, submits whatever wasn't
+    started yet, drops requests for titles that didn't make it into the
+    final text and gathers the results. With a cache, identical requests
+    are served from disk without touching the provider (or its cap);
+    seed_salt changes every seed, giving fresh images that bypass it.
+    Use steps=DRAFT_STEPS for previews and the same seed_salt with
+    FINAL_STEPS to render the approved slides in full.
+    """
+
+    def __init__(
+        self,
+        topic: str,
+        generate: Callable[[Dict], bytes],
+        executor: Executor,
+        limit: threading.BoundedSemaphore,
+        cache: Optional[ImageCache] = None,
+        seed_salt: int = 0,
+        steps: int = FINAL_STEPS
+    ):
+        self.topic = topic
+        self.generate = generate
+        self.executor = executor
+        self.limit = limit
+        self.cache = cache
+        self.seed_salt = seed_salt
+        self.steps = steps
+        self.failures: Dict[int, Dict] = {}  # slide_num -> {'title', 'error', 'steps'} after collect()
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _run(self, title: str) -> bytes:
+        prompt = image_prompt(title, self.topic)
+        payload = stability_payload(prompt, steps=self.steps, seed=image_seed(prompt, self.seed_salt))
+        if self.cache:
+            key = image_cache_key(payload, STABILITY_ENGINE)
+            data = self.cache.get(key)
+            if data is not None:
+                return data
+        with self.limit:
+            data = self.generate(payload)
+        if self.cache:
+            self.cache.put(key, data)
+        return data
+
+    def submit(self, title: str) -> None:
+        """Start the image request for a slide title (no-op if already started)"""
+        with self._lock:
+            if title not in self._futures:
+                self._futures[title] = self.executor.submit(self._run, title)
+
+    def cancel(self) -> None:
+        """Drop every request that hasn't started (e.g. the carousel text failed)"""
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+
+    def collect(
+        self,
+        slides: List[str],
+        on_result: Optional[Callable[[int, str, Optional[bytes], Optional[str]], None]] = None,
+        numbers: Optional[List[int]] = None
+    ) -> Tuple[List[Dict], List[str]]:
+        """
+        Wait for an image for every slide
+
+        Args:
+            slides: Final slide titles, in order
+            on_result: Called as on_result(slide_num, title, data, error) from the
+                       calling thread as each slide finishes (for progressive display)
+            numbers: Slide number of each title (default 1..n), for re-rendering
+                     a subset of a carousel
+
+        Returns:
+            (carousel_images in slide order as {'data', 'slide_num', 'title', 'steps'} dicts,
+             generation_errors as "Slide N: detail" strings in slide order)
+        """
+        numbers = numbers or list(range(1, len(slides) + 1))
+        for title in slides:
+            self.submit(title)
+        with self._lock:
+            for title, future in self._futures.items():
+                if title not in slides:
+                    future.cancel()  # Streamed title that was rewritten - don't pay for it
+            futures = {}
+            for slide_num, title in zip(numbers, slides):
+                futures.setdefault(self._futures[title], []).append((slide_num, title))
+
+        images: Dict[int, Dict] = {}
+        errors: Dict[int, str] = {}
+
+        for future in as_completed(futures):
+            for slide_num, title in futures[future]:
+                try:
+                    data = future.result()
+                except Exception as e:
+                    errors[slide_num] = f"Slide {slide_num}: {e}"
+                    self.failures[slide_num] = {'title': title, 'error': str(e), 'steps': self.steps}
+                    metrics.increment("images.failed")
+                    if on_result:
+                        on_result(slide_num, title, None, str(e))
+                    continue
+                images[slide_num] = {'data': data, 'slide_num': slide_num, 'title': title, 'steps': self.steps}
+                metrics.increment("images.generated")
+                if on_result:
+                    on_result(slide_num, title, data, None)
+
+        return [images[n] for n in sorted(images)], [errors[n] for n in sorted(errors)]
+
+def merge_slide_images(images: List[Dict], updates: List[Dict]) -> List[Dict]:
+    """Images with `updates` replacing or filling in slides by slide_num, in slide order"""
+    by_num = {img['slide_num']: img for img in images}
+    by_num.update({img['slide_num']: img for img in updates})
+    return [by_num[num] for num in sorted(by_num)]
@@ -0,0 +1,155 @@
+"""
+Stripe webhook receiver for XThreadMaster
+Verifies signed Stripe events and applies them to the local entitlement store.
+Streamlit can't accept POST requests, so this runs as its own small process:
+
+    STRIPE_WEBHOOK_SECRET=whsec_... python stripe_webhooks.py --port 8502
+
+Point a Stripe webhook endpoint at it with the customer.*, customer.subscription.*
+and checkout.session.completed events enabled.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Tuple
+
+import requests
+
+from entitlement_store import DEFAULT_DB_PATH, EntitlementStore, apply_event
+from subscriptions import STRIPE_API_BASE
+
+# Reject events signed more than 5 minutes ago (replay protection)
+SIGNATURE_TOLERANCE = 300
+
+def sign_payload(payload: bytes, secret: str, timestamp: Optional[int] = None) -> str:
+    """Build a Stripe-Signature header value for a payload (used by tests and fixture replay)"""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signed = f"{timestamp}.".encode() + payload
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+def verify_signature(payload: bytes, header: str, secret: str, tolerance: int = SIGNATURE_TOLERANCE) -> bool:
+    """
+    Verify a Stripe-Signature header
+
+    Returns:
+        True if one of the v1 signatures matches and the timestamp is recent
+    """
+    if not header or not secret:
+        return False
+
+    timestamp = None
+    signatures = []
+    for part in header.split(","):
+        key, _, value = part.strip().partition("=")
+        if key == "t":
+            timestamp = value
+        elif key == "v1":
+            signatures.append(value)
+
+    if not timestamp or not timestamp.isdigit() or not signatures:
+        return False
+    if abs(time.time() - int(timestamp)) > tolerance:
+        return False
+
+    signed = f"{timestamp}.".encode() + payload
+    expected = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return any(hmac.compare_digest(expected, sig) for sig in signatures)
+
+def handle_webhook(
+    payload: bytes,
+    signature_header: str,
+    secret: str,
+    store: EntitlementStore,
+    customer_lookup: Optional[Callable[[str], Optional[str]]] = None
+) -> Tuple[int, str]:
+    """
+    Verify and apply a single webhook delivery
+
+    Returns:
+        (HTTP status code, short message) to send back to Stripe
+    """
+    if not verify_signature(payload, signature_header, secret):
+        return 400, "invalid signature"
+
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        return 400, "invalid payload"
+
+    try:
+        applied = apply_event(store, event, customer_lookup)
+    except Exception as e:
+        # Non-2xx makes Stripe retry the delivery later
+        print(f"Error applying webhook event {event.get('id')}: {e}")
+        return 500, "error"
+
+    return 200, "applied" if applied else "ignored"
+
+def stripe_customer_lookup(secret_key: str) -> Callable[[str], Optional[str]]:
+    """Build a customer_lookup that fetches a customer's email from Stripe"""
+    def lookup(customer_id: str) -> Optional[str]:
+        response = requests.get(
+            f"{STRIPE_API_BASE}/customers/{customer_id}",
+            auth=(secret_key, ""),
+            timeout=10
+        )
+        return response.json().get("email")
+    return lookup
+
+def make_handler(
+    secret: str,
+    store: EntitlementStore,
+    customer_lookup: Optional[Callable[[str], Optional[str]]] = None
+):
+    """Create a request handler class bound to a secret and store"""
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = self.rfile.read(length)
+            status, message = handle_webhook(
+                payload,
+                self.headers.get("Stripe-Signature", ""),
+                secret,
+                store,
+                customer_lookup
+            )
+            body = json.dumps({"status": message}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            print(f"[stripe-webhooks] {format % args}")
+
+    return WebhookHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Receive Stripe webhooks into the local entitlement store")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite entitlement store path")
+    args = parser.parse_args()
+
+    secret = os.environ.get("STRIPE_WEBHOOK_SECRET", "")
+    if not secret:
+        raise SystemExit("STRIPE_WEBHOOK_SECRET must be set")
+
+    stripe_key = os.environ.get("STRIPE_SECRET_KEY", "")
+    customer_lookup = stripe_customer_lookup(stripe_key) if stripe_key else None
+
+    store = EntitlementStore(args.db)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(secret, store, customer_lookup))
+    print(f"🔔 Listening for Stripe webhooks on {args.host}:{args.port} (store: {args.db})")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Subscription tier resolution for XThreadMaster
+Looks up active Stripe subscriptions and caches the resolved tier per user
+so Streamlit reruns don't hit Stripe on every interaction
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from analytics import get_user_hash
+
+STRIPE_API_BASE = "https://api.stripe.com/v1"
+
+# Max concurrent per-customer subscription lookups (and pooled connections)
+MAX_FANOUT = 8
+
+def tier_for_amount(amount: float) -> Optional[str]:
+    """
+    Map a monthly price in dollars to a subscription tier
+
+    Returns:
+        'visual_pack' ($17/mo), 'pro' ($12/mo) or None if the price doesn't match a tier
+    """
+    if amount >= 17:
+        return 'visual_pack'  # $17/mo - Instagram + X
+    elif amount >= 12:
+        return 'pro'  # $12/mo - X only
+    return None
+
+@dataclass(frozen=True)
+class Entitlement:
+    """Resolved subscription entitlement for a user"""
+    tier: str
+    price: Optional[float] = None  # Monthly price in dollars
+    period_end: Optional[int] = None  # Unix timestamp the current period ends
+
+FREE_ENTITLEMENT = Entitlement('free')
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+def get_stripe_session() -> requests.Session:
+    """Get or create a pooled HTTP session for Stripe calls"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_FANOUT)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+def entitlement_from_subscriptions(subs: List[Dict]) -> Entitlement:
+    """
+    Pick the best entitlement across all items of all active subscriptions
+
+    Returns:
+        Highest-tier Entitlement found, 'pro' if subscriptions exist but no
+        price could be parsed, or FREE_ENTITLEMENT if there are none
+    """
+    best = None
+    active = [sub for sub in subs if sub.get("status", "active") == "active"]
+
+    for sub in active:
+        for item in sub.get("items", {}).get("data", []):
+            price = item.get("price") or {}
+            amount = (price.get("unit_amount") or 0) / 100  # Convert cents to dollars
+            if (price.get("recurring") or {}).get("interval") == "year":
+                amount = amount / 12
+            tier = tier_for_amount(amount)
+            if not tier:
+                continue
+            period_end = item.get("current_period_end") or sub.get("current_period_end")
+            candidate = Entitlement(tier, round(amount, 2), period_end)
+            if best is None or (candidate.price, candidate.period_end or 0) > (best.price, best.period_end or 0):
+                best = candidate
+
+    if best:
+        return best
+
+    # If we found subscriptions but couldn't parse price, default to pro
+    if active:
+        return Entitlement('pro', None, active[0].get("current_period_end"))
+
+    return FREE_ENTITLEMENT
+
+def fetch_entitlement(email: str, secret_key: str, api_base: str = STRIPE_API_BASE) -> Entitlement:
+    """
+    Look up a user's entitlement in Stripe
+
+    Customers are listed with their subscriptions expanded, so the common case
+    is a single round-trip. Customers whose embedded subscription list is
+    missing or truncated are queried concurrently on the pooled session.
+
+    Raises requests exceptions on network errors so callers can decide
+    whether the result is safe to cache.
+    """
+    session = get_stripe_session()
+    auth = (secret_key, "")
+
+    custs_response = session.get(
+        f"{api_base}/customers",
+        params={"email": email, "expand[]": "data.subscriptions", "limit": 100},
+        auth=auth,
+        timeout=10
+    )
+    custs_response.raise_for_status()
+    custs = custs_response.json().get("data", [])
+
+    subs = []
+    needs_fanout = []
+    for c in custs:
+        embedded = c.get("subscriptions")
+        if isinstance(embedded, dict) and not embedded.get("has_more"):
+            subs.extend(embedded.get("data", []))
+        else:
+            needs_fanout.append(c["id"])
+
+    if needs_fanout:
+        def fetch_customer_subs(customer_id):
+            subs_response = session.get(
+                f"{api_base}/subscriptions",
+                params={"customer": customer_id, "status": "active", "limit": 100},
+                auth=auth,
+                timeout=10
+            )
+            subs_response.raise_for_status()
+            return subs_response.json().get("data", [])
+
+        with ThreadPoolExecutor(max_workers=min(MAX_FANOUT, len(needs_fanout))) as pool:
+            for customer_subs in pool.map(fetch_customer_subs, needs_fanout):
+                subs.extend(customer_subs)
+
+    return entitlement_from_subscriptions(subs)
+
+def fetch_stripe_tier(email: str, secret_key: str) -> str:
+    """
+    Check Stripe for active subscriptions and return the user's tier
+
+    Returns:
+        'free', 'pro' or 'visual_pack'
+    """
+    return fetch_entitlement(email, secret_key).tier
+
+class TierCache:
+    """
+    Thread-safe TTL cache of resolved subscription tiers, keyed by hashed email
+
+    Paid tiers are kept for `ttl` seconds. Free results are cached too
+    (negative caching) but for `negative_ttl` seconds, so a user who has
+    just subscribed is upgraded without waiting for the full TTL.
+    """
+
+    def __init__(self, ttl: float = 600, negative_ttl: float = 120, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, email: str) -> Optional[str]:
+        """Return the cached tier for an email, or None if missing or expired"""
+        key = get_user_hash(email)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > self._clock():
+                self.hits += 1
+                return entry[0]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, email: str, tier: str):
+        """Store a resolved tier for an email"""
+        ttl = self.negative_ttl if tier == 'free' else self.ttl
+        with self._lock:
+            self._entries[get_user_hash(email)] = (tier, self._clock() + ttl)
+
+    def invalidate(self, email: str):
+        """Drop the cached tier for an email so the next lookup goes to Stripe"""
+        with self._lock:
+            self._entries.pop(get_user_hash(email), None)
+
+    def clear(self):
+        """Drop all cached tiers"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and current cache size"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "size": len(self._entries)
+            }
+
+def resolve_tier(email: str, cache: TierCache, fetch: Callable[[str], str]) -> str:
+    """
+    Resolve a user's tier, serving from cache when possible
+
+    Args:
+        email: User's email
+        cache: Tier cache to read from and populate
+        fetch: Callable that looks up the tier live (e.g. fetch_stripe_tier)
+
+    Returns:
+        'free', 'pro' or 'visual_pack'. Errors raised by `fetch` propagate
+        and are never cached.
+    """
+    if not email or not email.strip():
+        return 'free'
+
+    tier = cache.get(email)
+    if tier is not None:
+        return tier
+
+    tier = fetch(email)
+    cache.set(email, tier)
+    return tier
@@ -0,0 +1,190 @@
+"""
+Test script for Gemini admission control
+Uses fake model calls, so no API key or network is needed
+"""
+
+import threading
+import time
+
+from admission import AdmissionController, AdmissionTimeout, TokenBucket, is_rate_limit_error
+from model_router import HedgeBudget, ModelRouter
+
+class ResourceExhausted(Exception):
+    """Stand-in for google.api_core.exceptions.ResourceExhausted"""
+
+def test_token_bucket():
+    """Test refill and wait-time math with a fake clock"""
+
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])  # 1 request per second, burst of 60
+
+    for _ in range(60):
+        assert bucket.wait_time(1) == 0
+        bucket.consume(1)
+    assert abs(bucket.wait_time(1) - 1.0) < 1e-9
+
+    now[0] = 2.5
+    assert bucket.wait_time(2) == 0
+    print("✅ Token bucket refills at the configured rate")
+
+def test_retry_with_backoff():
+    """Test that 429s are retried with bounded, jittered backoff"""
+
+    print("🧪 Testing Admission Control")
+    print("=" * 50)
+
+    controller = AdmissionController(requests_per_minute=600, max_retries=3, base_delay=0.5, max_delay=4)
+    attempts = []
+    sleeps = []
+
+    def flaky_call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ResourceExhausted("429 Resource exhausted")
+        return "🚀 thread"
+
+    assert controller.call(flaky_call, tokens=100, sleep=sleeps.append) == "🚀 thread"
+    assert len(attempts) == 3 and len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.5 and 0 <= sleeps[1] <= 1.0
+    print(f"✅ Succeeded after {len(sleeps)} retries (slept {[round(s, 2) for s in sleeps]})")
+
+    def always_limited():
+        raise ResourceExhausted("429 Resource exhausted")
+
+    try:
+        controller.call(always_limited, sleep=lambda _: None)
+        assert False, "expected the rate-limit error to be re-raised"
+    except ResourceExhausted:
+        pass
+
+    def broken():
+        raise ValueError("invalid prompt")
+
+    try:
+        controller.call(broken, sleep=sleeps.append)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("✅ Retries are bounded and other errors are not retried")
+
+    assert is_rate_limit_error(Exception("429 Too Many Requests"))
+    assert not is_rate_limit_error(Exception("400 Bad Request"))
+
+def test_queue_deadline_and_burst():
+    """Test that bursts wait briefly instead of failing, and give up at the deadline"""
+
+    controller = AdmissionController(requests_per_minute=600, queue_timeout=2)  # 10 requests/sec
+    controller.requests.tokens = 0  # Simulate a bucket already drained by earlier traffic
+
+    admitted = []
+    failed = []
+
+    def worker():
+        try:
+            controller.acquire(tokens=10)
+            admitted.append(time.monotonic())
+        except AdmissionTimeout:
+            failed.append(1)
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    elapsed = time.monotonic() - start
+    assert len(admitted) == 5 and not failed
+    assert elapsed < 1.5
+    print(f"✅ Burst of 5 admitted in {elapsed:.2f}s with no failures")
+
+    slow = AdmissionController(requests_per_minute=1, queue_timeout=0.2)
+    slow.requests.tokens = 0
+    try:
+        slow.acquire()
+        assert False, "expected AdmissionTimeout"
+    except AdmissionTimeout:
+        pass
+    assert slow.queue_length() == 0
+    print("✅ Requests that can't be admitted before the deadline fail fast")
+
+def test_batch_share():
+    """Test that a child controller is capped and only takes the parent's spare capacity"""
+
+    interactive = AdmissionController(requests_per_minute=60, queue_timeout=2)
+    batch = AdmissionController(requests_per_minute=3, queue_timeout=0.3, parent=interactive, parent_poll=0.05)
+
+    # Capped at its own share even when the parent has plenty left
+    for _ in range(3):
+        batch.acquire()
+    try:
+        batch.acquire()
+        assert False, "expected AdmissionTimeout"
+    except AdmissionTimeout:
+        pass
+    assert round(interactive.requests.tokens) == 60 - 3  # Charged against the shared quota too
+    print("✅ Batch traffic capped at its own share")
+
+    # Parent out of capacity: batch waits, interactive callers go first once it refills
+    batch = AdmissionController(requests_per_minute=60, queue_timeout=5, parent=interactive, parent_poll=0.05)
+    interactive.requests.tokens = 0
+    order = []
+    batch_thread = threading.Thread(target=lambda: (batch.acquire(), order.append("batch")))
+    batch_thread.start()
+    time.sleep(0.1)
+    assert not order
+    interactive.acquire()  # Queues ahead of the polling batch request
+    order.append("interactive")
+    batch_thread.join()
+    assert order == ["interactive", "batch"]
+    print("✅ Batch traffic only uses spare capacity")
+
+def test_failover_charged_per_attempt():
+    """Test that every model call a routed request sends is admitted separately"""
+
+    calls = []
+
+    def generate(model):
+        calls.append(model)
+        if model != "healthy":
+            raise RuntimeError(f"{model} is down")
+        return "🚀 thread"
+
+    controller = AdmissionController(requests_per_minute=10, queue_timeout=0.1)
+    router = ModelRouter([("a", "down-a"), ("b", "down-b"), ("c", "healthy")], failure_threshold=99)
+    admit = controller.acquirer(tokens=100)
+    assert controller.call(lambda: router.call(generate, admit=admit), tokens=100, admit=False) == "🚀 thread"
+    assert len(calls) == 3
+    assert round(controller.requests.tokens) == 7
+    print("✅ Three model calls charged three requests")
+
+    # With only two requests left in the bucket, the third model call isn't sent
+    calls.clear()
+    controller = AdmissionController(requests_per_minute=2, queue_timeout=0.1)
+    try:
+        controller.call(lambda: router.call(generate, admit=controller.acquirer()), admit=False)
+        assert False, "expected AdmissionTimeout"
+    except AdmissionTimeout:
+        pass
+    assert calls == ["down-a", "down-b"]
+
+    # Hedged requests charge the first attempt and each failover the same way
+    for _ in range(5):
+        router.record("a", True, 0.01)
+    calls.clear()
+    controller = AdmissionController(requests_per_minute=10, queue_timeout=0.1)
+    result = router.call_hedged(
+        lambda model, cancelled: generate(model),
+        HedgeBudget(ratio=0.0),
+        admit=controller.acquirer()
+    )
+    assert result == "🚀 thread" and len(calls) > 1
+    assert round(controller.requests.tokens) == 10 - len(calls)
+    print("✅ Failover stops once the request budget is spent, hedged or not")
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_retry_with_backoff()
+    test_queue_deadline_and_burst()
+    test_batch_share()
+    test_failover_charged_per_attempt()
@@ -0,0 +1,113 @@
+"""
+Test script for batch generation
+Uses a fake generator, so no API key or network is needed
+"""
+
+import csv
+import io
+import os
+import tempfile
+import threading
+import zipfile
+
+from batch import BatchError, default_work_dir, parse_rows, pending_rows, run_batch
+
+CSV_FILE = b"""topic,platform,tone,length,template,product_name
+AI productivity tips,X Thread,Casual,5,,
+Remote work lessons,LinkedIn Post,Pro,,,
+Morning routines,Instagram Carousel,Funny,6,,
+,X Thread,Casual,5,saas_launch,Rocketship
+"""
+
+class FakeGenerator:
+    """Returns a short thread per prompt; fails the first `flaky` calls for prompts containing `fail_on`"""
+
+    def __init__(self, fail_on=None, flaky=0):
+        self.fail_on = fail_on
+        self.flaky = flaky
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+            if self.fail_on and self.fail_on in prompt.text and self.flaky:
+                self.flaky -= 1
+                raise RuntimeError("503 Service Unavailable")
+        return f"Generated {prompt.platform}\nSecond line 🚀"
+
+def test_parse_rows():
+    """Test CSV/JSONL parsing and validation"""
+
+    print("🧪 Testing Batch Mode")
+    print("=" * 50)
+
+    rows = parse_rows(CSV_FILE, "calendar.csv")
+    assert len(rows) == 4
+    assert rows[0]["length"] == 5 and rows[1]["length"] is None and rows[2]["length"] == 6
+    assert rows[3]["template"] == "saas_launch" and rows[3]["placeholders"] == {"product_name": "Rocketship"}
+
+    jsonl = b'{"topic": "AI", "platform": "X Thread"}\n{"template": "saas_launch", "placeholders": {"url": "x.com"}}\n'
+    rows = parse_rows(jsonl, "calendar.jsonl")
+    assert rows[0]["tone"] == "Casual" and rows[0]["length"] == 8
+    assert rows[1]["placeholders"] == {"url": "x.com"}
+
+    for bad in (b"topic,platform\nAI,TikTok\n", b"topic,platform\n,X Thread\n", b"topic,length\nAI,lots\n",
+                b"topic,length\nAI,500\n", b"topic,length\nAI,0\n", b"topic,platform,length\nAI,Instagram Carousel,12\n"):
+        try:
+            parse_rows(bad, "bad.csv")
+            assert False, "expected BatchError"
+        except BatchError:
+            pass
+
+    # Carousels only for plans that include them
+    try:
+        parse_rows(CSV_FILE, "calendar.csv", platforms=["X Thread", "LinkedIn Post"])
+        assert False, "expected BatchError"
+    except BatchError as e:
+        assert str(e).startswith("Row 3:")
+
+    # Same file, different users: separate resume directories
+    assert default_work_dir(CSV_FILE, "a@x.com") == default_work_dir(CSV_FILE, "A@x.com ")
+    assert default_work_dir(CSV_FILE, "a@x.com") != default_work_dir(CSV_FILE, "b@x.com")
+    print("✅ CSV and JSONL rows parsed and validated")
+
+def test_run_and_resume():
+    """Test per-row retries, failures and resuming an interrupted batch"""
+
+    rows = parse_rows(CSV_FILE, "calendar.csv")
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = os.path.join(tmp, "work")
+        out = os.path.join(tmp, "batch.zip")
+
+        # "Morning routines" keeps failing past its retry; the other rows succeed
+        flaky = FakeGenerator(fail_on="Morning routines", flaky=10)
+        progress = []
+        assert len(pending_rows(rows, work_dir)) == 4
+        summary = run_batch(rows, flaky, out, work_dir, workers=3, retries=1, on_progress=lambda *p: progress.append(p), sleep=lambda _: None)
+        assert summary["done"] == 3 and summary["failed"] == 1
+        assert summary["generated"] == {"X Thread": 2, "LinkedIn Post": 1}
+        assert [row["topic"] for row in pending_rows(rows, work_dir)] == ["Morning routines"]
+        assert progress[-1] == (3, 1, 4)
+
+        with zipfile.ZipFile(out) as archive:
+            names = archive.namelist()
+            manifest = list(csv.DictReader(io.StringIO(archive.read("manifest.csv").decode())))
+        assert len([n for n in names if n.endswith(".txt")]) == 3
+        assert [m["status"] for m in manifest] == ["done", "done", "failed", "done"]
+        assert any(n.startswith("x_thread/0004-") for n in names)  # Template row split locally
+        print(f"✅ First run: {summary['done']} done, {summary['failed']} failed after retries")
+
+        # Re-run: only the failed row is generated again
+        healthy = FakeGenerator()
+        summary = run_batch(rows, healthy, out, work_dir, workers=3, sleep=lambda _: None)
+        assert summary["done"] == 4 and summary["failed"] == 0 and summary["resumed"] == 3
+        assert len(healthy.prompts) == 1 and "Morning routines" in healthy.prompts[0].text
+        assert summary["generated"] == {"Instagram Carousel": 1}
+        with zipfile.ZipFile(out) as archive:
+            assert len([n for n in archive.namelist() if n.endswith(".txt")]) == 4
+        print("✅ Resumed run regenerated only the failed row")
+
+if __name__ == "__main__":
+    test_parse_rows()
+    test_run_and_resume()
@@ -0,0 +1,74 @@
+"""
+Test script for the session-scoped, disk-backed blob store
+"""
+
+import os
+import tempfile
+import time
+
+from blob_store import BlobStore
+
+def test_handles_and_mmap_reads():
+    """Test that session state only needs a handle and reads are memory-mapped"""
+
+    print("🧪 Testing Blob Store")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(tmp)
+        image = os.urandom(4096)
+        handle = store.put("session1", image)
+        assert isinstance(handle, str) and len(handle) < 100
+        assert store.put("session1", image) == handle  # Same bytes, same handle
+        assert store.read(handle) == image
+
+        with store.open(handle) as view:
+            assert len(view) == 4096 and view[:16] == image[:16]
+
+        # Handles can't reach outside the store
+        assert store.open("../etc/passwd") is None and store.open("session1/../../x") is None
+        try:
+            store.put("../evil", b"x")
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
+        print(f"✅ {len(image)}-byte image kept on disk behind a {len(handle)}-char handle")
+
+def test_lru_cap_and_accounting():
+    """Test the byte cap, per-session accounting and reload after restart"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(tmp, max_bytes=250)
+        a = store.put("alice", b"a" * 100)
+        b = store.put("bob", b"b" * 100)
+        assert store.open(a) is not None  # Touch a so b is the oldest
+        c = store.put("alice", b"c" * 100)
+        assert store.read(b) is None and store.read(a) and store.read(c)
+
+        stats = store.stats()
+        assert stats["bytes"] == 200 and stats["blobs"] == 2 and stats["evictions"] == 1
+        assert store.session_bytes("alice") == 200 and store.session_bytes("bob") == 0
+        print(f"✅ Store stays within its byte cap: {stats}")
+
+        restarted = BlobStore(tmp, max_bytes=250)
+        assert restarted.stats()["bytes"] == 200 and restarted.read(c) == b"c" * 100
+
+def test_ttl_cleanup():
+    """Test that abandoned sessions are removed while active ones stay"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(tmp, ttl=60)
+        old = store.put("abandoned", b"old image")
+        new = store.put("active", b"new image")
+        past = time.time() - 120
+        os.utime(os.path.join(tmp, "abandoned"), (past, past))
+
+        assert store.cleanup() == 1
+        assert store.read(old) is None and store.read(new) == b"new image"
+        assert store.stats()["sessions"] == 1 and store.stats()["expired_sessions"] == 1
+        print("✅ Idle sessions expire, active sessions are kept")
+
+if __name__ == "__main__":
+    test_handles_and_mmap_reads()
+    test_lru_cap_and_accounting()
+    test_ttl_cleanup()
@@ -0,0 +1,54 @@
+"""
+Test script for the carousel ZIP export
+"""
+
+import io
+import os
+import tempfile
+import zipfile
+
+from blob_store import BlobStore
+from carousel_export import package_key, write_carousel_zip
+
+def test_stored_zip_from_blobs():
+    """Test that images are stored uncompressed, streamed from the blob store"""
+
+    print("🧪 Testing Carousel Export")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(tmp)
+        images = [os.urandom(300_000) for _ in range(3)]
+        handles = [store.put("session1", data) for data in images]
+        files = [(f"square_1080x1080/slide_{i:02d}.jpg", h) for i, h in enumerate(handles, 1)]
+        files.append(("slide_04.png", "session1/" + "0" * 32))  # Evicted blob is skipped
+
+        captions = "SLIDE 1: Hook\nIntro\n" * 50
+        package = store.put_stream(
+            "session1",
+            lambda out: write_carousel_zip(out, captions, [(name, lambda h=h: store.open(h)) for name, h in files])
+        )
+
+        with zipfile.ZipFile(io.BytesIO(store.read(package))) as archive:
+            assert archive.namelist() == ["captions.txt"] + [name for name, _ in files[:3]]
+            assert archive.read("captions.txt").decode() == captions
+            assert archive.getinfo("captions.txt").compress_type == zipfile.ZIP_DEFLATED
+            for (name, _), data in zip(files, images):
+                assert archive.getinfo(name).compress_type == zipfile.ZIP_STORED
+                assert archive.read(name) == data
+            assert archive.testzip() is None
+        print(f"✅ {len(handles)} images stored uncompressed, ZIP is {len(store.read(package)) / 1024:.0f}KB")
+
+def test_package_key():
+    """Test that the package is rebuilt only when its contents change"""
+
+    key = package_key("captions", ["s/a", "s/b"])
+    assert key == package_key("captions", ["s/a", "s/b"])
+    assert key != package_key("captions edited", ["s/a", "s/b"])
+    assert key != package_key("captions", ["s/a", "s/c"])
+    assert key != package_key("captions", ["s/b", "s/a"])
+    print("✅ Package fingerprint follows captions and images")
+
+if __name__ == "__main__":
+    test_stored_zip_from_blobs()
+    test_package_key()
@@ -0,0 +1,108 @@
+"""
+Test script for Gemini generation helpers
+Uses fake model backends, so no API key or network is needed
+"""
+
+import os
+import tempfile
+import time
+
+import metrics
+from generation import generate_text
+from generation_cache import GenerationCache, cache_key
+
+class FakeChunk:
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError("chunk has no text parts")
+        return self._text
+
+class FakeStreamingModel:
+    """Yields the response in chunks with a delay between them"""
+
+    def __init__(self, chunks, delay=0.01):
+        self.chunks = chunks
+        self.delay = delay
+        self.calls = []
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls.append((prompt, stream, kwargs))
+        if not stream:
+            return FakeChunk("".join(c for c in self.chunks if c))
+
+        def chunks():
+            for text in self.chunks:
+                time.sleep(self.delay)
+                yield FakeChunk(text)
+        return chunks()
+
+def test_streaming_generation():
+    """Test partial rendering, final assembly and time-to-first-token"""
+
+    print("🧪 Testing Streaming Generation")
+    print("=" * 50)
+
+    metrics.reset()
+    model = FakeStreamingModel(["🚀 Tweet one\n", None, "Tweet two\n", "Tweet three  "])
+    partials = []
+
+    text = generate_text(model, "prompt", stream=True, on_chunk=partials.append)
+
+    assert text == "🚀 Tweet one\nTweet two\nTweet three"
+    assert partials == ["🚀 Tweet one\n", "🚀 Tweet one\nTweet two\n", "🚀 Tweet one\nTweet two\nTweet three  "]
+    print(f"✅ Rendered {len(partials)} partial updates, assembled {len(text)} chars")
+
+    ttft = metrics.summarize("gemini.ttft")
+    latency = metrics.summarize("gemini.latency")
+    assert ttft["count"] == 1 and latency["count"] == 1
+    assert ttft["p50"] < latency["p50"]
+    print(f"✅ TTFT {ttft['p50'] * 1000:.0f}ms vs total {latency['p50'] * 1000:.0f}ms")
+
+    blocking = generate_text(model, "prompt", stream=False)
+    assert blocking == text
+    assert model.calls[-1][1] is False
+    print("✅ Non-streaming mode returns the same text")
+
+def test_generation_cache():
+    """Test key normalization, LRU byte bound and the disk tier"""
+
+    print("🧪 Testing Generation Cache")
+    print("=" * 50)
+
+    key = cache_key("Create a thread about:  AI \n\nTone: Casual ", "gemini-1.5-flash", {"temperature": 0.9})
+    assert key == cache_key("Create a thread about: AI\n\nTone: Casual", "gemini-1.5-flash", {"temperature": 0.9})
+    assert key != cache_key("Create a thread about: AI\n\nTone: Casual", "gemini-1.5-pro", {"temperature": 0.9})
+    assert key != cache_key("Create a thread about: AI\n\nTone: Casual", "gemini-1.5-flash", {"temperature": 0.2})
+    print("✅ Keys ignore whitespace noise but not model or config")
+
+    cache = GenerationCache(max_bytes=100)
+    cache.put("a", "x" * 40)
+    cache.put("b", "y" * 40)
+    assert cache.get("a") is not None  # a is now most recently used
+    cache.put("c", "z" * 40)
+    assert cache.get("b") is None and cache.get("a") and cache.get("c")
+    assert cache.stats()["memory_bytes"] <= 100
+    print(f"✅ LRU stays within its byte bound: {cache.stats()}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        disk_cache = GenerationCache(max_bytes=1024, disk_dir=tmp, disk_ttl=60)
+        disk_cache.put(key, "cached thread")
+
+        # A fresh process (empty memory tier) still finds the entry on disk
+        restarted = GenerationCache(max_bytes=1024, disk_dir=tmp, disk_ttl=60)
+        assert restarted.get(key) == "cached thread"
+        assert restarted.stats()["disk_bytes"] > 0
+
+        expired = GenerationCache(max_bytes=1024, disk_dir=tmp, disk_ttl=0)
+        time.sleep(0.01)
+        assert expired.get(key) is None
+        assert not os.listdir(tmp)
+        print("✅ Disk tier serves entries until the TTL passes")
+
+if __name__ == "__main__":
+    test_streaming_generation()
+    test_generation_cache()
@@ -0,0 +1,77 @@
+"""
+Test script for the content-addressed slide image cache
+"""
+
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from image_cache import ImageCache, image_cache_key
+from slide_images import STABILITY_ENGINE, SlideImageBatch, image_prompt, image_seed, stability_payload
+
+def test_cache_keys():
+    """Test that every payload field, including the seed, is part of the key"""
+
+    print("🧪 Testing Image Cache")
+    print("=" * 50)
+
+    prompt = image_prompt("Start Strong", "morning routines")
+    seed = image_seed(prompt)
+    assert seed == image_seed(prompt) and seed != image_seed(prompt, salt=7) and seed > 0
+    base = stability_payload(prompt, seed=seed)
+    assert base["seed"] == seed
+    key = image_cache_key(base, STABILITY_ENGINE)
+    assert key == image_cache_key(dict(reversed(list(base.items()))), STABILITY_ENGINE)
+    for change in ({"steps": 10}, {"width": 512}, {"cfg_scale": 5}, {"seed": seed + 1}):
+        assert image_cache_key(stability_payload(prompt, **{"seed": seed, **change}), STABILITY_ENGINE) != key
+    assert image_cache_key(base, "another-engine") != key
+    print("✅ Keys cover prompt, dimensions, steps, cfg_scale, seed and engine")
+
+def test_lru_on_disk():
+    """Test the byte cap, LRU order and restarts"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ImageCache(tmp, max_bytes=250)
+        cache.put("a", b"a" * 100)
+        cache.put("b", b"b" * 100)
+        assert cache.get("a") == b"a" * 100  # a is now most recently used
+        cache.put("c", b"c" * 100)
+        assert cache.get("b") is None
+        assert cache.get("a") and cache.get("c")
+        assert not os.path.exists(os.path.join(tmp, "b.img"))
+
+        stats = cache.stats()
+        assert stats["bytes"] == 200 and stats["entries"] == 2
+        assert stats["hits"] == 3 and stats["misses"] == 1 and stats["bytes_served"] == 300
+        print(f"✅ LRU stays within its byte cap: {stats}")
+
+        restarted = ImageCache(tmp, max_bytes=250)
+        assert restarted.stats()["bytes"] == 200
+        assert restarted.get("c") == b"c" * 100
+        print("✅ Cached images survive a restart")
+
+def test_cached_generation():
+    """Test that identical carousels skip the provider entirely"""
+
+    calls = []
+
+    def provider(payload):
+        calls.append(payload["seed"])
+        return payload["text_prompts"][0]["text"].encode()
+
+    with tempfile.TemporaryDirectory() as tmp, ThreadPoolExecutor(max_workers=4) as pool:
+        cache = ImageCache(tmp)
+        slides = ["Hook", "Tip", "Wrap up"]
+        limit = threading.BoundedSemaphore(2)
+        first, _ = SlideImageBatch("habits", provider, pool, limit, cache=cache).collect(slides)
+        second, _ = SlideImageBatch("habits", provider, pool, limit, cache=cache).collect(slides)
+        assert len(calls) == 3 and first == second
+        SlideImageBatch("habits", provider, pool, limit, cache=cache).collect(["Hook", "New slide"])
+        assert len(calls) == 4
+        print(f"✅ Second identical carousel used no credits: {cache.stats()}")
+
+if __name__ == "__main__":
+    test_cache_keys()
+    test_lru_on_disk()
+    test_cached_generation()
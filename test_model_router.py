@@ -0,0 +1,171 @@
+"""
+Test script for the latency-aware model router
+Uses fake model backends that inject latency and errors
+"""
+
+import time
+
+from model_router import HedgeBudget, HedgeCancelled, ModelRouter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeBackend:
+    """Fake model that advances the clock by `latency` and fails while `failing` is set"""
+
+    def __init__(self, name, clock, latency, failing=False):
+        self.name = name
+        self.clock = clock
+        self.latency = latency
+        self.failing = failing
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        self.clock.now += self.latency
+        if self.failing:
+            raise RuntimeError(f"{self.name}: 503 Service Unavailable")
+        return f"{self.name}: {prompt}"
+
+def make_router(clock, **backends):
+    models = [(name, backend) for name, backend in backends.items()]
+    return ModelRouter(models, failure_threshold=3, cooldown=60, min_samples=3, clock=clock)
+
+def test_failover_and_cooldown():
+    """Test call-time failover and cooldown of a model that keeps failing"""
+
+    print("🧪 Testing Model Router")
+    print("=" * 50)
+
+    clock = FakeClock()
+    flash = FakeBackend("flash", clock, latency=1.0, failing=True)
+    pro = FakeBackend("pro", clock, latency=3.0)
+    router = make_router(clock, flash=flash, pro=pro)
+
+    for _ in range(3):
+        assert router.call(lambda m: m.generate("hi")) == "pro: hi"
+    assert flash.calls == 3
+    print("✅ Failed over to the next model at call time")
+
+    router.call(lambda m: m.generate("hi"))
+    assert flash.calls == 3  # On cooldown, not even tried
+    assert router.stats()["flash"]["cooling_down"]
+    print("✅ Repeatedly failing model put on cooldown")
+
+    flash.failing = False
+    clock.now += 61
+    assert router.call(lambda m: m.generate("hi")) == "flash: hi"
+    print("✅ Model retried after cooldown expires")
+
+def test_latency_ranking():
+    """Test that the router prefers the faster healthy model"""
+
+    clock = FakeClock()
+    slow = FakeBackend("slow", clock, latency=5.0)
+    fast = FakeBackend("fast", clock, latency=0.5)
+    router = make_router(clock, slow=slow, fast=fast)
+
+    # Warm up: both models get measured
+    for _ in range(3):
+        router.record("slow", True, 5.0)
+        router.record("fast", True, 0.5)
+
+    assert [name for name, _ in router.ranked()] == ["fast", "slow"]
+    assert router.call(lambda m: m.generate("hi")) == "fast: hi"
+
+    # A fast model that errors a lot drops behind a slower reliable one
+    for _ in range(2):
+        router.record("fast", False, 0.5)
+        router.record("fast", True, 0.5)
+    router.record("fast", False, 0.5)
+    assert router.stats()["fast"]["success_rate"] < 0.8
+    assert [name for name, _ in router.ranked()] == ["slow", "fast"]
+    print(f"✅ Ranking follows latency and success rate: {router.stats()}")
+
+def test_all_models_failing():
+    clock = FakeClock()
+    router = make_router(clock, a=FakeBackend("a", clock, 1.0, failing=True), b=FakeBackend("b", clock, 1.0, failing=True))
+    try:
+        router.call(lambda m: m.generate("hi"))
+        assert False, "expected the last error to be raised"
+    except RuntimeError as e:
+        assert "b:" in str(e)
+    print("✅ Last error raised when every model fails")
+
+class SleepyBackend:
+    """Fake streaming model with real latency that stops when cancelled"""
+
+    def __init__(self, name, delays):
+        self.name = name
+        self.delays = list(delays)
+        self.calls = 0
+        self.cancelled = 0
+
+    def generate(self, cancelled):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        deadline = time.monotonic() + delay
+        while time.monotonic() < deadline:
+            if cancelled.is_set():
+                self.cancelled += 1
+                raise HedgeCancelled()
+            time.sleep(0.005)
+        return self.name
+
+def test_hedged_requests():
+    """Test that a slow first attempt is hedged and the faster answer wins"""
+
+    print("🧪 Testing Hedged Requests")
+    print("=" * 50)
+
+    primary = SleepyBackend("primary", [0.5])
+    backup = SleepyBackend("backup", [0.02])
+    router = ModelRouter([("primary", primary), ("backup", backup)], min_samples=3)
+    for _ in range(3):
+        router.record("primary", True, 0.05)  # Recent p95 is 50ms
+
+    budget = HedgeBudget(ratio=1.0, max_balance=1.0)
+    start = time.monotonic()
+    result = router.call_hedged(lambda model, cancelled: model.generate(cancelled), budget)
+    elapsed = time.monotonic() - start
+
+    assert result == "backup"
+    assert elapsed < 0.4
+    print(f"✅ Hedge answered in {elapsed * 1000:.0f}ms instead of waiting 500ms for the slow attempt")
+
+    time.sleep(0.05)
+    assert primary.cancelled == 1
+    print("✅ Losing attempt was cancelled")
+
+    # Budget exhausted: no hedge, the slow attempt is awaited
+    budget = HedgeBudget(ratio=0.0)
+    primary.delays = [0.1]
+    assert router.call_hedged(lambda model, cancelled: model.generate(cancelled), budget) == "primary"
+    assert backup.calls == 1
+    print("✅ No hedge sent when the budget is empty")
+
+    # Admission refuses the hedge: nothing sent, and the budget isn't spent
+    budget = HedgeBudget(ratio=1.0, max_balance=1.0)
+    primary.delays = [0.1]
+    result = router.call_hedged(lambda model, cancelled: model.generate(cancelled), budget, can_hedge=lambda: False)
+    assert result == "primary" and backup.calls == 1
+    assert budget.balance == 1.0
+    print("✅ Hedge budget refunded when admission refuses the hedge")
+
+def test_hedge_budget():
+    budget = HedgeBudget(ratio=0.1, max_balance=2)
+    for _ in range(100):
+        budget.deposit()
+    assert budget.withdraw() and budget.withdraw() and not budget.withdraw()
+    print("✅ Hedge budget is capped")
+
+if __name__ == "__main__":
+    test_failover_and_cooldown()
+    test_latency_ranking()
+    test_all_models_failing()
+    test_hedged_requests()
+    test_hedge_budget()
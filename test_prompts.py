@@ -0,0 +1,75 @@
+"""
+Test script for the prompt builder
+"""
+
+from prompts import PLATFORMS, build_item_prompt, build_prompt, count_tokens, prompt_mode
+
+def test_modes_and_templates():
+    """Test that each platform/mode builds a prompt without the static rules"""
+
+    print("🧪 Testing Prompt Builder")
+    print("=" * 50)
+
+    assert prompt_mode("AI tools") == "topic"
+    assert prompt_mode("", "Filled template") == "format"
+    assert prompt_mode("   ", "Filled template") == "format"
+    assert prompt_mode("AI tools", "Filled template") == "enhance"
+
+    for platform in PLATFORMS:
+        prompt = build_prompt(platform, "Casual", topic="AI tools", length=5)
+        assert "AI tools" in prompt.text and "Casual" in prompt.text
+        assert prompt.mode == "topic"
+        # Static rules are sent once as the system instruction, not in every prompt
+        assert prompt.system_instruction
+        assert prompt.system_instruction not in prompt.text
+
+    x = build_prompt("X Thread", "Bold", topic="$HOME and ${braces}", length=7)
+    assert "Exactly 7 tweets" in x.text
+    assert "$HOME and ${braces}" in x.text  # User text isn't treated as a template
+    assert "280 characters" in x.system_instruction
+    print("✅ Prompts built for every platform and mode")
+
+def test_generation_config():
+    """Test per-platform output caps"""
+
+    short = build_prompt("X Thread", "Casual", topic="AI", length=3)
+    long = build_prompt("X Thread", "Casual", topic="AI", length=15)
+    assert short.max_output_tokens < long.max_output_tokens
+    # Room for a full 3000-character post, emojis and hashtags included
+    assert build_prompt("LinkedIn Post", "Casual", topic="AI").max_output_tokens >= 1500
+    assert "temperature" in short.generation_config
+    print(f"✅ Output caps scale with length: {short.max_output_tokens} → {long.max_output_tokens}")
+
+def test_token_budget():
+    """Test that oversized user content is trimmed to the platform budget"""
+
+    huge = "word " * 20000
+    prompt = build_prompt("X Thread", "Casual", topic="AI", length=5, content=huge)
+    assert prompt.mode == "enhance"
+    assert prompt.input_tokens <= PLATFORMS["X Thread"].max_input_tokens
+    assert count_tokens("abcd" * 10) == 10 and count_tokens("") == 0
+
+    # Cache text covers both the system instruction and the prompt
+    assert prompt.system_instruction in prompt.cache_text and prompt.text in prompt.cache_text
+    print(f"✅ Oversized content trimmed to {prompt.input_tokens} tokens")
+
+def test_item_prompt():
+    """Test that single-item prompts carry only the item and its neighbours"""
+
+    tweets = [f"Tweet number {i}" for i in range(1, 9)]
+    prompt = build_item_prompt("X Thread", "Casual", tweets, 3, topic="AI tools")
+    assert "Tweet number 3" in prompt.text and "Tweet number 4" in prompt.text and "Tweet number 5" in prompt.text
+    assert "Tweet number 1" not in prompt.text and "Tweet number 8" not in prompt.text
+    assert "tweet 4 of 8" in prompt.text
+    full = build_prompt("X Thread", "Casual", topic="AI tools", length=8)
+    assert prompt.max_output_tokens * 5 < full.max_output_tokens
+
+    first = build_item_prompt("Instagram Carousel", "Casual", ["SLIDE 1: A", "SLIDE 2: B"], 0)
+    assert "this is the first one" in first.text and "SLIDE 2: B" in first.text
+    print(f"✅ Item prompts capped at {prompt.max_output_tokens} output tokens (full thread: {full.max_output_tokens})")
+
+if __name__ == "__main__":
+    test_modes_and_templates()
+    test_generation_config()
+    test_token_budget()
+    test_item_prompt()
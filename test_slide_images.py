@@ -0,0 +1,213 @@
+"""
+Test script for concurrent carousel image generation
+Uses fake providers with real latency and a local stub of the Stability API
+"""
+
+import base64
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from carousel import SlideStream
+from slide_images import (
+    DRAFT_STEPS,
+    FINAL_STEPS,
+    ImageGenerationError,
+    SlideImageBatch,
+    generate_stability_image,
+    merge_slide_images,
+    stability_payload,
+)
+
+class FakeProvider:
+    """Sleeps per request, tracks peak concurrency and fails for titles containing 'fail'"""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def __call__(self, payload):
+        prompt = payload["text_prompts"][0]["text"]
+        with self._lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        if "fail" in prompt:
+            raise ImageGenerationError("API returned 500: boom")
+        return prompt.encode()
+
+def test_concurrent_slides():
+    """Test wall-clock time, slide order, per-slide errors and the provider cap"""
+
+    print("🧪 Testing Slide Image Generation")
+    print("=" * 50)
+
+    slides = ["Hook", "Tip one", "Tip fail", "Tip three", "Call to action"]
+    provider = FakeProvider(delay=0.2)
+    finished = []
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        start = time.monotonic()
+        images, errors = SlideImageBatch("habits", provider, pool, threading.BoundedSemaphore(5)).collect(
+            slides, on_result=lambda num, title, data, error: finished.append(num)
+        )
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 0.5  # ~one slide, not five
+    assert [img["slide_num"] for img in images] == [1, 2, 4, 5]
+    assert images[0]["title"] == "Hook" and b"Hook" in images[0]["data"]
+    assert errors == ["Slide 3: API returned 500: boom"]
+    assert sorted(finished) == [1, 2, 3, 4, 5]
+    print(f"✅ 5 slides in {elapsed:.2f}s (one takes 0.2s), failures reported per slide")
+
+    provider = FakeProvider(delay=0.05)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        SlideImageBatch("habits", provider, pool, threading.BoundedSemaphore(2)).collect([f"Slide {i}" for i in range(10)])
+    assert provider.peak == 2
+    print("✅ Provider concurrency cap respected")
+
+def test_results_reported_as_ready():
+    """Test that on_result fires in completion order so slides can render progressively"""
+
+    delays = {"Slow hook": 0.3, "Quick tip": 0.01, "Medium tip": 0.1}
+    finished = []
+
+    def provider(payload):
+        title = next(t for t in delays if t in payload["text_prompts"][0]["text"])
+        time.sleep(delays[title])
+        return title.encode()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        images, _ = SlideImageBatch("habits", provider, pool, threading.BoundedSemaphore(4)).collect(
+            list(delays), on_result=lambda num, title, data, error: finished.append(title)
+        )
+
+    assert finished == ["Quick tip", "Medium tip", "Slow hook"]
+    assert [img["title"] for img in images] == list(delays)
+    print("✅ Slides reported as they finish, returned in slide order")
+
+def test_pipelined_with_streaming():
+    """Test that images start while text streams, and rewritten titles are dropped"""
+
+    carousel = "SLIDE 1: Hook\nIntro\n\nSLIDE 2: Tip\nDo it\n\nSLIDE 3: Wrap up\nFollow for more"
+    provider = FakeProvider(delay=0.2)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        batch = SlideImageBatch("habits", provider, pool, threading.BoundedSemaphore(4))
+        stream = SlideStream()
+        start = time.monotonic()
+        for line_end in range(len(carousel.split("\n"))):
+            text = "\n".join(carousel.split("\n")[:line_end + 1]) + "\n"
+            for title in stream.feed(text):
+                batch.submit(title)
+            time.sleep(0.05)  # Simulated Gemini chunk latency
+        # Every image request went out before the text finished streaming
+        assert len(provider.prompts) == 3
+        images, errors = batch.collect(["Hook", "Tip", "Wrap up"])
+        elapsed = time.monotonic() - start
+
+    # Sequential would be 0.4s of text then 0.2s of images
+    assert [img["title"] for img in images] == ["Hook", "Tip", "Wrap up"] and not errors
+    print(f"✅ Text and images overlapped: {elapsed:.2f}s instead of ~0.6s")
+
+    slow = FakeProvider(delay=0.1)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        batch = SlideImageBatch("habits", slow, pool, threading.BoundedSemaphore(1))
+        for title in ["Hook", "Old title", "Another old one"]:
+            batch.submit(title)
+        images, errors = batch.collect(["Hook", "New title"])
+    assert [(img["slide_num"], img["title"]) for img in images] == [(1, "Hook"), (2, "New title")]
+    assert not any("old" in prompt.lower() for prompt in slow.prompts)
+    print("✅ Titles missing from the final text are cancelled before they start")
+
+def test_draft_then_final():
+    """Test that final renders reuse the draft's seed and only cover approved slides"""
+
+    payloads = []
+
+    def provider(payload):
+        payloads.append(payload)
+        return b"image"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        slides = ["Hook", "Tip", "Wrap up"]
+        drafts, _ = SlideImageBatch("habits", provider, pool, threading.BoundedSemaphore(4), seed_salt=5, steps=DRAFT_STEPS).collect(slides)
+        assert [img["steps"] for img in drafts] == [DRAFT_STEPS] * 3
+
+        finals, _ = SlideImageBatch("habits", provider, pool, threading.BoundedSemaphore(4), seed_salt=5).collect(["Tip"], numbers=[2])
+    assert [(img["slide_num"], img["steps"]) for img in finals] == [(2, FINAL_STEPS)]
+
+    draft_tip = next(p for p in payloads[:3] if "Tip" in p["text_prompts"][0]["text"])
+    final_tip = payloads[3]
+    assert final_tip["seed"] == draft_tip["seed"] and final_tip["steps"] == FINAL_STEPS
+    assert {k: v for k, v in final_tip.items() if k != "steps"} == {k: v for k, v in draft_tip.items() if k != "steps"}
+    print(f"✅ Drafts at {DRAFT_STEPS} steps, approved slide re-rendered at {FINAL_STEPS} with the same seed")
+
+def test_retry_failed_slides():
+    """Test that failures are recorded per slide and a retry resends only those"""
+
+    flaky = FakeProvider(delay=0.01)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        batch = SlideImageBatch("habits", flaky, pool, threading.BoundedSemaphore(4))
+        images, _ = batch.collect(["Hook", "Tip fail", "Wrap up", "Bonus fail"])
+        assert sorted(batch.failures) == [2, 4]
+        assert batch.failures[2] == {"title": "Tip fail", "error": "API returned 500: boom", "steps": FINAL_STEPS}
+
+        retry_provider = FakeProvider(delay=0.01)
+        retry = SlideImageBatch("habits", retry_provider, pool, threading.BoundedSemaphore(4))
+        nums = sorted(batch.failures)
+        retried, _ = retry.collect(["Tip (retry)", "Bonus fail"], numbers=nums)
+
+    assert len(retry_provider.prompts) == 2  # Finished slides weren't sent again
+    merged = merge_slide_images(images, retried)
+    assert [(img["slide_num"], img["title"]) for img in merged] == [(1, "Hook"), (2, "Tip (retry)"), (3, "Wrap up")]
+    assert sorted(retry.failures) == [4]
+    print("✅ Retry resent only the failed slides and merged them back in order")
+
+class StubStability(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if "bad" in payload["text_prompts"][0]["text"]:
+            body, status = {"message": "invalid prompt"}, 400
+        else:
+            body, status = {"artifacts": [{"finishReason": "SUCCESS", "base64": base64.b64encode(b"PNG").decode()}]}, 200
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def test_stability_client():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubStability)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_port}"
+    try:
+        assert generate_stability_image(stability_payload("a cat"), "sk", api_host=host) == b"PNG"
+        try:
+            generate_stability_image(stability_payload("bad prompt"), "sk", api_host=host)
+            assert False, "expected ImageGenerationError"
+        except ImageGenerationError as e:
+            assert str(e) == "API returned 400: invalid prompt"
+        print("✅ Stability client decodes images and reports API errors")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_concurrent_slides()
+    test_results_reported_as_ready()
+    test_pipelined_with_streaming()
+    test_draft_then_final()
+    test_retry_failed_slides()
+    test_stability_client()
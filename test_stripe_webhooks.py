@@ -0,0 +1,120 @@
+"""
+Test script for the Stripe webhook receiver
+Replays the recorded events in fixtures/stripe_events against a temporary
+entitlement store - no network access needed
+"""
+
+import glob
+import json
+import os
+import tempfile
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+from entitlement_store import EntitlementStore
+from stripe_webhooks import handle_webhook, make_handler, sign_payload
+
+SECRET = "whsec_test_secret"
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "stripe_events")
+EMAIL = "subscriber@example.com"
+
+def load_fixtures():
+    paths = sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.json")))
+    return [open(path, "rb").read() for path in paths]
+
+def test_replay_webhooks():
+    """Replay fixture events and check the resolved tier after each one"""
+
+    print("🧪 Testing Stripe Webhook Replay")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EntitlementStore(os.path.join(tmp, "entitlements.db"))
+        fixtures = load_fixtures()
+
+        # Unknown users are a miss, so the app falls back to Stripe
+        assert store.get_entitlement(EMAIL) is None
+
+        # A customer with no known subscriptions is still a miss (None)
+        expected_tiers = [None, "pro", "visual_pack", "free"]
+        for payload, expected in zip(fixtures, expected_tiers):
+            status, message = handle_webhook(payload, sign_payload(payload, SECRET), SECRET, store)
+            event_type = json.loads(payload)["type"]
+            entitlement = store.get_entitlement(EMAIL)
+            tier = entitlement.tier if entitlement else None
+            print(f"  • {event_type}: {status} {message} → {tier}")
+            assert status == 200 and message == "applied"
+            assert tier == expected
+
+        # Redelivered events are acknowledged but not re-applied
+        status, message = handle_webhook(fixtures[2], sign_payload(fixtures[2], SECRET), SECRET, store)
+        assert (status, message) == (200, "ignored")
+        assert store.get_entitlement(EMAIL).tier == "free"
+        print("✅ Duplicate delivery ignored")
+
+    print("✅ Webhook replay tests completed successfully!")
+
+def test_out_of_order_and_signatures():
+    """Older snapshots never overwrite newer ones, and bad signatures are rejected"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EntitlementStore(os.path.join(tmp, "entitlements.db"))
+        created, pro, visual_pack, _ = load_fixtures()
+
+        for payload in (created, visual_pack, pro):
+            handle_webhook(payload, sign_payload(payload, SECRET), SECRET, store)
+        assert store.get_entitlement(EMAIL).tier == "visual_pack"
+        print("✅ Out-of-order update kept the newest subscription state")
+
+        assert handle_webhook(pro, sign_payload(pro, "whsec_wrong"), SECRET, store)[0] == 400
+        assert handle_webhook(pro, sign_payload(pro, SECRET, timestamp=1), SECRET, store)[0] == 400
+        assert handle_webhook(pro, "", SECRET, store)[0] == 400
+        print("✅ Invalid and stale signatures rejected")
+
+def test_customer_without_subscription_rows():
+    """Subscribers from before the receiver existed must still fall back to Stripe"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EntitlementStore(os.path.join(tmp, "entitlements.db"))
+        payload = json.dumps({
+            "id": "evt_customer_updated",
+            "type": "customer.updated",
+            "created": 1700000000,
+            "data": {"object": {"id": "cus_legacy", "object": "customer", "email": "payer@example.com"}}
+        }).encode()
+        status, _ = handle_webhook(payload, sign_payload(payload, SECRET), SECRET, store)
+        assert status == 200 and store.has_customer("cus_legacy")
+        assert store.get_entitlement("payer@example.com") is None
+        print("✅ Customer without subscription rows is a miss, not a downgrade to free")
+
+def test_http_receiver():
+    """POST a fixture to the receiver over a local socket"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EntitlementStore(os.path.join(tmp, "entitlements.db"))
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(SECRET, store))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+            for payload in load_fixtures()[:2]:
+                request = urllib.request.Request(
+                    f"http://127.0.0.1:{server.server_port}/",
+                    data=payload,
+                    headers={"Stripe-Signature": sign_payload(payload, SECRET)},
+                    method="POST"
+                )
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    assert response.status == 200
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert store.get_entitlement(EMAIL).tier == "pro"
+        print("✅ HTTP receiver applied events")
+
+if __name__ == "__main__":
+    test_replay_webhooks()
+    test_out_of_order_and_signatures()
+    test_customer_without_subscription_rows()
+    test_http_receiver()
@@ -0,0 +1,118 @@
+"""
+Test script for subscription tier caching
+Run this to verify tier lookups are cached without calling Stripe
+"""
+
+from subscriptions import TierCache, entitlement_from_subscriptions, resolve_tier, tier_for_amount
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_tier_cache():
+    """Test TTL, negative caching, invalidation and counters with a fake Stripe lookup"""
+
+    print("🧪 Testing Tier Cache")
+    print("=" * 50)
+
+    clock = FakeClock()
+    cache = TierCache(ttl=600, negative_ttl=60, clock=clock)
+    calls = []
+    tiers = {"pro@example.com": "pro", "free@example.com": "free"}
+
+    def fake_fetch(email):
+        calls.append(email)
+        return tiers[email]
+
+    # Test 1: Repeated lookups within the TTL only hit Stripe once
+    print("\n1️⃣ Repeated lookups within TTL...")
+    for _ in range(5):
+        assert resolve_tier("pro@example.com", cache, fake_fetch) == "pro"
+    assert calls == ["pro@example.com"]
+    print(f"✅ 5 lookups, {len(calls)} Stripe call")
+
+    # Test 2: Free users are cached for the shorter negative TTL
+    print("\n2️⃣ Negative caching for free users...")
+    resolve_tier("free@example.com", cache, fake_fetch)
+    clock.now = 61
+    resolve_tier("free@example.com", cache, fake_fetch)
+    resolve_tier("pro@example.com", cache, fake_fetch)
+    assert calls.count("free@example.com") == 2
+    assert calls.count("pro@example.com") == 1
+    print("✅ Free tier expired after negative TTL, paid tier still cached")
+
+    # Test 3: Invalidation forces a fresh lookup
+    print("\n3️⃣ Explicit invalidation...")
+    tiers["pro@example.com"] = "visual_pack"
+    cache.invalidate("pro@example.com")
+    assert resolve_tier("pro@example.com", cache, fake_fetch) == "visual_pack"
+    print("✅ Upgraded tier picked up after invalidation")
+
+    # Test 4: Errors are not cached
+    print("\n4️⃣ Failed lookups are not cached...")
+    def failing_fetch(email):
+        raise ConnectionError("Stripe unavailable")
+    try:
+        resolve_tier("new@example.com", cache, failing_fetch)
+    except ConnectionError:
+        pass
+    assert cache.get("new@example.com") is None
+    print("✅ Nothing cached after a failed lookup")
+
+    # Test 5: Blank emails never reach Stripe
+    assert resolve_tier("  ", cache, failing_fetch) == "free"
+
+    print("\n📊 Cache stats:", cache.stats())
+    assert cache.stats()["hits"] > 0 and cache.stats()["misses"] > 0
+
+    assert tier_for_amount(17) == "visual_pack"
+    assert tier_for_amount(12) == "pro"
+    assert tier_for_amount(5) is None
+
+    print("\n" + "=" * 50)
+    print("✅ All tier cache tests completed successfully!")
+
+def test_entitlement_from_subscriptions():
+    """Test that every subscription item is considered, not just the first"""
+
+    print("🧪 Testing Entitlement Resolution")
+    print("=" * 50)
+
+    subs = [
+        {
+            "status": "active",
+            "current_period_end": 1700000000,
+            "items": {"data": [
+                {"price": {"unit_amount": 500}},  # Add-on, not a tier
+                {"price": {"unit_amount": 1200}}
+            ]}
+        },
+        {
+            "status": "active",
+            "current_period_end": 1800000000,
+            "items": {"data": [{"price": {"unit_amount": 20400, "recurring": {"interval": "year"}}}]}
+        },
+        {
+            "status": "canceled",
+            "items": {"data": [{"price": {"unit_amount": 9900}}]}
+        }
+    ]
+
+    entitlement = entitlement_from_subscriptions(subs)
+    print(f"Resolved: {entitlement}")
+    assert entitlement.tier == "visual_pack"
+    assert entitlement.price == 17.0
+    assert entitlement.period_end == 1800000000
+
+    assert entitlement_from_subscriptions(subs[:1]).tier == "pro"
+    assert entitlement_from_subscriptions([{"status": "active", "items": {"data": []}}]).tier == "pro"
+    assert entitlement_from_subscriptions([]).tier == "free"
+
+    print("✅ Entitlement resolution tests completed successfully!")
+
+if __name__ == "__main__":
+    test_tier_cache()
+    test_entitlement_from_subscriptions()
@@ -0,0 +1,65 @@
+"""
+Test script for the local thread splitter
+"""
+
+from templates import TEMPLATES, fill_template, get_template_by_id
+from thread_splitter import split_into_thread
+from tweet_length import weighted_length
+
+def test_template_split():
+    """Test splitting every X template into a thread without a model call"""
+
+    print("🧪 Testing Thread Splitter")
+    print("=" * 50)
+
+    for template in TEMPLATES:
+        if template["platform"] != "X Thread":
+            continue
+        values = {key: f"sample {key.replace('_', ' ')}" for key in template["placeholders"]}
+        filled = fill_template(template["template"], values)
+        tweets = split_into_thread(filled, length=5)
+        assert tweets and all(weighted_length(t) <= 280 for t in tweets)
+        assert all("\n" not in t for t in tweets)
+    print("✅ Every X template splits into valid tweets")
+
+def test_boundaries_and_length():
+    """Test sentence boundaries, the weighted limit and the target length"""
+
+    sentence = "This sentence is about forty characters. "
+    long_paragraph = (sentence * 20).strip()  # ~820 chars, one paragraph
+    tweets = split_into_thread(long_paragraph)
+    assert len(tweets) == 4  # 6 sentences fit per tweet
+    assert all(weighted_length(t) <= 280 and t.endswith(".") for t in tweets)
+    print("✅ Long paragraphs split on sentence boundaries")
+
+    # CJK counts double, so fewer characters fit per tweet
+    cjk = "。".join(["日本語の文章です"] * 40) + "。"
+    assert all(weighted_length(t) <= 280 for t in split_into_thread(cjk.replace("。", "。 ")))
+
+    # No sentence boundaries at all: falls back to word boundaries
+    words = " ".join(["word"] * 200)
+    tweets = split_into_thread(words)
+    assert all(weighted_length(t) <= 280 for t in tweets) and " ".join(tweets) == words
+
+    paragraphs = "\n\n".join(f"Point {i} is this. It really matters." for i in range(1, 9))
+    assert len(split_into_thread(paragraphs)) == 8
+    assert len(split_into_thread(paragraphs, length=4)) == 4  # Short tweets merged
+    assert len(split_into_thread(paragraphs, length=12)) == 12  # Split at sentences
+    assert len(split_into_thread("One sentence only.", length=5)) == 1  # Never split mid-sentence
+    print("✅ Requested length respected where boundaries allow")
+
+    assert split_into_thread(paragraphs, 6) == split_into_thread(paragraphs, 6)
+
+    # Too few tweets: no fragments are split off to reach the count, the thread stays shorter
+    short = "\n\n".join(f"Point {i}. It matters." for i in range(1, 9))
+    assert len(split_into_thread(short, length=12)) == 8
+    saas_launch = get_template_by_id("saas_launch")
+    values = {key: f"sample {key.replace('_', ' ')}" for key in saas_launch["placeholders"]}
+    tweets = split_into_thread(fill_template(saas_launch["template"], values), length=8)
+    assert len(tweets) == 7 and tweets[-1] == "What feature should we build next? 👇"
+    assert all(len(t.split()) >= 3 for t in tweets)
+    print("✅ No fragment tweets when a thread falls short of the length")
+
+if __name__ == "__main__":
+    test_template_split()
+    test_boundaries_and_length()
@@ -0,0 +1,108 @@
+"""
+Test script for signed tier tokens
+Run this to verify tokens expire, are bound to an email and can be revoked
+"""
+
+import os
+import tempfile
+
+from streamlit.testing.v1 import AppTest
+
+import subscriptions
+from analytics import get_user_hash
+from entitlement_store import EntitlementStore, apply_event
+from tier_token import issue_tier_token, verify_tier_token
+
+SECRET = "test-token-secret"
+EMAIL = "pro@example.com"
+
+def test_tier_token():
+    """Test signing, expiry, email binding and tampering"""
+
+    print("🧪 Testing Tier Tokens")
+    print("=" * 50)
+
+    token = issue_tier_token(EMAIL, "pro", SECRET, ttl=600, now=1000)
+
+    assert verify_tier_token(token, EMAIL, SECRET, now=1300) == "pro"
+    print("✅ Valid token verified locally")
+
+    assert verify_tier_token(token, EMAIL, SECRET, now=1600) is None
+    print("✅ Expired token rejected")
+
+    assert verify_tier_token(token, "someone@example.com", SECRET, now=1300) is None
+    assert verify_tier_token(token, EMAIL, "other-secret", now=1300) is None
+    signature = token.partition(".")[2]
+    forged = issue_tier_token(EMAIL, "visual_pack", "attacker", now=1000).partition(".")[0]
+    assert verify_tier_token(f"{forged}.{signature}", EMAIL, SECRET, now=1300) is None
+    assert verify_tier_token("garbage", EMAIL, SECRET, now=1300) is None
+    print("✅ Wrong email, wrong key and tampered tokens rejected")
+
+def test_tier_token_revocation():
+    """Test that webhook subscription changes revoke outstanding tokens"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EntitlementStore(os.path.join(tmp, "entitlements.db"))
+        token = issue_tier_token(EMAIL, "pro", SECRET, ttl=600, now=1000)
+        assert verify_tier_token(token, EMAIL, SECRET, now=1100, revoked_before=store.tokens_revoked_before) == "pro"
+
+        store.revoke_tokens(get_user_hash(EMAIL), before=1050)
+        assert verify_tier_token(token, EMAIL, SECRET, now=1100, revoked_before=store.tokens_revoked_before) is None
+        print("✅ Explicitly revoked token rejected")
+
+        newer = issue_tier_token(EMAIL, "pro", SECRET, ttl=600, now=1060)
+        assert verify_tier_token(newer, EMAIL, SECRET, now=1100, revoked_before=store.tokens_revoked_before) == "pro"
+
+        apply_event(store, {
+            "id": "evt_customer",
+            "type": "customer.created",
+            "data": {"object": {"id": "cus_1", "email": EMAIL}}
+        })
+        apply_event(store, {
+            "id": "evt_cancel",
+            "type": "customer.subscription.deleted",
+            "created": 1070,
+            "data": {"object": {"id": "sub_1", "customer": "cus_1", "status": "canceled"}}
+        })
+        assert verify_tier_token(newer, EMAIL, SECRET, now=1100, revoked_before=store.tokens_revoked_before) is None
+        print("✅ Subscription webhook revoked outstanding tokens")
+
+def test_token_survives_reload():
+    """Test reload -> enter email -> token verified, without a Stripe lookup"""
+
+    stripe_lookups = []
+    original = subscriptions.fetch_stripe_tier
+    subscriptions.fetch_stripe_tier = lambda email, key: stripe_lookups.append(email) or "free"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # A fresh session (reload/new tab) starts with a blank email and the token in the URL
+            app = AppTest.from_file("app.py", default_timeout=60)
+            app.secrets["TIER_TOKEN_SECRET"] = SECRET
+            app.secrets["STRIPE_SECRET_KEY"] = "sk_test"
+            app.secrets["ENTITLEMENTS_DB"] = os.path.join(tmp, "entitlements.db")
+            app.query_params["tier_token"] = issue_tier_token(EMAIL, "pro", SECRET)
+            app.run()
+            assert not app.exception
+
+            app.text_input[0].input(EMAIL).run()
+            assert not app.exception
+            assert app.query_params.get("tier_token")
+            assert not stripe_lookups
+            assert "🔗 Connect Social Accounts" in [header.value for header in app.subheader]
+            print("✅ Token verified after reload without a Stripe lookup")
+
+            # Switching to a different email drops the token and re-checks
+            # The email box is re-created once saved_email changes, so the first
+            # edit after that lands on the old widget - type it again
+            app.text_input[0].input("someone@example.com").run()
+            app.text_input[0].input("someone@example.com").run()
+            assert not app.query_params.get("tier_token")
+            assert stripe_lookups == ["someone@example.com"]
+            print("✅ Token dropped when the email changes")
+    finally:
+        subscriptions.fetch_stripe_tier = original
+
+if __name__ == "__main__":
+    test_tier_token()
+    test_tier_token_revocation()
+    test_token_survives_reload()
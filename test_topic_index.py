@@ -0,0 +1,79 @@
+"""
+Test script for the near-duplicate topic index
+"""
+
+from topic_index import TopicIndex, jaccard, shingles
+
+def test_near_duplicates():
+    """Test that rephrased topics match and unrelated ones don't"""
+
+    print("🧪 Testing Topic Index")
+    print("=" * 50)
+
+    assert shingles("AI productivity tips") == shingles("Productivity tips using AI")
+    assert jaccard(shingles("morning routine ideas"), shingles("morning routine hacks")) == 0.5
+
+    index = TopicIndex(threshold=0.6)
+    index.add(("a@x.com", "X Thread"), "AI productivity tips", {"content": "thread 1"})
+    index.add(("a@x.com", "X Thread"), "How to start a podcast in 2025", {"content": "thread 2"})
+
+    similarity, payload = index.query(("a@x.com", "X Thread"), "productivity tips using AI")
+    assert payload["content"] == "thread 1" and similarity == 1.0
+
+    match = index.query(("a@x.com", "X Thread"), "How to start your own podcast in 2025")
+    assert match and match[1]["content"] == "thread 2"
+    print(f"✅ Rephrased topics matched (similarity {match[0]:.2f})")
+
+    assert index.query(("a@x.com", "X Thread"), "Best hiking trails in Colorado") is None
+    assert index.query(("a@x.com", "X Thread"), "the and of") is None  # Only stopwords
+    print("✅ Unrelated topics don't match")
+
+    # Never match across users or platforms
+    assert index.query(("b@x.com", "X Thread"), "AI productivity tips") is None
+    assert index.query(("a@x.com", "LinkedIn Post"), "AI productivity tips") is None
+    print("✅ Matches stay within a user and platform")
+
+def test_bounded_memory():
+    """Test LRU eviction keeps the index bounded"""
+
+    index = TopicIndex(max_entries=100)
+    for i in range(250):
+        index.add("user", f"topic number{i} word{i} extra{i}", i)
+    assert len(index) == 100
+    assert index.stats()["evictions"] == 150
+
+    assert index.query("user", "topic number0 word0 extra0") is None  # Evicted
+    assert index.query("user", "topic number249 word249 extra249")[1] == 249
+
+    # Buckets are cleaned up with their entries
+    assert index.stats()["buckets"] <= 100 * index.bands
+    print(f"✅ Index bounded at {len(index)} entries: {index.stats()}")
+
+def test_bounded_bytes():
+    """Test that payload sizes count against the byte cap"""
+
+    draft = "x" * 10_000
+    index = TopicIndex(max_bytes=100_000)
+    for i in range(50):
+        assert index.add("user", f"topic number{i} word{i}", draft, size=len(draft))
+    stats = index.stats()
+    entry_bytes = stats["bytes"] // len(index)  # Same-sized entries
+    assert entry_bytes > len(draft) and len(index) == 100_000 // entry_bytes
+    assert index.query("user", "topic number49 word49")[1] == draft
+    assert index.query("user", "topic number0 word0") is None  # Evicted
+
+    # An entry bigger than the whole cap isn't indexed
+    assert not index.add("user", "huge topic", "x", size=200_000)
+    print(f"✅ Index bounded at {stats['bytes']:,} bytes with {len(index)} drafts")
+
+    # Same topic, different tone/length scope: no match
+    index.add(("a@x.com", "X Thread", "Casual", 8), "AI productivity tips", "casual")
+    assert index.query(("a@x.com", "X Thread", "Pro", 8), "AI productivity tips") is None
+    assert index.query(("a@x.com", "X Thread", "Casual", 12), "AI productivity tips") is None
+    assert index.query(("a@x.com", "X Thread", "Casual", 8), "AI productivity tips")[1] == "casual"
+    print("✅ Matches stay within a tone and length")
+
+if __name__ == "__main__":
+    test_near_duplicates()
+    test_bounded_memory()
+    test_bounded_bytes()
@@ -0,0 +1,44 @@
+"""
+Test script for slide image transcoding
+"""
+
+import io
+import random
+
+from PIL import Image
+
+from transcode import EXPORT_SIZES, THUMBNAIL_WIDTH, transcode_image
+
+def sample_png(width=1024, height=1024, seed=1):
+    """Photo-like test image: smooth gradient with a little noise, as a PNG"""
+    rng = random.Random(seed)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    img = Image.merge("RGB", (gradient, gradient.rotate(90), gradient.rotate(180)))
+    noise = Image.frombytes("L", (width, height), bytes(rng.randrange(256) for _ in range(width * height)))
+    img = Image.blend(img, Image.merge("RGB", (noise, noise, noise)), 0.08)
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+def test_renditions():
+    """Test rendition sizes, formats and that the preview is much smaller than the PNG"""
+
+    print("🧪 Testing Image Transcoding")
+    print("=" * 50)
+
+    original = sample_png()
+    renditions = transcode_image(original)
+    assert set(renditions) == {"thumb", *EXPORT_SIZES}
+
+    thumb = Image.open(io.BytesIO(renditions["thumb"]))
+    assert thumb.size == (THUMBNAIL_WIDTH, THUMBNAIL_WIDTH) and thumb.format in ("WEBP", "JPEG")
+    for name, size in EXPORT_SIZES.items():
+        export = Image.open(io.BytesIO(renditions[name]))
+        assert export.size == size and export.format == "JPEG", name
+    print("✅ Preview plus 1080×1080 and 1080×1350 exports")
+
+    assert len(renditions["thumb"]) * 10 < len(original)
+    print(f"✅ Preview is {len(renditions['thumb']) / 1024:.0f}KB vs {len(original) / 1024:.0f}KB PNG")
+
+if __name__ == "__main__":
+    test_renditions()
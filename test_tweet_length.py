@@ -0,0 +1,77 @@
+"""
+Test script for weighted tweet length and targeted repair
+"""
+
+from tweet_length import (
+    over_limit,
+    repair_thread,
+    repair_tweets,
+    replace_tweet,
+    truncate_tweet,
+    weighted_length,
+)
+
+def test_weighted_length():
+    """Test X's counting rules"""
+
+    print("🧪 Testing Weighted Tweet Length")
+    print("=" * 50)
+
+    assert weighted_length("hello world") == 11
+    assert weighted_length("Café") == 4  # Latin-1 counts 1
+    assert weighted_length("日本語") == 6  # CJK counts double
+    assert weighted_length("🚀") == 2
+    assert weighted_length("👍🏽") == 2  # Skin tone modifier is part of the emoji
+    assert weighted_length("👨‍👩‍👧") == 2  # ZWJ family sequence counts once
+    assert weighted_length("❤️") == 2
+    assert weighted_length("🇺🇸") == 2
+    assert weighted_length("“quotes” — dash") == 15  # General punctuation counts 1
+    print("✅ Latin, CJK and emoji sequences weighted correctly")
+
+    long_url = "https://example.com/" + "a" * 100
+    assert weighted_length(long_url) == 23
+    assert weighted_length(f"Read this: {long_url} now") == len("Read this: ") + 23 + len(" now")
+    assert weighted_length("see xthreadmaster.streamlit.app") == 4 + 23
+    assert weighted_length("End of sentence. Next one.") == 26  # Dots alone aren't URLs
+    print("✅ URLs count 23 regardless of length")
+
+def test_targeted_repair():
+    """Test that only over-limit tweets are rewritten"""
+
+    short = "Short tweet 🚀"
+    long = "This tweet goes on and on " * 15
+    cjk = "日本語" * 50  # 150 chars, 300 weighted
+    tweets = [short, long, short, cjk]
+    assert over_limit(tweets) == [1, 3]
+
+    calls = []
+
+    def rewrite(tweet, length):
+        calls.append((tweet, length))
+        return "Shortened version ✂️"
+
+    repaired, truncated = repair_tweets(tweets, rewrite)
+    assert [tweet for tweet, _ in calls] == [long, cjk]
+    assert calls[1][1] == 300
+    assert repaired == [short, "Shortened version ✂️", short, "Shortened version ✂️"]
+    assert not truncated
+    print("✅ Only the 2 over-limit tweets were sent for rewrite")
+
+    # A rewrite that never gets short enough falls back to truncation
+    repaired, truncated = repair_tweets([long], lambda tweet, length: tweet, max_attempts=2)
+    assert truncated == [0] and weighted_length(repaired[0]) <= 280 and repaired[0].endswith("…")
+    print("✅ Stubborn tweets truncated at a word boundary")
+
+    thread = f"{short}\n\n{long}\n\n{short}"
+    fixed, _ = repair_thread(thread, rewrite)
+    assert fixed == f"{short}\n\nShortened version ✂️\n\n{short}"
+    print("✅ Thread layout preserved")
+
+    assert truncate_tweet(short) == short
+
+    # Single-tweet replacement keeps blank lines and the other tweets
+    assert replace_tweet("one\n\ntwo\n\nthree", 1, "TWO\nsplit") == "one\n\nTWO split\n\nthree"
+
+if __name__ == "__main__":
+    test_weighted_length()
+    test_targeted_repair()
@@ -0,0 +1,88 @@
+"""
+Test script for multi-variant generation and local ranking
+Uses fake generations with real latency, so no API key is needed
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from variants import generate_variants, rank_variants, score_variant
+
+GOOD_THREAD = "\n".join([
+    "🚀 Most people waste their mornings. Here's the 5-step routine that gave me 2 extra hours a day:",
+    "1/ Wake up at the same time every day ⏰ Your body loves consistency.",
+    "2/ No phone for the first 30 minutes 📵",
+    "3/ Move for 10 minutes 🏃 Even a walk counts.",
+    "4/ Plan your top 3 tasks ✅",
+    "Follow for more #productivity",
+])
+
+BAD_THREAD = "\n".join([
+    "Hi",
+    "x" * 400,
+    "#a #b #c #d #e #f #g",
+])
+
+def test_scoring():
+    """Test that a well-formed thread outranks a broken one"""
+
+    print("🧪 Testing Variant Ranking")
+    print("=" * 50)
+
+    good = score_variant(GOOD_THREAD, "X Thread")
+    bad = score_variant(BAD_THREAD, "X Thread")
+    assert good["length"] == 1.0 and bad["length"] < 1.0
+    assert good["hook"] > bad["hook"]
+    assert good["score"] > bad["score"]
+    assert score_variant("", "X Thread")["score"] == 0
+
+    ranked = rank_variants([BAD_THREAD, GOOD_THREAD], "X Thread")
+    assert ranked[0]["text"] == GOOD_THREAD
+    print(f"✅ Good thread ranked first ({good['score']:.2f} vs {bad['score']:.2f})")
+
+    post = "A strong opening line about leadership.\n\n" + ("Insight paragraph. " * 80) + "\n\n#leadership #growth #career"
+    short_post = "Too short #a"
+    assert score_variant(post, "LinkedIn Post")["score"] > score_variant(short_post, "LinkedIn Post")["score"]
+    print("✅ LinkedIn posts scored on length and hashtags")
+
+def test_concurrent_generation():
+    """Test that N variants take about the time of one call"""
+
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def fake_generate():
+        with lock:
+            n = next(counter)
+        time.sleep(0.2)
+        if n == 1:
+            raise RuntimeError("503 Service Unavailable")
+        return f"variant {n}"
+
+    progress = []
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        start = time.monotonic()
+        results = generate_variants(fake_generate, 4, pool, on_done=progress.append)
+        elapsed = time.monotonic() - start
+
+    assert len(results) == 3  # One failed, the others are kept
+    assert progress == [1, 2, 3, 4]
+    assert elapsed < 0.5
+    print(f"✅ 4 variants in {elapsed:.2f}s (one call takes 0.2s), failed variant dropped")
+
+    def always_fails():
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        try:
+            generate_variants(always_fails, 2, pool)
+            assert False, "expected the error when every variant fails"
+        except RuntimeError:
+            pass
+    print("✅ Error raised only when every variant fails")
+
+if __name__ == "__main__":
+    test_scoring()
+    test_concurrent_generation()
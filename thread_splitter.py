@@ -0,0 +1,108 @@
+"""
+Local thread splitter for XThreadMaster
+Turns long-form text (e.g. a filled template) into an X thread without a
+model call: splits on paragraph and sentence boundaries, keeps every tweet
+within X's weighted 280 limit, and aims for the requested tweet count
+"""
+
+import re
+from typing import List, Optional
+
+from tweet_length import MAX_WEIGHTED_LENGTH, weighted_length
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"'”’)])\s+")
+WORD = re.compile(r"\w+")
+
+# Splitting a tweet to reach the target length never leaves a piece shorter
+# than this (e.g. a lone "👇"); the thread comes out shorter instead
+MIN_TWEET_WORDS = 3
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in SENTENCE_END.split(text) if sentence.strip()]
+
+def _pack(pieces: List[str], limit: int) -> List[str]:
+    """Greedily join pieces with spaces into chunks that fit the limit"""
+    chunks = []
+    current = ""
+    for piece in pieces:
+        candidate = f"{current} {piece}" if current else piece
+        if current and weighted_length(candidate) > limit:
+            chunks.append(current)
+            current = piece
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _fit(unit: str, limit: int) -> List[str]:
+    """Split one paragraph into tweets that fit: by sentence, then by word as a last resort"""
+    if weighted_length(unit) <= limit:
+        return [unit]
+    tweets = []
+    for chunk in _pack(split_sentences(unit), limit):
+        if weighted_length(chunk) <= limit:
+            tweets.append(chunk)
+        else:
+            tweets.extend(_pack(chunk.split(" "), limit))
+    return tweets
+
+def _split_in_half(tweet: str, min_words: int = MIN_TWEET_WORDS) -> Optional[List[str]]:
+    """
+    Split a tweet at the sentence boundary nearest its middle, or None if
+    there's no boundary that leaves at least `min_words` words on each side
+    """
+    sentences = split_sentences(tweet)
+    splits = [
+        (" ".join(sentences[:i]), " ".join(sentences[i:]))
+        for i in range(1, len(sentences))
+    ]
+    splits = [halves for halves in splits if all(len(WORD.findall(half)) >= min_words for half in halves)]
+    if not splits:
+        return None
+    half = len(tweet) / 2
+    return list(min(splits, key=lambda halves: abs(len(halves[0]) - half)))
+
+def split_into_thread(text: str, length: Optional[int] = None, limit: int = MAX_WEIGHTED_LENGTH) -> List[str]:
+    """
+    Split text into tweets
+
+    Args:
+        text: Long-form content; blank lines separate paragraphs
+        length: Target number of tweets (best effort - tweets are never
+                split mid-sentence, into pieces under MIN_TWEET_WORDS words,
+                or pushed over the limit to hit it)
+        limit: Weighted length limit per tweet
+
+    Returns:
+        List of tweets in order
+    """
+    paragraphs = [" ".join(line.strip() for line in p.splitlines() if line.strip()) for p in PARAGRAPH_BREAK.split(text)]
+    tweets = [tweet for p in paragraphs if p for tweet in _fit(p, limit)]
+    if not length:
+        return tweets
+
+    # Too many: merge the adjacent pair with the smallest combined length
+    while len(tweets) > length:
+        merges = [
+            (weighted_length(f"{tweets[i]} {tweets[i + 1]}"), i)
+            for i in range(len(tweets) - 1)
+        ]
+        merges = [(size, i) for size, i in merges if size <= limit]
+        if not merges:
+            break
+        _, i = min(merges)
+        tweets[i:i + 2] = [f"{tweets[i]} {tweets[i + 1]}"]
+
+    # Too few: split the longest splittable tweet at a sentence boundary
+    while len(tweets) < length:
+        for i in sorted(range(len(tweets)), key=lambda i: -weighted_length(tweets[i])):
+            halves = _split_in_half(tweets[i])
+            if halves:
+                tweets[i:i + 1] = halves
+                break
+        else:
+            break
+
+    return tweets
@@ -0,0 +1,100 @@
+"""
+Signed tier tokens for XThreadMaster
+A short-lived HMAC-signed token records a user's resolved tier so reloads
+and new tabs can skip the Stripe check until it expires or is revoked
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from typing import Callable, Optional
+
+from analytics import get_user_hash
+
+TOKEN_VERSION = 1
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _sign(body: str, secret: str) -> str:
+    return _b64encode(hmac.new(secret.encode(), body.encode(), hashlib.sha256).digest())
+
+def issue_tier_token(email: str, tier: str, secret: str, ttl: int = 3600, now: Optional[float] = None) -> str:
+    """
+    Create a signed token binding a tier to a (hashed) email
+
+    Args:
+        email: User's email (only its hash goes into the token)
+        tier: Resolved tier ('pro' or 'visual_pack')
+        secret: Signing key (TIER_TOKEN_SECRET)
+        ttl: Seconds until the token expires
+        now: Current unix time (for tests)
+
+    Returns:
+        URL-safe token string
+    """
+    issued_at = int(time.time() if now is None else now)
+    payload = {
+        "v": TOKEN_VERSION,
+        "sub": get_user_hash(email),
+        "tier": tier,
+        "iat": issued_at,
+        "exp": issued_at + int(ttl),
+        "jti": secrets.token_urlsafe(8)
+    }
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    return f"{body}.{_sign(body, secret)}"
+
+def verify_tier_token(
+    token: str,
+    email: str,
+    secret: str,
+    now: Optional[float] = None,
+    revoked_before: Optional[Callable[[str], Optional[int]]] = None
+) -> Optional[str]:
+    """
+    Verify a tier token locally
+
+    Args:
+        token: Token from issue_tier_token
+        email: Email the current session is using
+        secret: Signing key (TIER_TOKEN_SECRET)
+        now: Current unix time (for tests)
+        revoked_before: Optional callable returning a unix time for a user
+            hash; tokens issued before it are treated as revoked
+
+    Returns:
+        The tier if the token is authentic, unexpired, unrevoked and issued
+        for this email, otherwise None
+    """
+    if not token or not secret or not email or "." not in token:
+        return None
+
+    body, _, signature = token.partition(".")
+    if not hmac.compare_digest(_sign(body, secret), signature):
+        return None
+
+    try:
+        payload = json.loads(_b64decode(body))
+    except ValueError:
+        return None
+
+    now = time.time() if now is None else now
+    user_hash = get_user_hash(email)
+    if payload.get("v") != TOKEN_VERSION or payload.get("sub") != user_hash:
+        return None
+    if payload.get("exp", 0) <= now:
+        return None
+
+    if revoked_before:
+        cutoff = revoked_before(user_hash)
+        if cutoff is not None and payload.get("iat", 0) <= cutoff:
+            return None
+
+    return payload.get("tier")
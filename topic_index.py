@@ -0,0 +1,214 @@
+"""
+Near-duplicate topic index for XThreadMaster
+MinHash signatures over normalized topic words, bucketed with LSH, so a
+rephrased topic ("AI productivity tips" vs "productivity tips using AI") can
+be matched to an earlier generation without another model call. In-process
+only, bounded by entry count and by bytes (payloads included) with
+least-recently-used eviction.
+"""
+
+import hashlib
+import random
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+import metrics
+
+STOPWORDS = frozenset("""
+a an the and or but of for to in on at by with using use about from into how what why when
+your my our their you i we is are be do does this that these those vs best top ways
+""".split())
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# Rough per-entry bookkeeping beyond the signature and payload bytes (entry and payload
+# objects, dict and bucket slots), measured with bench_topic_index.py
+ENTRY_OVERHEAD = 1600
+_WORD = re.compile(r"[a-z0-9]+")
+
+def shingles(text: str) -> Set[str]:
+    """Order-insensitive word set: lowercased, stopwords dropped, plural 's' stripped"""
+    words = set()
+    for word in _WORD.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.add(word)
+    return words
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+class _Entry:
+    __slots__ = ("scope", "signature", "payload", "size")
+
+    def __init__(self, scope, signature, payload, size):
+        self.scope = scope
+        self.signature = signature
+        self.payload = payload
+        self.size = size
+
+class TopicIndex:
+    """
+    MinHash/LSH index of topics, partitioned by scope (e.g. user + platform)
+
+    `num_perm` hashes are split into `bands` bands; two topics become
+    candidates when any band matches exactly, which happens with high
+    probability above roughly (1/bands)^(bands/num_perm) similarity.
+    Candidates are then scored by signature agreement and only returned
+    above `threshold`. Least recently used entries are evicted beyond
+    `max_entries` or once entries (signature, bookkeeping and the payload
+    size given to add) exceed `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 32,
+        bands: int = 8,
+        threshold: float = 0.6,
+        max_entries: int = 20000,
+        max_bytes: int = 64 * 1024 * 1024,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._bytes = 0
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._buckets: Dict[int, Any] = {}  # bucket key -> entry id, or list of ids when shared
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def signature(self, words: Set[str]) -> array:
+        """MinHash signature (32-bit values, so each entry costs num_perm * 4 bytes)"""
+        hashes = [int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little") for word in words]
+        return array("I", [min((a * h + b) % _MERSENNE_PRIME for h in hashes) & 0xFFFFFFFF for a, b in self._perms])
+
+    def _bucket_keys(self, scope: Hashable, signature: array) -> List[int]:
+        rows = self.rows
+        return [hash((band, scope, tuple(signature[band * rows:(band + 1) * rows]))) for band in range(self.bands)]
+
+    def _bucket_add(self, key: int, entry_id: int):
+        current = self._buckets.get(key)
+        if current is None:
+            self._buckets[key] = entry_id
+        elif isinstance(current, list):
+            current.append(entry_id)
+        else:
+            self._buckets[key] = [current, entry_id]
+
+    def _bucket_remove(self, key: int, entry_id: int):
+        current = self._buckets.get(key)
+        if isinstance(current, list):
+            current.remove(entry_id)
+            if len(current) == 1:
+                self._buckets[key] = current[0]
+        elif current == entry_id:
+            del self._buckets[key]
+
+    def add(self, scope: Hashable, text: str, payload: Any, size: int = 0) -> bool:
+        """
+        Index a topic with its payload (e.g. the generated content)
+
+        Args:
+            scope: Partition the topic is matched within
+            text: The topic
+            payload: Returned by query on a match
+            size: Approximate payload bytes, counted against max_bytes
+
+        Returns:
+            False if the topic has no words (or the entry alone exceeds max_bytes)
+        """
+        words = shingles(text)
+        if not words:
+            return False
+        signature = self.signature(words)
+        size += signature.itemsize * len(signature) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return False
+        keys = self._bucket_keys(scope, signature)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(scope, signature, payload, size)
+            self._bytes += size
+            for key in keys:
+                self._bucket_add(key, entry_id)
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                old_id, old = self._entries.popitem(last=False)
+                self._bytes -= old.size
+                for key in self._bucket_keys(old.scope, old.signature):
+                    self._bucket_remove(key, old_id)
+                self.evictions += 1
+            metrics.set_gauge("topic_index.bytes", self._bytes)
+        return True
+
+    def query(self, scope: Hashable, text: str) -> Optional[Tuple[float, Any]]:
+        """
+        Find the most similar earlier topic in the same scope
+
+        Returns:
+            (estimated similarity, payload) above the threshold, or None.
+            Newer entries win ties.
+        """
+        words = shingles(text)
+        if not words:
+            return None
+        signature = self.signature(words)
+        keys = self._bucket_keys(scope, signature)
+
+        with self._lock:
+            candidates = set()
+            for key in keys:
+                found = self._buckets.get(key)
+                if isinstance(found, list):
+                    candidates.update(found)
+                elif found is not None:
+                    candidates.add(found)
+
+            best: Optional[Tuple[float, int]] = None
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry.scope != scope:
+                    continue  # Bucket hash collision across scopes
+                similarity = sum(1 for x, y in zip(signature, entry.signature) if x == y) / self.num_perm
+                if similarity >= self.threshold and (best is None or (similarity, entry_id) > best):
+                    best = (similarity, entry_id)
+
+            if best is None:
+                self.misses += 1
+                metrics.increment("topic_index.misses")
+                return None
+            self.hits += 1
+            metrics.increment("topic_index.hits")
+            self._entries.move_to_end(best[1])
+            return best[0], self._entries[best[1]].payload
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "buckets": len(self._buckets),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
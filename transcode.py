@@ -0,0 +1,54 @@
+"""
+Slide image transcoding for XThreadMaster
+Turns each generated image into a small in-app preview and Instagram-sized
+exports once, when it arrives, so reruns serve precomputed bytes instead of
+decoding and sending the full PNG every time
+"""
+
+import io
+from typing import Dict, Tuple
+
+from PIL import Image, ImageOps, features
+
+# Wide enough for the centered page layout
+THUMBNAIL_WIDTH = 720
+THUMBNAIL_QUALITY = 80
+
+# Instagram feed sizes: square and 4:5 portrait
+EXPORT_SIZES: Dict[str, Tuple[int, int]] = {
+    "square": (1080, 1080),
+    "portrait": (1080, 1350),
+}
+EXPORT_QUALITY = 90
+
+def _encode(img: Image.Image, fmt: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "WEBP":
+        img.save(buffer, "WEBP", quality=quality, method=4)
+    else:
+        img.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+def make_thumbnail(img: Image.Image, width: int = THUMBNAIL_WIDTH, quality: int = THUMBNAIL_QUALITY) -> bytes:
+    """Preview scaled to `width`, as WebP (JPEG if this Pillow build lacks WebP)"""
+    thumb = img.copy()
+    thumb.thumbnail((width, width * 4), Image.LANCZOS)
+    return _encode(thumb, "WEBP" if features.check("webp") else "JPEG", quality)
+
+def export_image(img: Image.Image, size: Tuple[int, int], quality: int = EXPORT_QUALITY) -> bytes:
+    """Image scaled and center-cropped to exactly `size`, as JPEG (what Instagram re-encodes to anyway)"""
+    return _encode(ImageOps.fit(img, size, Image.LANCZOS), "JPEG", quality)
+
+def transcode_image(data: bytes) -> Dict[str, bytes]:
+    """
+    Decode an image once and produce every rendition
+
+    Returns:
+        Dict with 'thumb' plus one entry per EXPORT_SIZES name
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        img = source.convert("RGB")
+    renditions = {"thumb": make_thumbnail(img)}
+    for name, size in EXPORT_SIZES.items():
+        renditions[name] = export_image(img, size)
+    return renditions
@@ -0,0 +1,134 @@
+"""
+Weighted tweet length for XThreadMaster
+Follows X's counting rules (twitter-text v3 config): most Latin-range
+characters count 1, everything else (CJK, emoji, ...) counts 2, every
+emoji sequence counts 2 however many code points it has, and every URL
+counts 23 regardless of its length. Text is NFC-normalized first.
+"""
+
+import re
+import unicodedata
+from typing import Callable, List, Optional, Tuple
+
+MAX_WEIGHTED_LENGTH = 280
+URL_LENGTH = 23
+EMOJI_LENGTH = 2
+
+# Characters outside twitter-text's weight-1 ranges count double
+HEAVY_CHARS = re.compile("[^\u0000-\u10FF\u2000-\u200D\u2010-\u201F\u2032-\u2037]")
+
+_EMOJI_BASE = "[\u2300-\u23FF\u2600-\u27BF\u2B00-\u2BFF\U0001F000-\U0001FAFF]"
+_EMOJI_MODIFIERS = "[\uFE0F\U0001F3FB-\U0001F3FF]*"
+_TLDS = "com|org|net|io|co|ai|dev|app|ly|me|gg|xyz|info|edu|gov|uk|de|fr|ca|us|tv|so|sh"
+
+# URLs stop at the first non-ASCII character, so URL and emoji spans never overlap
+URLS = re.compile(rf"\bhttps?://[!-~]+|\b(?:[a-z0-9-]+\.)+(?:{_TLDS})\b(?:/[!-~]*)?", re.IGNORECASE)
+EMOJI_SEQUENCES = re.compile(
+    rf"[\U0001F1E6-\U0001F1FF]{{2}}|{_EMOJI_BASE}{_EMOJI_MODIFIERS}(?:\u200D{_EMOJI_BASE}{_EMOJI_MODIFIERS})*"
+)
+# A lone emoji code point already weighs 2; only flags and sequences with
+# modifiers or joiners need correcting
+SEQUENCE_HINT = re.compile("[\uFE0F\u200D\U0001F3FB-\U0001F3FF\U0001F1E6-\U0001F1FF]")
+
+def _plain_length(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    return len(text) + len(HEAVY_CHARS.findall(text))
+
+def weighted_length(text: str) -> int:
+    """Length of a tweet as X counts it"""
+    if text.isascii():
+        total = len(text)
+    else:
+        text = unicodedata.normalize("NFC", text)
+        total = _plain_length(text)
+        if SEQUENCE_HINT.search(text):
+            for match in EMOJI_SEQUENCES.finditer(text):
+                total += EMOJI_LENGTH - _plain_length(match.group())
+
+    if "." not in text:
+        return total  # No URLs possible
+    for word in text.split():
+        if "." in word:
+            for match in URLS.finditer(word):
+                total += URL_LENGTH - len(match.group())
+    return total
+
+def is_valid_tweet(text: str, limit: int = MAX_WEIGHTED_LENGTH) -> bool:
+    return 0 < weighted_length(text) <= limit
+
+def split_tweets(thread: str) -> List[str]:
+    """One tweet per non-empty line, as the thread is posted"""
+    return [line.strip() for line in thread.split("\n") if line.strip()]
+
+def over_limit(tweets: List[str], limit: int = MAX_WEIGHTED_LENGTH) -> List[int]:
+    """Indexes of tweets longer than `limit`"""
+    return [i for i, tweet in enumerate(tweets) if weighted_length(tweet) > limit]
+
+def truncate_tweet(text: str, limit: int = MAX_WEIGHTED_LENGTH) -> str:
+    """Last resort: cut at a word boundary so the tweet fits, ending with an ellipsis"""
+    if weighted_length(text) <= limit:
+        return text
+    words = text.split(" ")
+    while len(words) > 1 and weighted_length(" ".join(words) + "…") > limit:
+        words.pop()
+    cut = " ".join(words)
+    while cut and weighted_length(cut + "…") > limit:
+        cut = cut[:-1]
+    return cut.rstrip() + "…"
+
+def repair_tweets(
+    tweets: List[str],
+    rewrite: Callable[[str, int], str],
+    limit: int = MAX_WEIGHTED_LENGTH,
+    max_attempts: int = 2
+) -> Tuple[List[str], List[int]]:
+    """
+    Rewrite only the tweets that are over the limit
+
+    Args:
+        tweets: The thread, one tweet per item
+        rewrite: Called as rewrite(tweet, weighted_length) for each long tweet;
+                 returns the shortened tweet (e.g. a small model call)
+        limit: Weighted length limit
+        max_attempts: Rewrites per tweet before falling back to truncate_tweet
+
+    Returns:
+        (repaired tweets, indexes that had to be truncated)
+    """
+    repaired = list(tweets)
+    truncated = []
+    for i in over_limit(tweets, limit):
+        candidate: Optional[str] = repaired[i]
+        for _ in range(max_attempts):
+            try:
+                candidate = " ".join(split_tweets(rewrite(candidate, weighted_length(candidate))))
+            except Exception as e:
+                print(f"Tweet rewrite failed: {e}")
+                break
+            if 0 < weighted_length(candidate) <= limit:
+                break
+        if not candidate or weighted_length(candidate) > limit:
+            candidate = truncate_tweet(candidate or repaired[i], limit)
+            truncated.append(i)
+        repaired[i] = candidate
+    return repaired, truncated
+
+def repair_thread(thread: str, rewrite: Callable[[str, int], str], limit: int = MAX_WEIGHTED_LENGTH) -> Tuple[str, List[int]]:
+    """
+    repair_tweets for a whole thread, keeping its line layout
+
+    Returns:
+        (repaired thread, indexes of tweets that had to be truncated)
+    """
+    repaired, truncated = repair_tweets(split_tweets(thread), rewrite, limit)
+    for index in over_limit(split_tweets(thread), limit):
+        thread = replace_tweet(thread, index, repaired[index])
+    return thread, truncated
+
+def replace_tweet(thread: str, index: int, tweet: str) -> str:
+    """Replace tweet `index` (0-based, as split_tweets counts) keeping the thread's line layout"""
+    lines = thread.split("\n")
+    tweet_lines = [i for i, line in enumerate(lines) if line.strip()]
+    lines[tweet_lines[index]] = " ".join(split_tweets(tweet))
+    return "\n".join(lines)
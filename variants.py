@@ -0,0 +1,109 @@
+"""
+Multi-variant generation for XThreadMaster
+Runs several generations of the same prompt concurrently through a bounded
+pool and ranks the results locally - no extra model calls for judging
+"""
+
+import re
+from concurrent.futures import Executor, as_completed
+from typing import Callable, Dict, List, Optional
+
+import metrics
+from tweet_length import MAX_WEIGHTED_LENGTH, weighted_length
+
+EMOJI_PATTERN = re.compile(
+    "[\U0001F300-\U0001FAFF\U0001F1E6-\U0001F1FF☀-➿⬀-⯿]"
+)
+HASHTAG_PATTERN = re.compile(r"(?<!\w)#\w+")
+
+# Per-platform scoring targets
+SCORING = {
+    "X Thread": {
+        "hook_chars": (40, 200),
+        "emojis_per_line": (0.5, 2.0),
+        "hashtags": (0, 2),
+    },
+    "LinkedIn Post": {
+        "hook_chars": (30, 150),  # Shown before "...see more"
+        "emojis_per_line": (0.1, 1.0),
+        "hashtags": (3, 5),
+        "total_chars": (1300, 3000),
+    },
+}
+
+WEIGHTS = {"length": 0.4, "hook": 0.3, "emoji": 0.15, "hashtag": 0.15}
+
+def _in_range(value: float, low: float, high: float) -> float:
+    """1.0 inside [low, high], falling off linearly to 0 at double the distance"""
+    if low <= value <= high:
+        return 1.0
+    if value < low:
+        return max(0.0, value / low) if low else 0.0
+    return max(0.0, 1.0 - (value - high) / high) if high else 0.0
+
+def lines_of(text: str) -> List[str]:
+    return [line.strip() for line in text.split("\n") if line.strip()]
+
+def score_variant(text: str, platform: str = "X Thread") -> Dict[str, float]:
+    """
+    Score a generated thread/post on local heuristics
+
+    Returns:
+        Dict with each component (0-1) and the weighted 'score'
+    """
+    targets = SCORING.get(platform, SCORING["X Thread"])
+    lines = lines_of(text)
+    if not lines:
+        return {"length": 0.0, "hook": 0.0, "emoji": 0.0, "hashtag": 0.0, "score": 0.0}
+
+    if platform == "X Thread":
+        length = sum(1 for line in lines if weighted_length(line) <= MAX_WEIGHTED_LENGTH) / len(lines)
+    else:
+        length = _in_range(len(text), *targets["total_chars"])
+
+    components = {
+        "length": length,
+        "hook": _in_range(len(lines[0]), *targets["hook_chars"]),
+        "emoji": _in_range(len(EMOJI_PATTERN.findall(text)) / len(lines), *targets["emojis_per_line"]),
+        "hashtag": _in_range(len(HASHTAG_PATTERN.findall(text)), *targets["hashtags"]),
+    }
+    components["score"] = round(sum(WEIGHTS[name] * value for name, value in components.items()), 4)
+    return components
+
+def rank_variants(texts: List[str], platform: str = "X Thread") -> List[Dict]:
+    """Score and sort variants, best first (ties keep generation order)"""
+    scored = [{"text": text, **score_variant(text, platform)} for text in texts]
+    return sorted(scored, key=lambda variant: -variant["score"])
+
+def generate_variants(generate: Callable[[], str], count: int, executor: Executor, on_done: Optional[Callable[[int], None]] = None) -> List[str]:
+    """
+    Run `generate` `count` times concurrently
+
+    Args:
+        generate: One full generation (admission + routing + model call)
+        count: Number of variants
+        executor: Bounded, shared pool the calls run on
+        on_done: Called with the number of finished variants (for progress)
+
+    Returns:
+        Successful results in completion order. Raises the last error only
+        if every variant failed.
+    """
+    futures = [executor.submit(generate) for _ in range(count)]
+    results = []
+    last_error: Optional[Exception] = None
+
+    for done, future in enumerate(as_completed(futures), start=1):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            print(f"Variant generation failed: {e}")
+            metrics.increment("variants.failed")
+            last_error = e
+        if on_done:
+            on_done(done)
+
+    if not results and last_error:
+        raise last_error
+    metrics.increment("variants.generated", len(results))
+    return results